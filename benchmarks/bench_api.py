@@ -0,0 +1,46 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import pytest
+
+
+def get(client, url, headers=None):
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    return response.data
+
+
+@pytest.mark.parametrize("query", [
+    "io_type=read",
+    "io_type=read&start_frame=0&end_frame={end}&granularity=10S",
+    "io_type=read&start_frame=0&end_frame={end}&max_points=1000"
+    "&downsample=lttb",
+], ids=["raw", "resampled", "downsampled"])
+def test_api_fio_json(benchmark, client, ingested, scale, query):
+    url = '/api/{}/1/clat.json?{}'.format(
+        ingested, query.format(end=scale.duration * 1000))
+    benchmark(get, client, url)
+
+
+@pytest.mark.parametrize("query", [
+    "io_type=read",
+    "io_type=read&start_frame=0&end_frame={end}&max_points=1000"
+    "&envelope=1",
+], ids=["raw", "envelope"])
+def test_api_fio_json_combined(benchmark, client, ingested, scale, query):
+    url = '/api/{}/clat.json?{}'.format(
+        ingested, query.format(end=scale.duration * 1000))
+    benchmark(get, client, url)
+
+
+@pytest.mark.parametrize("accept_encoding", ["identity", "gzip"])
+def test_api_csv(benchmark, client, ingested, accept_encoding):
+    url = '/api/{}/1/clat.csv?io_type=read'.format(ingested)
+    benchmark(get, client, url, {'Accept-Encoding': accept_encoding})
+
+
+@pytest.mark.parametrize("codec", ["gzip", "none"])
+def test_api_targz(benchmark, client, ingested, codec):
+    url = '/api/{}/targz?codec={}'.format(ingested, codec)
+    benchmark(get, client, url)
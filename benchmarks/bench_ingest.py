@@ -0,0 +1,63 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import os
+
+import pytest
+
+from conftest import (
+    upload,
+)
+from fiowebviewer.engine import (
+    models,
+)
+from fiowebviewer.engine.models import (
+    FioResult,
+)
+
+
+def test_upload_ingest(benchmark, client, environment):
+    # every round uploads and processes a new result
+    benchmark.pedantic(upload, args=(client, environment.source), rounds=3)
+
+
+@pytest.mark.parametrize("log_type", ["bw", "clat"])
+def test_to_dataframe_text(benchmark, environment, unconverted, log_type):
+    def to_dataframe():
+        fio_result = FioResult(environment.data_path, unconverted)
+        return fio_result.to_dataframe(1, log_type, 'read')
+    assert benchmark(to_dataframe) is not None
+
+
+@pytest.mark.parametrize("log_type", ["bw", "clat"])
+def test_to_dataframe_converted(benchmark, environment, ingested, log_type):
+    def to_dataframe():
+        fio_result = FioResult(environment.data_path, ingested)
+        return fio_result.to_dataframe(1, log_type, 'read')
+    assert benchmark(to_dataframe) is not None
+
+
+def test_combined_dataframe_cold(benchmark, environment, ingested):
+    cache_dir = os.path.join(models.fio_webviewer.config['CACHE_PATH'],
+                             ingested)
+
+    def clear_cache():
+        models.fio_result_cache.clear()
+        for filename in os.listdir(cache_dir) if os.path.isdir(cache_dir) \
+                else ():
+            os.remove(os.path.join(cache_dir, filename))
+
+    def combined_dataframe():
+        fio_result = FioResult.new_from_database(environment.data_path,
+                                                 ingested)
+        return fio_result.combined_dataframe('clat', 'read')
+    benchmark.pedantic(combined_dataframe, setup=clear_cache, rounds=3)
+
+
+def test_combined_dataframe_cached(benchmark, environment, ingested):
+    def combined_dataframe():
+        fio_result = FioResult(environment.data_path, ingested)
+        return fio_result.combined_dataframe('clat', 'read')
+    combined_dataframe()
+    assert benchmark(combined_dataframe) is not None
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+"""
+compare the vectorized fio log parser with the former per-row date_parser
+
+FIOWEBVIEWER_SETTINGS has to be set, as for the tests.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.offsets import Milli
+
+from fiowebviewer.engine import (
+    logparser,
+)
+
+
+def generate_log(path, lines):
+    time_ms = np.arange(1, lines + 1, dtype=np.int64)
+    data = np.column_stack((
+        time_ms,
+        np.random.randint(1000, 100000, size=lines),
+        np.random.randint(0, 2, size=lines),
+        np.full(lines, 4096, dtype=np.int64),
+    ))
+    np.savetxt(path, data, fmt='%d', delimiter=', ')
+
+
+def legacy_dateparse(time):
+    return pd.Timedelta(Milli(int(time)))
+
+
+def parse_legacy(path):
+    # same per-row Timedelta construction as the former
+    # read_csv(date_parser=...) call, which newer pandas rejects
+    data_frame = pd.read_csv(path, index_col=0, header=None)
+    data_frame.index = data_frame.index.map(legacy_dateparse)
+    data_frame.drop(data_frame.columns[[1, 2]], axis=1, inplace=True)
+    return data_frame
+
+
+def parse_vectorized(path):
+    return logparser.read_fio_log_dataframe(path)
+
+
+def measure(function, path, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function(path)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--lines', type=int, default=10 ** 7,
+                        help='number of lines of the generated log')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='runs per parser, the best one is reported')
+    parser.add_argument('--skip-legacy', action='store_true', default=False,
+                        help='do not run the (slow) former parser')
+    args = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.log')
+    os.close(fd)
+    try:
+        generate_log(path, args.lines)
+        print('log: {} lines, {:.1f} MB'.format(
+            args.lines, os.path.getsize(path) / 2 ** 20))
+        vectorized = measure(parse_vectorized, path, args.repeat)
+        print('vectorized: {:.3f} s'.format(vectorized))
+        if not args.skip_legacy:
+            legacy = measure(parse_legacy, path, 1)
+            print('legacy date_parser: {:.3f} s ({:.1f}x)'.format(
+                legacy, legacy / vectorized))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
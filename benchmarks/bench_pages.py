@@ -0,0 +1,25 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+from bench_api import (
+    get,
+)
+
+
+def test_index(benchmark, client, listed):
+    benchmark(get, client, '/')
+
+
+def test_index_tag(benchmark, client, listed):
+    benchmark(get, client, '/?tag=tag%201')
+
+
+def test_summary(benchmark, client, ingested):
+    benchmark(get, client, '/summary/{}'.format(ingested))
+
+
+def test_compare(benchmark, client, compared):
+    url = '/compare?compare=Compare+selected&' + '&'.join(
+        'result={}'.format(result_id) for result_id in compared)
+    benchmark(get, client, url)
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+"""
+compare the unit conversion of summary tables with the former pint based
+one, on the table cells of the summary and comparison pages
+
+FIOWEBVIEWER_SETTINGS has to be set, as for the tests.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import time
+
+from fiowebviewer.engine import (
+    view,
+)
+from fiowebviewer.engine.models import (
+    ROUNDING_RANGE,
+    FioGroupReport,
+)
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           os.pardir, 'fiowebviewer', 'tests', 'samples', '2')
+
+
+def legacy_convert_unit(ureg, report, key, inner_key=None):
+    # the former FioGroupReport.convert_unit
+    if "runt" in key:
+        data = getattr(report, key)
+        duration = datetime.timedelta(milliseconds=data)
+        hours = int(duration.total_seconds() // 3600)
+        minutes = int((duration.total_seconds() % 3600) // 60)
+        seconds = int((duration.total_seconds() % 3600) % 60)
+        return "{}h:{:02d}m:{:02d}s".format(hours, minutes, seconds)
+    if inner_key:
+        data = float(getattr(report, key)[inner_key])
+    else:
+        data = float(getattr(report, key))
+    if "lat" in key:
+        data /= 1000
+        data *= ureg.millisecond
+    elif "bw" in key:
+        data /= 1000
+        data *= (ureg.megabyte / ureg.second)
+    elif "io" in key:
+        data /= 1000
+        data *= ureg.megabyte
+    return round(data.magnitude, ROUNDING_RANGE) * data.units
+
+
+def table_cells():
+    cells = []
+    for section, rows in view.fio_table.items():
+        for name, key in rows.items():
+            if "PERCENTILES" in section:
+                direction = 'read' if section.startswith('READ') else 'write'
+                cells.append(('{}_completion_lat_percentiles_usec'.format(
+                    direction), key))
+            elif isinstance(key, str) and \
+                    ("lat" in key or "bw" in key or "runt" in key or
+                     key.endswith("_io_kb")):
+                cells.append((key, None))
+    return cells
+
+
+def load_reports(count):
+    with open(os.path.join(SAMPLE_PATH, 'fio-webviewer.input.json')) as f:
+        data = json.load(f)
+    group_id = data['jobs'][0]['groupid']
+    return [FioGroupReport(SAMPLE_PATH, {group_id: []}, data)
+            for _ in range(count)]
+
+
+def render(reports, cells, convert):
+    for report in reports:
+        for key, inner_key in cells:
+            str(convert(report, key, inner_key))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--reports', type=int, default=30,
+                        help='reports shown on the page')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='runs per method, the best one is reported')
+    args = parser.parse_args()
+
+    cells = table_cells()
+    print('{} reports, {} converted cells each'.format(args.reports,
+                                                       len(cells)))
+    start = time.perf_counter()
+    import pint
+    ureg = pint.UnitRegistry()
+    ureg.default_format = '~'
+    print('pint registry: {:.3f} s'.format(time.perf_counter() - start))
+
+    report, = load_reports(1)
+    for key, inner_key in cells:
+        assert str(legacy_convert_unit(ureg, report, key, inner_key)) == \
+            str(report.convert_unit(key, inner_key)), (key, inner_key)
+
+    timings = []
+    for _ in range(args.repeat):
+        reports = load_reports(args.reports)
+        start = time.perf_counter()
+        render(reports, cells, lambda report, key, inner_key:
+               legacy_convert_unit(ureg, report, key, inner_key))
+        timings.append(time.perf_counter() - start)
+    legacy = min(timings)
+    print('pint: {:.4f} s'.format(legacy))
+
+    timings = []
+    for _ in range(args.repeat):
+        reports = load_reports(args.reports)
+        start = time.perf_counter()
+        render(reports, cells, FioGroupReport.convert_unit)
+        timings.append(time.perf_counter() - start)
+    table = min(timings)
+    print('unit table: {:.4f} s ({:.1f}x)'.format(table, legacy / table))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+"""
+cold start of the application in a new process: the import time of the
+application and the latency of its first requests
+
+The suite runs it against its synthetic result, on its own it runs
+against the results of FIOWEBVIEWER_SETTINGS, e.g.
+
+    python benchmarks/bench_startup.py / /api/1/clat.json?io_type=read
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+import pytest
+
+# modules no route needs at startup
+DEFERRED = ('pandas', 'pint', 'tables')
+
+CHILD = """
+import json
+import sys
+import time
+
+start = time.perf_counter()
+from fiowebviewer import application
+timings = dict(import_s=time.perf_counter() - start,
+               loaded=[name for name in sys.argv[1].split(',')
+                       if name in sys.modules])
+client = application.test_client()
+timings['requests'] = []
+for url in sys.argv[2:]:
+    start = time.perf_counter()
+    status = client.get(url).status_code
+    timings['requests'].append(dict(url=url, status=status,
+                                    seconds=time.perf_counter() - start))
+print(json.dumps(timings))
+"""
+
+
+def cold_start(urls=(), settings=None):
+    """
+    timings of a new process importing the application and requesting
+    urls, with the settings file if given
+    """
+    env = dict(os.environ)
+    if settings is not None:
+        env['FIOWEBVIEWER_SETTINGS'] = settings
+    output = subprocess.check_output(
+        [sys.executable, '-c', CHILD, ','.join(DEFERRED)] + list(urls),
+        env=env)
+    return json.loads(output.decode().splitlines()[-1])
+
+
+@pytest.fixture(scope='session')
+def settings(environment):
+    """
+    settings file of the benchmark environment, for new processes
+    """
+    path = os.path.join(environment.path, 'config.cfg')
+    with open(path, 'w') as f:
+        for key, value in (
+                ('DATA_PATH', environment.data_path),
+                ('CACHE_PATH', os.path.join(environment.path, 'cache')),
+                ('DATABASE', 'sqlite:///{}/database.db'.format(
+                    environment.path)),
+                ('ERROR_LOG', os.path.join(environment.path, 'error.log'))):
+            f.write('{} = {!r}\n'.format(key, value))
+    return path
+
+
+def run(benchmark, urls, settings):
+    timings = benchmark.pedantic(cold_start, args=(urls, settings),
+                                 rounds=3)
+    benchmark.extra_info.update(timings)
+    assert all(request['status'] == 200 for request in timings['requests'])
+    return timings
+
+
+def test_import(benchmark, settings):
+    timings = run(benchmark, [], settings)
+    assert timings['loaded'] == []
+
+
+def test_first_index(benchmark, settings, ingested):
+    run(benchmark, ['/'], settings)
+
+
+def test_first_series(benchmark, settings, ingested, scale):
+    run(benchmark, ['/api/{}/1/clat.json?io_type=read&start_frame=0'
+                    '&end_frame={}&max_points=1000'.format(
+                        ingested, scale.duration * 1000)], settings)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('urls', nargs='*', help='requested after import')
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+    rounds = [cold_start(args.urls) for _ in range(args.rounds)]
+    print('import: {:.3f}s median, loaded {}'.format(
+        statistics.median(timings['import_s'] for timings in rounds),
+        ', '.join(rounds[0]['loaded']) or 'none of ' + ', '.join(DEFERRED)))
+    for index, url in enumerate(args.urls):
+        print('{}: {:.3f}s median, status {}'.format(
+            url, statistics.median(timings['requests'][index]['seconds']
+                                   for timings in rounds),
+            rounds[0]['requests'][index]['status']))
+
+
+if __name__ == '__main__':
+    main()
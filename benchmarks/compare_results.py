@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+"""
+compare two benchmark json files, exits with 1 when a benchmark got
+slower than the threshold allows
+"""
+
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        return {benchmark['fullname']: benchmark['stats']
+                for benchmark in json.load(f)['benchmarks']}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('old', help='json of the reference run')
+    parser.add_argument('new', help='json of the compared run')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='allowed slowdown in percent')
+    parser.add_argument('--stat', default='min', choices=('min', 'mean',
+                                                          'median'))
+    args = parser.parse_args()
+
+    old = load(args.old)
+    new = load(args.new)
+    regressions = 0
+    print('{:<70} {:>10} {:>10} {:>8}'.format('name', 'old', 'new', 'change'))
+    for name in sorted(set(old) & set(new)):
+        old_value = old[name][args.stat]
+        new_value = new[name][args.stat]
+        change = (new_value / old_value - 1) * 100 if old_value else 0.0
+        marker = ''
+        if change > args.threshold:
+            regressions += 1
+            marker = ' !'
+        print('{:<70} {:>10.4f} {:>10.4f} {:>+7.1f}%{}'.format(
+            name, old_value, new_value, change, marker))
+    for name in sorted(set(old) ^ set(new)):
+        print('{:<70} only in {}'.format(
+            name, args.old if name in old else args.new))
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import datetime
+import json
+import os
+import platform
+import subprocess
+import tempfile
+import time
+from collections import (
+    namedtuple,
+)
+from shutil import (
+    copytree,
+    rmtree,
+)
+
+import numpy as np
+import pytest
+from sqlalchemy import (
+    create_engine,
+)
+from sqlalchemy.orm import (
+    sessionmaker,
+)
+
+from fiowebviewer.engine.run import fio_webviewer
+from fiowebviewer.engine import (
+    api,
+    database,
+    ingest,
+    models,
+    series,
+    view,
+)
+from fiowebviewer.engine.database import (
+    Result,
+    Tag,
+)
+
+import synthetic
+
+try:
+    import pytest_benchmark
+except ImportError:  # a minimal benchmark fixture is provided instead
+    pytest_benchmark = None
+
+Scale = namedtuple('Scale', 'jobs duration log_avg_msec results compared')
+Environment = namedtuple('Environment', 'path data_path source DBSession')
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup('fiowebviewer', 'synthetic result scale')
+    group.addoption('--bench-jobs', type=int, default=4,
+                    help='jobs of the synthetic result')
+    group.addoption('--bench-duration', type=int, default=300,
+                    help='runtime of the synthetic jobs in seconds')
+    group.addoption('--bench-log-avg-msec', type=int, default=100,
+                    help='log_avg_msec of the synthetic logs, 0 logs '
+                         'every io')
+    group.addoption('--bench-results', type=int, default=500,
+                    help='results listed by the index page')
+    group.addoption('--bench-compared', type=int, default=10,
+                    help='results shown by the compare page')
+    if pytest_benchmark is None:
+        group.addoption('--benchmark-json', default=None,
+                        help='save the timings to this json file')
+        group.addoption('--benchmark-rounds', type=int, default=5,
+                        help='rounds of every benchmark')
+
+
+class Benchmark(object):
+    """
+    the subset of the pytest-benchmark fixture used by the suite
+    """
+
+    def __init__(self, name, fullname, rounds):
+        self.name = name
+        self.fullname = fullname
+        self.rounds = rounds
+        self.timings = []
+        self.extra_info = {}
+
+    def __call__(self, function, *args, **kwargs):
+        return self.pedantic(function, args, kwargs, rounds=self.rounds)
+
+    def pedantic(self, target, args=(), kwargs=None, setup=None, rounds=1,
+                 iterations=1, warmup_rounds=0):
+        result = None
+        for round_index in range(warmup_rounds + rounds):
+            if setup is not None:
+                prepared = setup()
+                if prepared is not None:
+                    args, kwargs = prepared
+            start = time.perf_counter()
+            for _ in range(iterations):
+                result = target(*args, **(kwargs or {}))
+            elapsed = (time.perf_counter() - start) / iterations
+            if round_index >= warmup_rounds:
+                self.timings.append(elapsed)
+        return result
+
+    def stats(self):
+        timings = np.array(self.timings)
+        return dict(min=timings.min(), max=timings.max(),
+                    mean=timings.mean(), stddev=timings.std(),
+                    median=float(np.median(timings)), rounds=len(timings),
+                    ops=1 / timings.mean())
+
+
+if pytest_benchmark is None:
+
+    @pytest.fixture
+    def benchmark(request):
+        fixture = Benchmark(request.node.name, request.node.nodeid,
+                            request.config.getoption('--benchmark-rounds'))
+        yield fixture
+        if fixture.timings:
+            request.config._benchmarks.append(fixture)
+
+    def pytest_configure(config):
+        config._benchmarks = []
+
+    def pytest_sessionfinish(session):
+        path = session.config.getoption('--benchmark-json')
+        if path is None or not session.config._benchmarks:
+            return
+        try:
+            commit = subprocess.check_output(
+                ['git', 'rev-parse', 'HEAD'],
+                stderr=subprocess.DEVNULL).decode().strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        # same layout as the json of pytest-benchmark
+        with open(path, 'w') as f:
+            json.dump(dict(
+                machine_info=dict(node=platform.node(),
+                                  python_version=platform.python_version(),
+                                  machine=platform.machine()),
+                commit_info=dict(id=commit),
+                datetime=datetime.datetime.utcnow().isoformat(),
+                benchmarks=[dict(name=fixture.name,
+                                 fullname=fixture.fullname,
+                                 extra_info=fixture.extra_info,
+                                 stats=fixture.stats())
+                            for fixture in session.config._benchmarks],
+            ), f, indent=4)
+
+    def pytest_terminal_summary(terminalreporter):
+        benchmarks = terminalreporter.config._benchmarks
+        if not benchmarks:
+            return
+        terminalreporter.section('benchmarks (seconds)')
+        terminalreporter.write_line('{:<60} {:>10} {:>10} {:>6}'.format(
+            'name', 'min', 'mean', 'rounds'))
+        for fixture in benchmarks:
+            stats = fixture.stats()
+            terminalreporter.write_line(
+                '{:<60} {:>10.4f} {:>10.4f} {:>6}'.format(
+                    fixture.name, stats['min'], stats['mean'],
+                    stats['rounds']))
+
+
+@pytest.fixture(scope='session')
+def scale(request):
+    return Scale(
+        jobs=request.config.getoption('--bench-jobs'),
+        duration=request.config.getoption('--bench-duration'),
+        log_avg_msec=request.config.getoption('--bench-log-avg-msec'),
+        results=request.config.getoption('--bench-results'),
+        compared=request.config.getoption('--bench-compared'),
+    )
+
+
+@pytest.fixture(scope='session')
+def environment(request, scale):
+    """
+    empty data and cache directories and database, with the application
+    pointed at them, and one synthetic result ready for upload
+    """
+    path = tempfile.mkdtemp()
+    data_path = os.path.join(path, 'data')
+    cache_path = os.path.join(path, 'cache')
+    os.mkdir(data_path)
+    os.mkdir(cache_path)
+    engine = create_engine('sqlite:///{}/database.db'.format(path))
+    database.Base.metadata.create_all(engine)
+    DBSession = sessionmaker(bind=engine)
+    for module in (view, models, api, ingest):
+        module.DBSession = DBSession
+    fio_webviewer.config['DATA_PATH'] = data_path
+    fio_webviewer.config['CACHE_PATH'] = cache_path
+    fio_webviewer.config['INGEST_MODE'] = 'inline'
+    fio_webviewer.testing = True
+    source = synthetic.generate_result(
+        os.path.join(path, 'source'), jobs=scale.jobs,
+        duration=scale.duration, log_avg_msec=scale.log_avg_msec)
+    yield Environment(path, data_path, source, DBSession)
+    engine.dispose()
+    rmtree(path)
+
+
+@pytest.fixture
+def client(environment):
+    return fio_webviewer.test_client()
+
+
+def upload(client, source):
+    data = {}
+    for path in source:
+        filename = os.path.basename(path)
+        data[filename] = (open(path, 'rb'), filename)
+    response = client.post('/api/upload', data=data)
+    assert response.status_code == 200, response.data
+    result_id = response.data.decode().split('id: ')[1].split()[0]
+    return result_id
+
+
+@pytest.fixture(scope='session')
+def ingested(environment):
+    """
+    id of the uploaded and processed synthetic result
+    """
+    return upload(fio_webviewer.test_client(), environment.source)
+
+
+def add_result(environment, result_id, name, tags=()):
+    session = environment.DBSession()
+    result = Result(id=int(result_id), name=name,
+                    date_submitted=datetime.datetime.now())
+    session.add(result)
+    for tag in tags:
+        session.add(Tag(tag=tag, result=result))
+    session.commit()
+    session.close()
+
+
+@pytest.fixture(scope='session')
+def unconverted(environment, ingested):
+    """
+    id of a copy of the synthetic result whose logs were never converted
+    """
+    result_id = str(int(ingested) + 10 ** 6)
+    path = os.path.join(environment.data_path, result_id)
+    os.mkdir(path)
+    for source_path in environment.source:
+        os.link(source_path, os.path.join(path,
+                                          os.path.basename(source_path)))
+    add_result(environment, result_id, 'unconverted')
+    assert not any(series.is_converted(os.path.join(path, filename))
+                   for filename in os.listdir(path))
+    return result_id
+
+
+@pytest.fixture(scope='session')
+def compared(environment, ingested, scale):
+    """
+    ids of copies of the ingested result
+    """
+    result_ids = [ingested]
+    for index in range(1, scale.compared):
+        result_id = str(int(ingested) + 2 * 10 ** 6 + index)
+        copytree(os.path.join(environment.data_path, ingested),
+                 os.path.join(environment.data_path, result_id))
+        add_result(environment, result_id, 'compared {}'.format(index))
+        result_ids.append(result_id)
+    return result_ids
+
+
+@pytest.fixture(scope='session')
+def listed(environment, scale):
+    """
+    results only present in the database, enough for the index page
+    """
+    session = environment.DBSession()
+    first_id = 3 * 10 ** 6
+    now = datetime.datetime.now()
+    session.bulk_insert_mappings(Result, [
+        dict(id=first_id + index, name='listed {}'.format(index),
+             date_submitted=now - datetime.timedelta(minutes=index))
+        for index in range(scale.results)])
+    session.bulk_insert_mappings(Tag, [
+        dict(tag='tag {}'.format(index % 10), result_id=first_id + index)
+        for index in range(scale.results)])
+    session.commit()
+    session.close()
+    return scale.results
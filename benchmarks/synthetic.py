@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+"""
+generate synthetic fio results, laid out like the files fio-webviewer.sh
+uploads: normal and json outputs, user arguments, name, tags and one
+raw log per job and log type
+
+The outputs are based on the ones of the test samples, with the job
+count, runtime and throughput of the generated result.
+"""
+
+import argparse
+import copy
+import json
+import os
+
+import numpy as np
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           os.pardir, 'fiowebviewer', 'tests', 'samples', '2')
+LOG_TYPES = ('bw', 'iops', 'lat', 'slat', 'clat')
+# typical magnitude of a logged value, latencies are in usec
+LOG_VALUES = {
+    'bw': 50000,
+    'iops': 1000,
+    'lat': 300,
+    'slat': 20,
+    'clat': 280,
+}
+# logged samples per second and job when log_avg_msec is 0 (every io)
+IOS_PER_SECOND = 1000
+BLOCK_SIZE = 4096
+
+
+def _sample_output():
+    with open(os.path.join(SAMPLE_PATH, 'fio-webviewer.input')) as f:
+        lines = f.read().splitlines()
+    # statistics of the sample group, after its header line
+    start = [index for index, line in enumerate(lines)
+             if '(groupid=' in line][0]
+    return lines[start + 1:]
+
+
+def normal_output(name, jobs, rw='randrw'):
+    lines = ['{}-{}: (g=0): rw={}, bs=4K-4K/4K-4K/4K-4K, ioengine=libaio, '
+             'iodepth=32'.format(name, job_id, rw)
+             for job_id in range(1, jobs + 1)]
+    lines += ['fio-3.1', 'Starting {} processes'.format(jobs), '',
+              '{}-1: (groupid=0, jobs={}): err= 0: pid=1: '
+              'Mon Jul 10 14:44:27 2017'.format(name, jobs)]
+    return '\n'.join(lines + _sample_output()) + '\n'
+
+
+def json_output(name, duration_ms, scale):
+    with open(os.path.join(SAMPLE_PATH, 'fio-webviewer.input.json')) as f:
+        data = json.load(f)
+    data = copy.deepcopy(data)
+    job = data['jobs'][0]
+    job['jobname'] = '{}-1'.format(name)
+    job['groupid'] = 0
+    for direction in ('read', 'write'):
+        stats = job[direction]
+        stats['runtime'] = duration_ms
+        for key in ('io_kbytes', 'bw_bytes', 'iops', 'bw_mean', 'bw_min',
+                    'bw_max'):
+            stats[key] = type(stats[key])(stats[key] * scale)
+    return data
+
+
+def log_data(log_type, duration_ms, log_avg_msec, rng):
+    """
+    rows of time (msec), value, data direction and block size
+    """
+    if log_avg_msec:
+        time = np.repeat(np.arange(log_avg_msec, duration_ms + 1,
+                                   log_avg_msec, dtype=np.int64), 2)
+        direction = np.tile([0, 1], len(time) // 2)
+    else:
+        size = duration_ms * IOS_PER_SECOND // 1000
+        time = np.sort(rng.randint(1, duration_ms + 1, size=size))
+        direction = rng.randint(0, 2, size=size)
+    value = rng.gamma(4.0, LOG_VALUES[log_type] / 4.0, size=len(time))
+    return np.column_stack((time, np.maximum(value, 1).astype(np.int64),
+                            direction, np.full(len(time), BLOCK_SIZE)))
+
+
+def generate_result(path, name='synthetic', jobs=2, duration=60,
+                    log_avg_msec=100, tags=('synthetic',), seed=0):
+    """
+    write a result of jobs jobs running duration seconds into path,
+    returns the paths of the written files
+    """
+    rng = np.random.RandomState(seed)
+    duration_ms = int(duration * 1000)
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    files = {
+        'fio-webviewer.input': normal_output(name, jobs),
+        'fio-webviewer.input.json': json.dumps(
+            json_output(name, duration_ms, rng.uniform(0.8, 1.2)), indent=4),
+        'fio-webviewer.userargs': '--name={} --rw=randrw --numjobs={} '
+                                  '--runtime={} --log_avg_msec={} '
+                                  '--group_reporting\n'.format(
+                                      name, jobs, duration, log_avg_msec),
+        'fio-webviewer.name': '{}\n'.format(name),
+        'fio-webviewer.tags': ''.join('{}\n'.format(tag) for tag in tags),
+    }
+    paths = []
+    for filename, content in files.items():
+        paths.append(os.path.join(path, filename))
+        with open(paths[-1], 'w') as f:
+            f.write(content)
+    for job_id in range(1, jobs + 1):
+        for log_type in LOG_TYPES:
+            paths.append(os.path.join(path, 'fio-webviewer_{}.{}.log'.format(
+                log_type, job_id)))
+            np.savetxt(paths[-1], log_data(log_type, duration_ms,
+                                           log_avg_msec, rng),
+                       fmt='%d', delimiter=', ')
+    return sorted(paths)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('path', help='directory of the generated results')
+    parser.add_argument('--results', type=int, default=1,
+                        help='number of results, one subdirectory each')
+    parser.add_argument('--jobs', type=int, default=2)
+    parser.add_argument('--duration', type=int, default=60,
+                        help='runtime of the jobs in seconds')
+    parser.add_argument('--log-avg-msec', type=int, default=100,
+                        help='0 logs every io')
+    args = parser.parse_args()
+
+    for index in range(args.results):
+        result_path = os.path.join(args.path, str(index + 1))
+        generate_result(result_path, 'synthetic-{}'.format(index + 1),
+                        args.jobs, args.duration, args.log_avg_msec,
+                        seed=index)
+        print(result_path)
+
+
+if __name__ == '__main__':
+    main()
@@ -3,5 +3,10 @@
 # Copyright 2019 The fiowebviewer Authors. All rights reserved.
 
 from fiowebviewer.engine.run import (
-    application,
+    create_app,
 )
+
+__all__ = ['application', 'create_app']
+
+# the WSGI entry point
+application = create_app()
@@ -0,0 +1,30 @@
+"""add listing indexes
+
+Revision ID: a3f1c2d4e5b6
+Revises: 6dc3110bfb5a
+Create Date: 2019-06-03 10:12:31.118245
+
+"""
+import sqlalchemy as sa
+from alembic import (
+    op,
+)
+
+# revision identifiers, used by Alembic.
+revision = 'a3f1c2d4e5b6'
+down_revision = '6dc3110bfb5a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_results_date_submitted', 'results',
+                    ['date_submitted'])
+    op.create_index('ix_tags_result_id', 'tags', ['result_id'])
+    op.create_index('ix_tags_tag', 'tags', ['tag'])
+
+
+def downgrade():
+    op.drop_index('ix_tags_tag', 'tags')
+    op.drop_index('ix_tags_result_id', 'tags')
+    op.drop_index('ix_results_date_submitted', 'results')
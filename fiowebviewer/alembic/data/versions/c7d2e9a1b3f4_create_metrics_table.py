@@ -0,0 +1,61 @@
+"""create metrics table
+
+Revision ID: c7d2e9a1b3f4
+Revises: a3f1c2d4e5b6
+Create Date: 2019-06-10 14:41:07.532918
+
+"""
+import sqlalchemy as sa
+from alembic import (
+    op,
+)
+
+# revision identifiers, used by Alembic.
+revision = 'c7d2e9a1b3f4'
+down_revision = 'a3f1c2d4e5b6'
+branch_labels = None
+depends_on = None
+
+INDEXED_COLUMNS = (
+    'result_id',
+    'rw',
+    'read_iops',
+    'read_bw_kbps',
+    'read_clat_mean_usec',
+    'read_clat_p99_usec',
+    'write_iops',
+    'write_bw_kbps',
+    'write_clat_mean_usec',
+    'write_clat_p99_usec',
+)
+
+
+def upgrade():
+    columns = [
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('result_id', sa.Integer, sa.ForeignKey('results.id'),
+                  nullable=False),
+        sa.Column('group_id', sa.Integer, nullable=False),
+        sa.Column('jobname', sa.String, nullable=True),
+        sa.Column('rw', sa.String, nullable=True),
+    ]
+    for iotype in ('read', 'write'):
+        columns.extend([
+            sa.Column('{}_iops'.format(iotype), sa.Integer),
+            sa.Column('{}_bw_kbps'.format(iotype), sa.Integer),
+            sa.Column('{}_runtime_ms'.format(iotype), sa.Integer),
+            sa.Column('{}_clat_mean_usec'.format(iotype), sa.Float),
+            sa.Column('{}_clat_p50_usec'.format(iotype), sa.Float),
+            sa.Column('{}_clat_p95_usec'.format(iotype), sa.Float),
+            sa.Column('{}_clat_p99_usec'.format(iotype), sa.Float),
+            sa.Column('{}_clat_p999_usec'.format(iotype), sa.Float),
+        ])
+    op.create_table('metrics', *columns)
+    for column in INDEXED_COLUMNS:
+        op.create_index('ix_metrics_{}'.format(column), 'metrics', [column])
+
+
+def downgrade():
+    for column in INDEXED_COLUMNS:
+        op.drop_index('ix_metrics_{}'.format(column), 'metrics')
+    op.drop_table('metrics')
@@ -0,0 +1,27 @@
+"""add status column
+
+Revision ID: e4b8a6f2c9d1
+Revises: c7d2e9a1b3f4
+Create Date: 2019-06-17 09:23:52.604117
+
+"""
+import sqlalchemy as sa
+from alembic import (
+    op,
+)
+
+# revision identifiers, used by Alembic.
+revision = 'e4b8a6f2c9d1'
+down_revision = 'c7d2e9a1b3f4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('results', sa.Column('status', sa.String(16)))
+    op.create_index('ix_results_status', 'results', ['status'])
+
+
+def downgrade():
+    op.drop_index('ix_results_status', 'results')
+    op.drop_column('results', 'status')
@@ -2,35 +2,130 @@
 # license that can be found in the LICENSE file.
 # Copyright 2019 The fiowebviewer Authors. All rights reserved.
 
-import pandas as pd
+import datetime
+import functools
+import hashlib
+import os
+
+import numpy as np
 from flask import (
     Response,
+    abort,
     jsonify,
+    make_response,
     request,
     send_file,
+    stream_with_context,
 )
-from pandas.tseries.offsets import Milli
-from pint import UnitRegistry
 from sqlalchemy.orm.exc import NoResultFound
 from werkzeug.exceptions import BadRequest
 
+from fiowebviewer.engine import (
+    archive,
+    compare,
+    diskcache,
+    downsample,
+    export,
+    ingest,
+    instrumentation,
+    pyramid,
+    wire,
+)
 from fiowebviewer.engine.database import (
     DBSession,
     Result,
 )
 from fiowebviewer.engine.run import fio_webviewer
-from fiowebviewer.engine.models import FioResult
+from fiowebviewer.engine.models import (
+    COMBINED_GRANULARITY,
+    FioResult,
+    METRICS,
+    METRICS_OPERATORS,
+    data_path,
+    fio_result_cache,
+    invalidate_fio_result,
+    list_fio_results,
+    search_metrics,
+)
 
-ureg = UnitRegistry()
-ureg.default_format = '~'
 logger = fio_webviewer.logger
-DATA_PATH = fio_webviewer.config['DATA_PATH']
+# upper bound of points returned for a series
+MAX_POINTS = 10000
+# page size bounds of the results listing
+RESULTS_LIMIT = 100
+MAX_RESULTS_LIMIT = 1000
+# finer buckets used as input of the downsampling methods
+OVERSAMPLING = 8
+# bump when the representation of result data changes
+HTTP_CACHE_VERSION = 1
+HTTP_CACHE_MAX_AGE = 3600
+
+
+def _result_validators(fio_result_id):
+    """
+    etag and last modification time of the data of a processed result,
+    None when it is missing or still processing
+    """
+    session = DBSession()
+    try:
+        name, status = session.query(Result.name, Result.status).filter(
+            Result.id == fio_result_id).one()
+    except (NoResultFound, ValueError):
+        return None
+    finally:
+        session.close()
+    if status is not None and status != ingest.STATUS_READY:
+        return None
+    try:
+        mtime_ns = os.stat(os.path.join(data_path(),
+                                        str(fio_result_id))).st_mtime_ns
+    except OSError:
+        return None
+    digest = hashlib.sha1('{}:{}:{}:{}:{}:{}'.format(
+        HTTP_CACHE_VERSION, fio_result_id, mtime_ns, name,
+        bool(request.accept_encodings['gzip']),
+        request.headers.get('Accept', '')).encode()).hexdigest()
+    last_modified = datetime.datetime.utcfromtimestamp(mtime_ns // 10 ** 9)
+    return '{}-{}'.format(fio_result_id, digest[:20]), last_modified
+
+
+def immutable_result(view):
+    """
+    answer conditional requests of result data without running the view,
+    the data of a processed result never changes
+    """
+    @functools.wraps(view)
+    def wrapper(fio_result_id, *args, **kwargs):
+        validators = _result_validators(fio_result_id)
+        if validators is None:
+            return view(fio_result_id, *args, **kwargs)
+        etag, last_modified = validators
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains_weak(etag)
+        else:
+            not_modified = request.if_modified_since is not None and \
+                last_modified <= request.if_modified_since
+        if not_modified:
+            response = Response(status=304)
+        else:
+            response = make_response(view(fio_result_id, *args, **kwargs))
+            if response.status_code not in (200, 206):
+                return response
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.cache_control.public = True
+        response.cache_control.max_age = fio_webviewer.config.get(
+            'HTTP_CACHE_MAX_AGE', HTTP_CACHE_MAX_AGE)
+        response.vary.add('Accept-Encoding')
+        response.vary.add('Accept')
+        return response
+    return wrapper
 
 
 @fio_webviewer.route('/api/<fio_result_id>', methods=['GET', 'PUT'])
 def api_fio_result(fio_result_id):
     if request.method == 'GET':
-        fio_data = FioResult(DATA_PATH, fio_result_id)
+        fio_data = FioResult.new_from_database(data_path(), fio_result_id)
         fio_log_types = {}
         run_time = None
         for fio_group_report in fio_data.group_reports:
@@ -66,6 +161,7 @@ def api_fio_result(fio_result_id):
                     return "Bad Request", 400
                 else:
                     session.commit()
+                    invalidate_fio_result(fio_result_id)
                     return "OK", 200
             return "Bad Request", 400  # triggered when 'name' is empty
         except Exception as e:  # triggered when there is no name in input data
@@ -73,10 +169,167 @@ def api_fio_result(fio_result_id):
             return "Bad Request", 400
 
 
+@fio_webviewer.route('/api/results', methods=['GET'])
+def api_results():
+    try:
+        after = request.args.get('after')
+        if after is not None:
+            after = int(after)
+        limit = min(max(int(request.args.get('limit', RESULTS_LIMIT)), 1),
+                    MAX_RESULTS_LIMIT)
+        fio_results = list_fio_results(after, limit,
+                                       request.args.get('tag'))
+    except (ValueError, NoResultFound):
+        return "Bad Request", 400
+    results = [
+        {
+            'id': fio_result.dir_name,
+            'name': fio_result.fio_name,
+            'date_submitted': fio_result.upload_date,
+            'tags': fio_result.tags_list,
+        }
+        for fio_result in fio_results
+    ]
+    return jsonify({
+        'results': results,
+        # keyset cursor of the next page
+        'next': results[-1]['id'] if len(results) == limit else None,
+    })
+
+
+def _metrics_filters(args):
+    filters = []
+    for key, value in args.items():
+        column, _, operator_name = key.rpartition('.')
+        if not column:
+            continue
+        if column not in METRICS or operator_name not in METRICS_OPERATORS:
+            raise BadRequest()
+        try:
+            filters.append((column, operator_name, float(value)))
+        except ValueError:
+            raise BadRequest()
+    return filters
+
+
+@fio_webviewer.route('/api/metrics', methods=['GET'])
+def api_metrics():
+    """
+    e.g. ?rw=randread&tag=nvme&read_clat_p99_usec.lt=500&sort=-read_iops
+    """
+    try:
+        filters = _metrics_filters(request.args)
+        sort = request.args.get('sort')
+        descending = sort is not None and sort.startswith('-')
+        if sort is not None:
+            sort = sort.lstrip('-')
+            if sort not in METRICS:
+                raise BadRequest()
+        limit = min(max(int(request.args.get('limit', RESULTS_LIMIT)), 1),
+                    MAX_RESULTS_LIMIT)
+    except (BadRequest, ValueError):
+        return "Bad Request", 400
+    rows = search_metrics(filters, request.args.get('rw'),
+                          request.args.get('tag'), sort, descending, limit)
+    results = [
+        {
+            'id': str(result.id),
+            'name': result.name,
+            'date_submitted': result.date_submitted,
+            'tags': [tag.tag for tag in result.tags],
+            'group_id': metrics.group_id,
+            'jobname': metrics.jobname,
+            'rw': metrics.rw,
+            'metrics': {column: getattr(metrics, column)
+                        for column in METRICS},
+        }
+        for metrics, result in rows
+    ]
+    return jsonify({'results': results})
+
+
+@fio_webviewer.route('/api/compare', methods=['GET'])
+def api_compare():
+    """
+    compare the group reports of the result parameters against the
+    baseline result (the first one by default), or every pair of them
+    with pairwise=1
+    """
+    try:
+        fio_results = [FioResult.new_from_database(data_path(), fio_result_id)
+                       for fio_result_id in request.args.getlist('result')]
+        reports, comparison = compare.compare_results(
+            fio_results, request.args.get('baseline'))
+    except (NoResultFound, ValueError):
+        return "Bad Request", 400
+    compared = comparison.to_dict(
+        pairwise=request.args.get('pairwise') in ('1', 'true'))
+    compared['reports'] = [dict(result=fio_result.dir_name,
+                                name=fio_result.fio_name,
+                                group_id=group_report.group_id,
+                                jobname=group_report.jobname)
+                           for fio_result, group_report in reports]
+    return jsonify(compared)
+
+
+@fio_webviewer.route('/api/cache', methods=['GET'])
+def api_cache():
+    return jsonify(fio_result_cache.info())
+
+
+@fio_webviewer.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Prometheus text exposition, when INSTRUMENTATION is enabled
+    """
+    if not instrumentation.enabled():
+        abort(404)
+    info = fio_result_cache.info()
+    counters = {
+        ('fiowebviewer_cache_requests_total',
+         (('cache', 'result'), ('outcome', outcome))): info[key]
+        for outcome, key in (('hit', 'hits'), ('miss', 'misses'))}
+    return Response(instrumentation.registry.render(counters),
+                    content_type=instrumentation.PROMETHEUS_MIMETYPE)
+
+
+@fio_webviewer.route('/api/cache/disk', methods=['GET'])
+def api_disk_cache():
+    disk_cache = diskcache.get_cache()
+    if disk_cache is None:
+        return jsonify(dict(error='404'))
+    try:
+        top = int(request.args.get('top', 10))
+    except ValueError:
+        return "Bad Request", 400
+    return jsonify(disk_cache.stats(top))
+
+
+@fio_webviewer.route('/api/<fio_result_id>/status', methods=['GET'])
+def api_fio_status(fio_result_id):
+    try:
+        fio_data = FioResult.new_from_database(data_path(), fio_result_id)
+    except NoResultFound:
+        abort(404)
+    # results uploaded before processing steps existed are ready
+    status = fio_data.status or ingest.STATUS_READY
+    if status in ingest.STEPS:
+        progress = ingest.STEPS.index(status) / (len(ingest.STEPS) - 1)
+    else:
+        progress = None
+    return jsonify({
+        'id': fio_result_id,
+        'status': status,
+        'progress': progress,
+    })
+
+
 @fio_webviewer.route('/api/<fio_result_id>/json', methods=['GET'])
+@immutable_result
 def api_fio_result_json(fio_result_id):
 
-    fio_data = FioResult(DATA_PATH, fio_result_id).group_reports
+    fio_data = FioResult.new_from_database(data_path(),
+                                           fio_result_id).group_reports
     fio_result = {
         'fio version': fio_data[0].fio_version,
         'jobs': [
@@ -173,95 +426,421 @@ def api_fio_result_json(fio_result_id):
 
 @fio_webviewer.route('/api/<fio_result_id>/<job_id>/<log_type>.csv',
                      methods=['GET'])
+@immutable_result
 def api_fio_csv(fio_result_id, job_id, log_type):
-    io_type = request.args.get('io_type')
-    fio_data = FioResult(DATA_PATH, fio_result_id)
-    data_buf = fio_data.to_csv(job_id, log_type, io_type)
-    csv_string = data_buf.getvalue()
-    return Response(csv_string, mimetype='text/csv')
+    args = _series_args(request.args)
+    fio_data = FioResult.new_from_database(data_path(), fio_result_id)
+    if 'granularity' not in request.args:
+        return _csv_response(fio_data.iter_csv(job_id, log_type,
+                                               args['io_type']))
+    data_frame = fio_data.resample(job_id, log_type, args['io_type'],
+                                   args['granularity'], args['start_frame'],
+                                   args['end_frame'], args['envelope'])
+    if data_frame is None:
+        return _csv_response(iter(()))
+    return _csv_response(export.iter_frame_csv(data_frame))
+
+
+@fio_webviewer.route('/api/<fio_result_id>/<log_type>.csv', methods=['GET'])
+@immutable_result
+def api_fio_csv_combined(fio_result_id, log_type):
+    args = _series_args(request.args)
+    fio_data = FioResult.new_from_database(data_path(), fio_result_id)
+    data_frame = combined_frame(fio_data, log_type, args['io_type'],
+                                args['start_frame'], args['end_frame'],
+                                args['granularity'], args['envelope'])
+    if data_frame is None:
+        return _csv_response(iter(()))
+    return _csv_response(export.iter_frame_csv(data_frame))
+
+
+@fio_webviewer.route('/api/<fio_result_id>/<job_id>/<log_type>.log',
+                     methods=['GET'])
+def api_fio_log(fio_result_id, job_id, log_type):
+    fio_data = FioResult.new_from_database(data_path(), fio_result_id)
+    fio_log = fio_data.get_log(job_id, log_type)
+    if fio_log is None or not os.path.isfile(fio_log.raw_path):
+        abort(404)
+    # served as-is, so that range and conditional requests are supported
+    return send_file(fio_log.raw_path, mimetype='text/plain',
+                     conditional=True, as_attachment=True,
+                     attachment_filename=os.path.basename(fio_log.raw_path))
+
+
+def _csv_response(chunks):
+    headers = {'Vary': 'Accept-Encoding'}
+    if request.accept_encodings['gzip']:
+        chunks = export.gzip_chunks(chunks)
+        headers['Content-Encoding'] = 'gzip'
+    return Response(stream_with_context(chunks), mimetype='text/csv',
+                    headers=headers)
+
+
+def _archive_args(args):
+    codec = args.get('codec', 'gzip')
+    if codec not in archive.CODECS:
+        raise BadRequest("Bad Request")
+    if codec == 'zstd' and archive.zstandard is None:
+        raise BadRequest("Bad Request (zstd needs the zstandard package)")
+    level = args.get('level')
+    if level is not None:
+        try:
+            level = int(level)
+        except ValueError:
+            raise BadRequest("Bad Request")
+        if level not in archive.LEVELS[codec]:
+            raise BadRequest("Bad Request")
+    return codec, level, args.get('outputs') in ('1', 'true')
 
 
 @fio_webviewer.route('/api/<fio_result_id>/targz', methods=['GET'])
+@immutable_result
 def api_fio_targz(fio_result_id):
-    fio_data = FioResult(DATA_PATH, fio_result_id)
-    return send_file(fio_data.to_tar_gz(), mimetype='application/tar+gzip',
-                     as_attachment=True,
-                     attachment_filename='{}.tar.gz'.format(fio_data.fio_name))
+    try:
+        codec, level, include_outputs = _archive_args(request.args)
+    except BadRequest as e:
+        return e.description, 400
+    extension, mimetype = archive.CODECS[codec]
+
+    fio_data = FioResult.new_from_database(data_path(), fio_result_id)
+    attachment_filename = '{}{}'.format(fio_data.fio_name, extension)
+    cache_file = _archive_cache_file(fio_data, codec, level, include_outputs)
+    if cache_file is not None and os.path.isfile(cache_file):
+        try:
+            response = send_file(cache_file, mimetype=mimetype,
+                                 conditional=True, as_attachment=True,
+                                 attachment_filename=attachment_filename)
+        except FileNotFoundError:  # evicted since
+            pass
+        else:
+            diskcache.hit(cache_file)
+            return response
+    chunks = archive.iter_archive(fio_data.archive_files(include_outputs),
+                                  codec, level)
+    if cache_file is not None:
+        diskcache.miss()
+        chunks = archive.cache_stream(chunks, cache_file,
+                                      on_complete=diskcache.stored)
+    response = Response(stream_with_context(chunks), mimetype=mimetype)
+    response.headers.set('Content-Disposition', 'attachment',
+                         filename=attachment_filename)
+    return response
 
 
-@fio_webviewer.route('/api/<fio_result_id>/<job_id>/<log_type>.json',
-                     methods=['GET'])
-def api_fio_json(fio_result_id, job_id, log_type):
-    start_frame = request.args.get('start_frame')
-    end_frame = request.args.get('end_frame')
-    granularity = request.args.get('granularity', '1S')
-    io_type = request.args.get('io_type')
-
-    fio_data = FioResult(DATA_PATH, fio_result_id)
-    if start_frame and end_frame:
-        data_frame = fio_data.to_dataframe(job_id, log_type, io_type)
-        if data_frame is None:
-            return jsonify(dict(error='404'))
-            # return error 404 with
-            # html status code 200
-            # so we can catch this error
-            # directly in frontend
-            # without triggering errors.
-
-        data_frame = data_frame[(data_frame.index > Milli(start_frame)) &
-                                (data_frame.index < Milli(end_frame))]
-        if "iops" not in log_type:
-            data_frame[1] = data_frame[1].astype(float).values / 1000
-            data_frame[1] = data_frame[1].round(2)
-        if granularity:
-            data_frame = data_frame.\
-                resample(granularity, label='right', closed='right').mean().\
-                fillna('None')
-        return jsonify(dict(
-            x=data_frame.index.astype('timedelta64[s]').values.tolist(),
-            y=data_frame[1].values.tolist()
-        ))
-    return jsonify(fio_data.to_json(job_id, log_type))
+def _archive_cache_file(fio_data, codec, level, include_outputs):
+    if not fio_webviewer.config.get('ARCHIVE_CACHE', False):
+        return None
+    cache_dir = fio_data.get_cache_dir()
+    if cache_dir is None:
+        return None
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+    return os.path.join(cache_dir, 'archive{}.{}{}'.format(
+        '.outputs' if include_outputs else '',
+        'default' if level is None else level,
+        archive.CODECS[codec][0]))
 
 
-@fio_webviewer.route('/api/<fio_result_id>/<log_type>.json',
-                     methods=['GET'])
-def api_fio_json_combined(fio_result_id, log_type):
-    start_frame = request.args.get('start_frame')
-    end_frame = request.args.get('end_frame')
-    granularity = request.args.get('granularity', '1S')
-    io_type = request.args.get('io_type')
+def _fit_granularity(fio_data, start_frame, end_frame, max_points):
+    if start_frame is not None and end_frame is not None:
+        span_ms = int(end_frame) - int(start_frame)
+    else:
+        span_ms = fio_data.runtime_ms
+    granularity_ms = pyramid.fit_granularity(span_ms, max_points)
+    return '{}S'.format(granularity_ms // 1000)
+
+
+def _downsample(method, x, y, max_points):
+    if method == 'lttb':
+        return downsample.lttb(x, y, max_points)
+    # m4 keeps up to four points per bucket
+    return downsample.m4(x, y, max(max_points // 4, 1))
+
+
+def _scale_values(log_type, values):
+    """
+    values in the units of the plots, MB/s and msec, iops as they are
+    """
+    values = np.asarray(values)
+    if "iops" in log_type:
+        return values
+    values = values / 1000.0
+    return np.round(values, 2, out=values)
+
 
-    fio_data = FioResult(DATA_PATH, fio_result_id)
+def _scale(log_type, data_frame):
+    if "iops" not in log_type:
+        for column in data_frame.columns:
+            data_frame[column] = _scale_values(log_type,
+                                               data_frame[column].values)
+    return data_frame
+
+
+def _plot_series(log_type, time, value):
+    """
+    samples in the units of every series endpoint, x in seconds
+    """
+    return dict(x=np.asarray(time) / 1000.0, y=_scale_values(log_type, value))
+
+
+def _frame_to_dict(data_frame, granularity=None):
+    series = dict(
+        x=data_frame.index.astype('timedelta64[s]').values,
+        y=data_frame[1].values
+    )
+    if 'min' in data_frame.columns:
+        series['y_min'] = data_frame['min'].values
+        series['y_max'] = data_frame['max'].values
+    if granularity:
+        series['granularity'] = granularity
+    return series
+
+
+def _jsonable(series):
+    """
+    series arrays as lists, gaps (NaN) become 'None'
+    """
+    series = dict(series)
+    for name in wire.ARRAYS:
+        if name not in series:
+            continue
+        values = np.asarray(series[name])
+        if values.dtype.kind == 'f':
+            gaps = np.isnan(values)
+            if gaps.any():
+                values = values.astype(object)
+                values[gaps] = 'None'
+        series[name] = values.tolist()
+    return series
+
+
+def _series_format():
+    requested = request.args.get('format')
+    if requested is not None:
+        if requested not in wire.available_formats():
+            raise BadRequest()
+        return requested
+    mimetype = request.accept_mimetypes.best_match(
+        [wire.FORMATS[name] for name in wire.available_formats()],
+        default=wire.JSON_MIMETYPE)
+    return {value: key for key, value in wire.FORMATS.items()}[mimetype]
+
+
+def _series_response(series_list, single=False):
+    """
+    json unless the client asked for the binary or the msgpack format
+    """
+    series_format = _series_format()
+    with instrumentation.span('encode'):
+        if series_format == 'binary':
+            return Response(wire.encode(series_list),
+                            mimetype=wire.BINARY_MIMETYPE)
+        if series_format == 'msgpack':
+            return Response(wire.encode_msgpack(series_list),
+                            mimetype=wire.MSGPACK_MIMETYPE)
+        series_list = [_jsonable(series) for series in series_list]
+        return jsonify(series_list[0] if single else dict(series=series_list))
+
+
+def _series_args(args):
+    start_frame = args.get('start_frame')
+    end_frame = args.get('end_frame')
+    if start_frame in (None, '') or end_frame in (None, ''):
+        start_frame = end_frame = None
+    max_points = args.get('max_points')
+    if max_points is not None:
+        try:
+            max_points = min(max(int(max_points), 1), MAX_POINTS)
+        except ValueError:
+            raise BadRequest()
+    method = args.get('downsample')
+    if method is not None and method not in downsample.METHODS:
+        raise BadRequest()
+    return dict(
+        start_frame=start_frame,
+        end_frame=end_frame,
+        granularity=args.get('granularity', '1S'),
+        io_type=args.get('io_type'),
+        max_points=max_points,
+        method=method,
+        envelope=args.get('envelope') in ('1', 'true', 1, True),
+    )
+
+
+def job_series(fio_data, job_id, log_type, io_type, start_frame=None,
+               end_frame=None, granularity='1S', max_points=None,
+               method=None, envelope=False):
+    if max_points and method:
+        window = fio_data.window(job_id, log_type, io_type, start_frame,
+                                 end_frame)
+        if window is None:
+            return dict(error='404')
+        time, value = window
+        indices = _downsample(method, time, value, max_points)
+        return _plot_series(log_type, time[indices], value[indices])
+    if max_points:
+        granularity = _fit_granularity(fio_data, start_frame, end_frame,
+                                       max_points)
+    data_frame = fio_data.resample(job_id, log_type, io_type, granularity,
+                                   start_frame, end_frame, envelope)
+    if data_frame is None:
+        return dict(error='404')
+        # return error 404 with
+        # html status code 200
+        # so we can catch this error
+        # directly in frontend
+        # without triggering errors.
+    return _frame_to_dict(_scale(log_type, data_frame),
+                          granularity if max_points else None)
+
+
+def _cached_combined_frame(fio_data, log_type, io_type, start_frame,
+                           end_frame, granularity):
+    import pandas as pd
+    data_frame = fio_data.combined_dataframe(log_type, io_type)
+    if data_frame is None:
+        return None
+    if start_frame is not None and end_frame is not None:
+        # keep buckets overlapping the (start_frame, end_frame) window
+        base_ms = pyramid.granularity_to_ms(COMBINED_GRANULARITY)
+        data_frame = data_frame[
+            (data_frame.index > pd.Timedelta(int(start_frame), unit='ms')) &
+            (data_frame.index < pd.Timedelta(int(end_frame) + base_ms,
+                                             unit='ms'))]
+    return pyramid.regroup_frame(data_frame, granularity)
+
+
+def _combined_frame(fio_data, log_type, io_type, start_frame, end_frame,
+                    granularity, envelope):
+    import pandas as pd
     fio_results = []
     for fio_group_report in fio_data.group_reports:
         for job in fio_group_report.jobs:
-            fio_result = fio_data.to_dataframe(job.job_id, log_type, io_type)
+            fio_result = fio_data.resample(job.job_id, log_type, io_type,
+                                           granularity, start_frame,
+                                           end_frame, envelope)
             if fio_result is not None:
-                if "iops" not in log_type:
-                    fio_result[1] = fio_result[1].astype(float).values / 1000
-                    fio_result[1] = fio_result[1].round(2)
-                fio_result = fio_result.resample(granularity, label='right',
-                                                 closed='right').mean()
                 fio_results.append(fio_result)
     if not fio_results:
-        return jsonify(dict(error='404'))
-        # return error 404 with
-        # html status code 200
-        # so we can catch this error
-        # directly in frontend
-        # without triggering errors.
+        return None
+    # every job is bucketed on the same labels
     data_frame = pd.concat(fio_results, join='inner')
-    data_frame = data_frame.sort_index()
-    data_frame = data_frame.resample(granularity, label='right',
-                                     closed='right')
+    data_frame = data_frame.groupby(level=0)
     if "lat" in log_type:
-        data_frame = data_frame.mean()
+        aggregation = {1: 'mean'}
+        if envelope:
+            aggregation.update({'min': 'min', 'max': 'max'})
+        return data_frame.agg(aggregation)
+    return data_frame.sum()
+
+
+def combined_frame(fio_data, log_type, io_type, start_frame, end_frame,
+                   granularity, envelope):
+    granularity_ms = pyramid.granularity_to_ms(granularity)
+    base_ms = pyramid.granularity_to_ms(COMBINED_GRANULARITY)
+    if granularity_ms and granularity_ms % base_ms == 0:
+        data_frame = _cached_combined_frame(fio_data, log_type, io_type,
+                                            start_frame, end_frame,
+                                            granularity)
+        if data_frame is not None:
+            if "lat" not in log_type:
+                data_frame[1] = data_frame[1].fillna(0)
+            if not envelope:
+                data_frame = data_frame[[1]]
     else:
-        data_frame = data_frame.sum()
-    data_frame = data_frame.fillna('None')
-    if start_frame and end_frame:
-        data_frame = data_frame[(data_frame.index > Milli(start_frame)) &
-                                (data_frame.index < Milli(end_frame))]
-    return jsonify(dict(x=data_frame.index.astype('timedelta64[s]')
-                        .values.tolist(), y=data_frame[1].values.tolist()))
+        data_frame = _combined_frame(fio_data, log_type, io_type,
+                                     start_frame, end_frame, granularity,
+                                     envelope)
+    return data_frame
+
+
+def combined_series(fio_data, log_type, io_type, start_frame=None,
+                    end_frame=None, granularity='1S', max_points=None,
+                    method=None, envelope=False):
+    if max_points:
+        # downsampling methods pick points out of a finer series
+        granularity = _fit_granularity(
+            fio_data, start_frame, end_frame,
+            max_points * OVERSAMPLING if method else max_points)
+    data_frame = combined_frame(fio_data, log_type, io_type, start_frame,
+                                end_frame, granularity, envelope)
+    if data_frame is None:
+        return dict(error='404')
+    data_frame = _scale(log_type, data_frame)
+    if max_points and method:
+        data_frame = data_frame.dropna()
+        indices = _downsample(method,
+                              data_frame.index.values.astype(np.int64),
+                              data_frame[1].values, max_points)
+        data_frame = data_frame.iloc[indices]
+    return _frame_to_dict(data_frame, granularity if max_points else None)
+
+
+def _iter_json(fio_data, job_id, log_type, io_type):
+    def chunks():
+        for columns in fio_data.iter_columns(job_id, log_type, io_type):
+            yield _plot_series(log_type, columns['time'], columns['value'])
+    return export.iter_json(chunks, [('x', 'x'), ('y', 'y')])
+
+
+@fio_webviewer.route('/api/<fio_result_id>/<job_id>/<log_type>.json',
+                     methods=['GET'])
+@immutable_result
+def api_fio_json(fio_result_id, job_id, log_type):
+    args = _series_args(request.args)
+
+    fio_data = FioResult.new_from_database(data_path(), fio_result_id)
+    if args['start_frame'] is None and not args['max_points']:
+        if fio_data.is_large(job_id, log_type, args['io_type']):
+            if _series_format() != 'json':
+                return "Bad Request (too large, use max_points)", 400
+            # streamed, read a chunk at a time
+            return Response(stream_with_context(_iter_json(
+                fio_data, job_id, log_type, args['io_type'])),
+                mimetype=wire.JSON_MIMETYPE)
+        window = fio_data.window(job_id, log_type, args['io_type'])
+        time, value = window if window is not None else ([], [])
+        return _series_response([_plot_series(log_type, time, value)],
+                                single=True)
+    return _series_response([job_series(fio_data, job_id, log_type, **args)],
+                            single=True)
+
+
+@fio_webviewer.route('/api/<fio_result_id>/<log_type>.json',
+                     methods=['GET'])
+@immutable_result
+def api_fio_json_combined(fio_result_id, log_type):
+    args = _series_args(request.args)
+
+    fio_data = FioResult.new_from_database(data_path(), fio_result_id)
+    return _series_response([combined_series(fio_data, log_type, **args)],
+                            single=True)
+
+
+@fio_webviewer.route('/api/series', methods=['POST'])
+def api_series():
+    try:
+        requested_series = request.get_json()['series']
+        fio_results = {}
+        series = []
+        for requested in requested_series:
+            args = _series_args(requested)
+            log_type = requested['log_type']
+            job_id = requested.get('job')
+            fio_result_id = str(requested['result'])
+            if fio_result_id not in fio_results:
+                try:
+                    fio_results[fio_result_id] = \
+                        FioResult.new_from_database(data_path(), fio_result_id)
+                except NoResultFound:
+                    fio_results[fio_result_id] = None
+            fio_data = fio_results[fio_result_id]
+            if fio_data is None:
+                series.append(dict(error='404'))
+            elif job_id in (None, 'aggregated'):
+                series.append(combined_series(fio_data, log_type, **args))
+            else:
+                series.append(job_series(fio_data, job_id, log_type, **args))
+    except (BadRequest, KeyError, TypeError):
+        return "Bad Request", 400
+    return _series_response(series)
@@ -0,0 +1,173 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import os
+import tarfile
+import threading
+import zlib
+
+from werkzeug.utils import secure_filename
+
+from fiowebviewer.engine.exceptions import ArchiveError
+
+try:
+    import zstandard
+except ImportError:  # zstd compressed uploads are optional
+    zstandard = None
+
+CHUNK_SIZE = 1024 * 1024
+# default limit of the extracted size of an upload
+MAX_SIZE = 16 * 1024 ** 3
+MEMBER_PREFIX = 'fio-webviewer'
+GZIP_TYPES = ('application/gzip', 'application/x-gzip',
+              'application/x-tar+gzip')
+ZSTD_TYPES = ('application/zstd', 'application/x-zstd')
+# codecs of the downloaded archives, with their file extension and type
+CODECS = {
+    'gzip': ('.tar.gz', 'application/gzip'),
+    'zstd': ('.tar.zst', 'application/zstd'),
+    'none': ('.tar', 'application/x-tar'),
+}
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+LEVELS = {
+    'gzip': range(0, 10),
+    'zstd': range(1, 23),
+    'none': range(0, 1),
+}
+
+
+def is_archive(content_type):
+    return content_type in GZIP_TYPES + ZSTD_TYPES
+
+
+def _open(stream, content_type):
+    if content_type in ZSTD_TYPES:
+        if zstandard is None:
+            raise ArchiveError('zstd archives need the zstandard package')
+        stream = zstandard.ZstdDecompressor().stream_reader(stream)
+        return tarfile.open(fileobj=stream, mode='r|')
+    return tarfile.open(fileobj=stream, mode='r|gz')
+
+
+def _check_member(member, filenames):
+    filename = os.path.normpath(member.name)
+    if not member.isfile() or filename in filenames or \
+            filename != secure_filename(filename) or \
+            not filename.startswith(MEMBER_PREFIX):
+        raise ArchiveError('Unexpected archive member: {}'.format(
+            member.name))
+    return filename
+
+
+def extract_archive(stream, content_type, path, max_size=MAX_SIZE):
+    """
+    extract a compressed tar stream member by member into path, without
+    seeking nor holding whole members in memory, returns the file names
+    """
+    total_size = 0
+    filenames = []
+    try:
+        with _open(stream, content_type) as archive:
+            for member in archive:
+                if member.isdir():
+                    continue
+                filename = _check_member(member, filenames)
+                source = archive.extractfile(member)
+                with open(os.path.join(path, filename), 'wb') as f:
+                    for chunk in iter(lambda: source.read(CHUNK_SIZE), b''):
+                        total_size += len(chunk)
+                        if total_size > max_size:
+                            raise ArchiveError(
+                                'Archive larger than {} bytes'.format(
+                                    max_size))
+                        f.write(chunk)
+                filenames.append(filename)
+    except (tarfile.TarError, EOFError, zlib.error) as e:
+        raise ArchiveError('Broken archive: {}'.format(e))
+    return filenames
+
+
+class _Identity(object):
+
+    def compress(self, data):
+        return data
+
+    def flush(self):
+        return b''
+
+
+def _compressor(codec, level=None):
+    if codec == 'gzip':
+        return zlib.compressobj(GZIP_LEVEL if level is None else level,
+                                zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ArchiveError('zstd archives need the zstandard package')
+        return zstandard.ZstdCompressor(
+            level=ZSTD_LEVEL if level is None else level).compressobj()
+    if codec == 'none':
+        return _Identity()
+    raise ArchiveError('Unknown codec: {}'.format(codec))
+
+
+def _iter_member(path):
+    stat = os.stat(path)
+    info = tarfile.TarInfo(os.path.basename(path))
+    info.size = stat.st_size
+    info.mtime = int(stat.st_mtime)
+    info.mode = 0o644
+    yield info.tobuf(format=tarfile.GNU_FORMAT)
+    remaining = info.size
+    with open(path, 'rb') as f:
+        while remaining:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:  # truncated since stat, keep the header valid
+                chunk = bytes(min(CHUNK_SIZE, remaining))
+            remaining -= len(chunk)
+            yield chunk
+    padding = -info.size % tarfile.BLOCKSIZE
+    if padding:
+        yield bytes(padding)
+
+
+def iter_archive(paths, codec='gzip', level=None):
+    """
+    yield a compressed tar archive of the files in paths chunk by chunk,
+    neither the archive nor a whole member is held in memory
+    """
+    compressor = _compressor(codec, level)
+    size = 0
+    for path in paths:
+        for chunk in _iter_member(path):
+            size += len(chunk)
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+    # end of archive marker, padded to a full record like tarfile does
+    end = 2 * tarfile.BLOCKSIZE
+    end += -(size + end) % tarfile.RECORDSIZE
+    yield compressor.compress(bytes(end)) + compressor.flush()
+
+
+def cache_stream(chunks, path, on_complete=None):
+    """
+    pass chunks through while writing them to path, which only appears
+    once the stream was fully consumed, on_complete(path) is called then
+    """
+    tmp_path = '{}.{}.{}.tmp'.format(path, os.getpid(),
+                                     threading.get_ident())
+    complete = False
+    try:
+        with open(tmp_path, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+                yield chunk
+        complete = True
+        os.rename(tmp_path, path)
+        if on_complete is not None:
+            on_complete(path)
+    finally:
+        if not complete and os.path.exists(tmp_path):
+            os.remove(tmp_path)
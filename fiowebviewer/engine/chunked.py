@@ -0,0 +1,181 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import os
+import shutil
+
+import numpy as np
+
+from fiowebviewer.engine import (
+    pyramid,
+)
+from fiowebviewer.engine.logparser import (
+    LOG_DTYPE,
+    iter_fio_log,
+)
+from fiowebviewer.engine.run import fio_webviewer
+
+# memory a chunk may take and the size of a log from which it is processed
+# in chunks, both in bytes
+CHUNK_MEMORY = 64 * 1024 * 1024
+CHUNKED_THRESHOLD = 512 * 1024 * 1024
+# approximate memory of a parsed log line, columns and parser buffers
+ROW_BYTES = 128
+
+
+def chunk_rows():
+    memory = fio_webviewer.config.get('CHUNK_MEMORY', CHUNK_MEMORY)
+    return max(int(memory) // ROW_BYTES, 1)
+
+
+def use_chunks(nbytes):
+    """
+    whether data of nbytes bytes (a text log or the columns of a series)
+    should be processed in chunks
+    """
+    threshold = fio_webviewer.config.get('CHUNKED_THRESHOLD',
+                                         CHUNKED_THRESHOLD)
+    return threshold is not None and nbytes > threshold
+
+
+def iter_columns(columns, rows=None):
+    """
+    consecutive slices of (memory mapped) columns
+    """
+    rows = rows or chunk_rows()
+    length = len(columns['time'])
+    for start in range(0, length, rows):
+        yield {name: values[start:start + rows]
+               for name, values in columns.items()}
+
+
+def iter_log(log_path, ddir=None, rows=None):
+    """
+    columns of a text log in chunks, only the lines of the data direction
+    ddir if given
+    """
+    for columns in iter_fio_log(log_path, rows or chunk_rows()):
+        if ddir is not None:
+            if 'ddir' not in columns:
+                return
+            selected = columns['ddir'] == ddir
+            columns = {name: values[selected]
+                       for name, values in columns.items()}
+        yield columns
+
+
+class Buckets(object):
+    """
+    buckets aggregated chunk by chunk, chunks of sorted samples only ever
+    merge with the last bucket
+    """
+
+    def __init__(self):
+        self._parts = []
+
+    def add(self, data):
+        if not len(data):
+            return
+        if self._parts:
+            last = self._parts[-1]
+            if data[0, pyramid.BUCKET] < last[-1, pyramid.BUCKET]:
+                # samples out of order, merge everything
+                self._parts = [pyramid.merge(self.data(), data)]
+                return
+            if data[0, pyramid.BUCKET] == last[-1, pyramid.BUCKET]:
+                self._parts[-1] = pyramid.merge(last[-1:], data[:1])
+                self._parts.insert(-1, last[:-1])
+                data = data[1:]
+        self._parts.append(data)
+
+    def data(self):
+        if not self._parts:
+            return np.empty((0, len(pyramid.STATS)), dtype=np.int64)
+        if len(self._parts) > 1:
+            self._parts = [np.concatenate(self._parts)]
+        return self._parts[0]
+
+
+def aggregate(chunks, bucket_ms, start_ms=None, end_ms=None):
+    """
+    buckets of the samples of every chunk within (start_ms, end_ms), as
+    returned by pyramid.query(), only the buckets are kept in memory
+    """
+    buckets = Buckets()
+    for columns in chunks:
+        time = np.asarray(columns['time'])
+        value = np.asarray(columns['value'])
+        if start_ms is not None and end_ms is not None:
+            selected = (time > int(start_ms)) & (time < int(end_ms))
+            time = time[selected]
+            value = value[selected]
+        buckets.add(pyramid.aggregate_samples(time, value, bucket_ms))
+    return buckets.data(), bucket_ms
+
+
+class ColumnWriter(object):
+    """
+    append chunks of columns to .npy files of unknown final length,
+    the values are spooled to raw files which close() turns into .npy
+    """
+
+    def __init__(self, paths):
+        self.paths = paths
+        self.length = 0
+        self._spools = {name: open('{}.spool'.format(path), 'wb')
+                        for name, path in paths.items()}
+
+    def append(self, columns):
+        for name, spool in self._spools.items():
+            spool.write(np.ascontiguousarray(columns[name],
+                                             dtype=LOG_DTYPE).tobytes())
+        self.length += len(columns['time'])
+
+    def close(self):
+        for name, spool in self._spools.items():
+            spool.close()
+            path = self.paths[name]
+            tmp_path = '{}.tmp'.format(path)
+            with open(tmp_path, 'wb') as f:
+                np.lib.format.write_array_header_1_0(f, dict(
+                    descr=np.lib.format.dtype_to_descr(np.dtype(LOG_DTYPE)),
+                    fortran_order=False, shape=(self.length,)))
+                with open(spool.name, 'rb') as spooled:
+                    shutil.copyfileobj(spooled, f)
+            os.remove(spool.name)
+            os.rename(tmp_path, path)
+
+    def discard(self):
+        for spool in self._spools.values():
+            spool.close()
+            os.remove(spool.name)
+
+
+class SeriesWriter(object):
+    """
+    columns and pyramid of one series, written chunk by chunk
+    """
+
+    def __init__(self, log_path, names, column_path):
+        self.log_path = log_path
+        self.columns = ColumnWriter({name: column_path(log_path, name)
+                                     for name in names})
+        self.buckets = Buckets()
+
+    def append(self, columns):
+        self.columns.append(columns)
+        self.buckets.add(pyramid.aggregate_samples(
+            columns['time'], columns['value'], pyramid.LEVELS_MS[0]))
+
+    def close(self):
+        if not self.columns.length:
+            self.columns.discard()
+            return False
+        self.columns.close()
+        pyramid.write_levels(self.log_path,
+                             pyramid.build_levels(self.buckets.data()))
+        return True
+
+    def discard(self):
+        self.columns.discard()
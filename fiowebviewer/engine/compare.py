@@ -0,0 +1,168 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+from collections import namedtuple
+
+import numpy as np
+
+from fiowebviewer.engine.models import (
+    ROUNDING_RANGE,
+    FioResultDiff,
+)
+
+Difference = namedtuple('Difference',
+                        'subtraction percentage_difference state')
+STATES = np.array(['negative', 'neutral', 'positive', None], dtype=object)
+# position of the None state, used for metrics without a better direction
+NO_STATE = 3
+
+
+def metric_keys(group_report):
+    """
+    (key, inner_key) of every compared metric, inner_key is None for
+    metrics which are not stored in a dict
+    """
+    keys = []
+    for key, value in group_report.get_attributes():
+        if isinstance(value, dict):
+            keys.extend((key, inner_key) for inner_key in value)
+        else:
+            keys.append((key, None))
+    return keys
+
+
+def metric_name(key, inner_key):
+    if inner_key is None:
+        return key
+    return '{}[{}]'.format(key, inner_key)
+
+
+def direction(key):
+    """
+    1 when higher values are better, -1 when lower ones are, else 0
+    """
+    if "lat" in key or "cpu" in key:
+        return -1
+    if "bw" in key or "io" in key or "runtime" in key:
+        return 1
+    return 0
+
+
+def _value(group_report, key, inner_key):
+    value = getattr(group_report, key, None)
+    if inner_key is not None:
+        value = value.get(inner_key) if isinstance(value, dict) else None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _tolist(array):
+    # missing values (NaN) become null
+    return np.where(np.isnan(array), None, array).tolist()
+
+
+class Comparison(object):
+    """
+    metrics of several group reports in one matrix, one row per report,
+    compared against a baseline row or pairwise
+    """
+
+    def __init__(self, group_reports, baseline=0):
+        self.group_reports = list(group_reports)
+        self.baseline = baseline
+        self.keys = metric_keys(self.group_reports[0])
+        self.values = np.array([[_value(group_report, key, inner_key)
+                                 for key, inner_key in self.keys]
+                                for group_report in self.group_reports],
+                               dtype=float).reshape(len(self.group_reports),
+                                                    len(self.keys))
+        self.directions = np.array([direction(key) for key, _ in self.keys],
+                                   dtype=int)
+
+    def _compare(self, values, referenced):
+        subtraction = np.round(values - referenced, ROUNDING_RANGE)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percentage_difference = np.where(
+                referenced != 0, (values / referenced - 1) * 100,
+                values * 100)
+        percentage_difference = np.round(percentage_difference,
+                                         ROUNDING_RANGE)
+        state = np.sign(np.nan_to_num(percentage_difference)).astype(int) * \
+            self.directions + 1
+        state[np.isnan(percentage_difference) |
+              (self.directions == 0)] = NO_STATE
+        return subtraction, percentage_difference, STATES[state]
+
+    def against(self, baseline=None):
+        """
+        subtraction, percentage difference and state of every report
+        against the baseline one, each of shape (reports, metrics)
+        """
+        if baseline is None:
+            baseline = self.baseline
+        return self._compare(self.values, self.values[baseline])
+
+    def pairwise(self):
+        """
+        the same for every pair, [i, j] compares report i against j
+        """
+        return self._compare(self.values[:, np.newaxis, :],
+                             self.values[np.newaxis, :, :])
+
+    def diffs(self, baseline=None):
+        """
+        one FioResultDiff per report, as used by the comparison page
+        """
+        subtraction, percentage_difference, state = self.against(baseline)
+        diffs = []
+        for row in range(len(self.group_reports)):
+            diff = FioResultDiff()
+            for column, (key, inner_key) in enumerate(self.keys):
+                difference = Difference(
+                    subtraction=float(subtraction[row, column]),
+                    percentage_difference=float(
+                        percentage_difference[row, column]),
+                    state=state[row, column])
+                if inner_key is None:
+                    diff.__dict__[key] = difference
+                else:
+                    diff.__dict__.setdefault(key, {})[inner_key] = difference
+            diffs.append(diff)
+        return diffs
+
+    def to_dict(self, pairwise=False):
+        subtraction, percentage_difference, state = \
+            self.pairwise() if pairwise else self.against()
+        return dict(
+            metrics=[metric_name(key, inner_key)
+                     for key, inner_key in self.keys],
+            values=_tolist(self.values),
+            baseline=None if pairwise else self.baseline,
+            subtraction=_tolist(subtraction),
+            percentage_difference=_tolist(percentage_difference),
+            state=state.tolist(),
+        )
+
+
+def compare_results(fio_results, baseline=None):
+    """
+    compare every group report of fio_results against the first report
+    of the baseline result (a dir_name, the first result by default),
+    returns the (fio_result, group_report) pairs and their Comparison
+    """
+    reports = [(fio_result, group_report) for fio_result in fio_results
+               for group_report in fio_result.group_reports]
+    if not reports:
+        raise ValueError('Nothing to compare')
+    index = 0
+    if baseline is not None:
+        indices = [index for index, (fio_result, _) in enumerate(reports)
+                   if fio_result.dir_name == str(baseline)]
+        if not indices:
+            raise ValueError('Unknown baseline: {}'.format(baseline))
+        index = indices[0]
+    return reports, Comparison([group_report for _, group_report in reports],
+                               baseline=index)
@@ -5,12 +5,14 @@
 from sqlalchemy import (
     Column,
     DateTime,
+    Float,
     Integer,
     String,
     create_engine,
 )
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import (
+    backref,
     relationship,
     sessionmaker,
 )
@@ -30,7 +32,9 @@ class Result(Base):
     __tablename__ = 'results'
     id = Column(Integer, primary_key=True)
     name = Column(String(64), nullable=True)
-    date_submitted = Column(DateTime, nullable=False)
+    date_submitted = Column(DateTime, nullable=False, index=True)
+    # post-upload processing step, NULL for results uploaded before it
+    status = Column(String(16), nullable=True, index=True)
 
     def __repr__(self):
         return self.date_submitted
@@ -39,9 +43,45 @@ class Result(Base):
 class Tag(Base):
     __tablename__ = 'tags'
     id = Column(Integer, primary_key=True)
-    tag = Column(String, nullable=False)
-    result_id = Column(Integer, ForeignKey("results.id"), nullable=False)
-    result = relationship(Result)
+    tag = Column(String, nullable=False, index=True)
+    result_id = Column(Integer, ForeignKey("results.id"), nullable=False,
+                       index=True)
+    result = relationship(Result, backref=backref(
+        'tags', cascade='all, delete-orphan'))
 
     def __repr__(self):
         return self.tag
+
+
+class Metrics(Base):
+    """
+    summary numbers of a group report, written at upload time
+    """
+    __tablename__ = 'metrics'
+    id = Column(Integer, primary_key=True)
+    result_id = Column(Integer, ForeignKey("results.id"), nullable=False,
+                       index=True)
+    result = relationship(Result, backref=backref(
+        'metrics', cascade='all, delete-orphan'))
+    group_id = Column(Integer, nullable=False)
+    jobname = Column(String, nullable=True)
+    rw = Column(String, nullable=True, index=True)
+    read_iops = Column(Integer, index=True)
+    read_bw_kbps = Column(Integer, index=True)
+    read_runtime_ms = Column(Integer)
+    read_clat_mean_usec = Column(Float, index=True)
+    read_clat_p50_usec = Column(Float)
+    read_clat_p95_usec = Column(Float)
+    read_clat_p99_usec = Column(Float, index=True)
+    read_clat_p999_usec = Column(Float)
+    write_iops = Column(Integer, index=True)
+    write_bw_kbps = Column(Integer, index=True)
+    write_runtime_ms = Column(Integer)
+    write_clat_mean_usec = Column(Float, index=True)
+    write_clat_p50_usec = Column(Float)
+    write_clat_p95_usec = Column(Float)
+    write_clat_p99_usec = Column(Float, index=True)
+    write_clat_p999_usec = Column(Float)
+
+    def __repr__(self):
+        return '{}:{}'.format(self.result_id, self.group_id)
@@ -0,0 +1,364 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+
+from fiowebviewer.engine.run import fio_webviewer
+
+# the index is kept in a directory of its own, next to the ones of results;
+# hidden directories like it are not part of the cache
+INDEX_DIRNAME = '.index'
+INDEX_FILENAME = 'cache.db'
+POLICIES = ('lru', 'lfu')
+CACHE_EVICTION = 'lru'
+# pruning frees space down to this fraction of the budget
+LOW_WATERMARK = 0.9
+# seconds between two checks of the cache size by a process
+CHECK_INTERVAL = 10
+# files being written, never indexed nor evicted
+PARTIAL_SUFFIXES = ('.tmp', '.spool')
+# seconds the hits and misses of a process are buffered before they are
+# written to the index
+FLUSH_INTERVAL = 5
+ORDER = {
+    'lru': 'last_access, hits',
+    'lfu': 'hits, last_access',
+}
+
+_last_check = 0
+_prune_lock = threading.Lock()
+# connections of a thread to the indexes, by path
+_local = threading.local()
+# accesses not written to the indexes yet, by cache path
+_pending = {}
+_pending_lock = threading.Lock()
+
+
+class DiskCache(object):
+    """
+    size and access index of the files below a cache directory, kept in
+    a sqlite database shared by every process using the directory
+
+    Evicted files are unlinked, readers which already opened them keep
+    reading, the others see a miss.
+    """
+
+    def __init__(self, path, max_bytes=None, policy=CACHE_EVICTION):
+        if policy not in POLICIES:
+            raise ValueError('Unknown eviction policy: {}'.format(policy))
+        self.path = path
+        self.max_bytes = max_bytes
+        self.policy = policy
+
+    def _connect(self):
+        """
+        the connection of the thread to the index, opened once per
+        thread and process
+        """
+        index_dir = os.path.join(self.path, INDEX_DIRNAME)
+        index_path = os.path.join(index_dir, INDEX_FILENAME)
+        if getattr(_local, 'pid', None) != os.getpid():
+            # connections must not be shared with a forked process
+            _local.pid = os.getpid()
+            _local.connections = {}
+        try:
+            inode = os.stat(index_path).st_ino
+        except FileNotFoundError:
+            inode = None
+        connection, connected_inode = _local.connections.get(
+            index_path, (None, None))
+        if connection is not None and connected_inode == inode:
+            return connection
+        if connection is not None:  # the cache directory was wiped
+            connection.close()
+        if not os.path.isdir(index_dir):
+            os.makedirs(index_dir, exist_ok=True)
+        connection = sqlite3.connect(index_path, timeout=30,
+                                     isolation_level=None)
+        # readers do not block writers, commits do not wait for the disk
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        connection.execute('CREATE TABLE IF NOT EXISTS entries ('
+                           'path TEXT PRIMARY KEY, size INTEGER NOT NULL, '
+                           'hits INTEGER NOT NULL, last_access REAL NOT NULL)')
+        connection.execute('CREATE TABLE IF NOT EXISTS counters ('
+                           'name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+        _local.connections[index_path] = (connection,
+                                          os.stat(index_path).st_ino)
+        return connection
+
+    def _key(self, path):
+        return os.path.relpath(path, self.path)
+
+    def _count(self, connection, name, value):
+        connection.execute('INSERT OR IGNORE INTO counters VALUES (?, 0)',
+                           (name,))
+        connection.execute('UPDATE counters SET value = value + ? '
+                           'WHERE name = ?', (value, name))
+
+    def _record_access(self, path):
+        now = time.time()
+        with _pending_lock:
+            pending = _pending.get(self.path)
+            if pending is None or pending['pid'] != os.getpid():
+                pending = _pending[self.path] = dict(
+                    pid=os.getpid(), since=now, hits={}, misses=0)
+            if path is None:
+                pending['misses'] += 1
+            else:
+                key = self._key(path)
+                hits, _ = pending['hits'].get(key, (0, now))
+                pending['hits'][key] = (hits + 1, now)
+            due = now - pending['since'] >= FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def record_hit(self, path):
+        self._record_access(path)
+
+    def record_miss(self):
+        self._record_access(None)
+
+    def flush(self):
+        """
+        write the hits and misses buffered by the process to the index
+        """
+        with _pending_lock:
+            pending = _pending.pop(self.path, None)
+        if pending is None or pending['pid'] != os.getpid():
+            return
+        connection = self._connect()
+        with connection:
+            for key, (hits, last_access) in pending['hits'].items():
+                updated = connection.execute(
+                    'UPDATE entries SET hits = hits + ?, '
+                    'last_access = MAX(last_access, ?) WHERE path = ?',
+                    (hits, last_access, key)).rowcount
+                path = os.path.join(self.path, key)
+                if not updated and os.path.isfile(path):
+                    connection.execute(
+                        'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)',
+                        (key, os.path.getsize(path), hits, last_access))
+            hits = sum(hits for hits, _ in pending['hits'].values())
+            if hits:
+                self._count(connection, 'hits', hits)
+            if pending['misses']:
+                self._count(connection, 'misses', pending['misses'])
+
+    def record_write(self, path):
+        """
+        record a written file, or the new size of one appended to
+        """
+        connection = self._connect()
+        with connection:
+            connection.execute(
+                'INSERT INTO entries VALUES (?, ?, 0, ?) '
+                'ON CONFLICT(path) DO UPDATE SET size = excluded.size, '
+                'last_access = excluded.last_access',
+                (self._key(path), os.path.getsize(path), time.time()))
+
+    def forget(self, directory):
+        """
+        drop the entries below directory, after it was removed
+        """
+        key = self._key(directory)
+        connection = self._connect()
+        with connection:
+            connection.execute(
+                "DELETE FROM entries WHERE path = ? OR "
+                "substr(path, 1, ?) = ?",
+                (key, len(key) + 1, key + os.sep))
+
+    def _files(self):
+        for directory, dirnames, filenames in os.walk(self.path):
+            if directory == self.path:
+                dirnames[:] = [dirname for dirname in dirnames
+                               if not dirname.startswith('.')]
+            for filename in filenames:
+                if filename.endswith(PARTIAL_SUFFIXES):
+                    continue
+                path = os.path.join(directory, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:  # removed meanwhile
+                    continue
+                yield self._key(path), stat.st_size, stat.st_mtime
+
+    def sync(self):
+        """
+        index the files written without being recorded (e.g. by older
+        versions) and drop the entries of removed files
+        """
+        files = {key: (size, mtime) for key, size, mtime in self._files()}
+        connection = self._connect()
+        with connection:
+            indexed = {key: size for key, size in connection.execute(
+                'SELECT path, size FROM entries')}
+            connection.executemany(
+                'DELETE FROM entries WHERE path = ?',
+                [(key,) for key in indexed if key not in files])
+            connection.executemany(
+                'INSERT OR IGNORE INTO entries VALUES (?, ?, 0, ?)',
+                [(key, size, mtime) for key, (size, mtime)
+                 in files.items() if key not in indexed])
+            connection.executemany(
+                'UPDATE entries SET size = ? WHERE path = ?',
+                [(size, key) for key, (size, _) in files.items()
+                 if key in indexed and indexed[key] != size])
+
+    def size(self):
+        connection = self._connect()
+        return connection.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def prune(self, max_bytes=None, dry_run=False):
+        """
+        evict entries in the order of the policy until the cache takes
+        at most LOW_WATERMARK of max_bytes, returns the evicted paths
+        and the number of freed bytes
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        if max_bytes is None:
+            return [], 0
+        self.flush()
+        self.sync()
+        target = int(max_bytes * LOW_WATERMARK)
+        connection = self._connect()
+        total = connection.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        if total <= max_bytes:
+            return [], 0
+        evicted = []
+        freed = 0
+        for key, size in connection.execute(
+                'SELECT path, size FROM entries ORDER BY {}'.format(
+                    ORDER[self.policy])).fetchall():
+            if total - freed <= target:
+                break
+            evicted.append(key)
+            freed += size
+        if not dry_run:
+            for key in evicted:
+                try:
+                    os.remove(os.path.join(self.path, key))
+                except FileNotFoundError:  # evicted by another process
+                    pass
+            with connection:
+                connection.executemany(
+                    'DELETE FROM entries WHERE path = ?',
+                    [(key,) for key in evicted])
+        return evicted, freed
+
+    def stats(self, top=10):
+        """
+        size, entries, hit ratio and the results taking the most space
+        """
+        self.flush()
+        connection = self._connect()
+        size, entries = connection.execute(
+            'SELECT COALESCE(SUM(size), 0), COUNT(*) '
+            'FROM entries').fetchone()
+        counters = dict(connection.execute(
+            'SELECT name, value FROM counters'))
+        consumers = {}
+        for key, entry_size in connection.execute(
+                'SELECT path, size FROM entries'):
+            result = key.split(os.sep, 1)[0]
+            consumers[result] = consumers.get(result, 0) + entry_size
+        hits = counters.get('hits', 0)
+        misses = counters.get('misses', 0)
+        return dict(
+            size=size,
+            entries=entries,
+            max_bytes=self.max_bytes,
+            policy=self.policy,
+            hits=hits,
+            misses=misses,
+            hit_ratio=hits / (hits + misses) if hits + misses else None,
+            top=[dict(result=result, size=consumer_size)
+                 for result, consumer_size in sorted(
+                     consumers.items(), key=lambda item: -item[1])[:top]],
+        )
+
+
+def get_cache():
+    """
+    the cache of the configured CACHE_PATH, None when caching is disabled
+    """
+    path = fio_webviewer.config.get('CACHE_PATH')
+    if path is None:
+        return None
+    return DiskCache(path, fio_webviewer.config.get('CACHE_MAX_BYTES'),
+                     fio_webviewer.config.get('CACHE_EVICTION',
+                                              CACHE_EVICTION))
+
+
+def _prune(disk_cache):
+    if not _prune_lock.acquire(blocking=False):
+        return  # already pruning
+    try:
+        disk_cache.prune()
+    except (OSError, sqlite3.Error) as e:
+        fio_webviewer.logger.exception(e)
+    finally:
+        _prune_lock.release()
+
+
+@atexit.register
+def _flush_pending():
+    for path in list(_pending):
+        if not os.path.isdir(path):  # removed meanwhile
+            continue
+        try:
+            DiskCache(path).flush()
+        except sqlite3.Error:
+            pass
+
+
+def _track(method, *args):
+    disk_cache = get_cache()
+    if disk_cache is None:
+        return None
+    try:
+        getattr(disk_cache, method)(*args)
+    except (OSError, sqlite3.Error):
+        # tracking is best effort, it never fails a request
+        return None
+    return disk_cache
+
+
+def hit(path):
+    _track('record_hit', path)
+
+
+def miss():
+    _track('record_miss')
+
+
+def stored(path):
+    """
+    record a written file, prune in the background once the cache went
+    over its budget
+    """
+    global _last_check
+    disk_cache = _track('record_write', path)
+    if disk_cache is None or disk_cache.max_bytes is None or \
+            time.time() - _last_check < CHECK_INTERVAL:
+        return
+    _last_check = time.time()
+    try:
+        over_budget = disk_cache.size() > disk_cache.max_bytes
+    except sqlite3.Error:
+        return
+    if over_budget:
+        threading.Thread(target=_prune, args=(disk_cache,),
+                         daemon=True).start()
+
+
+def forget(directory):
+    _track('forget', directory)
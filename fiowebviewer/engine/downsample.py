@@ -0,0 +1,61 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import numpy as np
+
+METHODS = ('lttb', 'm4')
+
+
+def lttb(x, y, threshold):
+    """
+    largest triangle three buckets, return indices of the kept points
+    """
+    size = len(x)
+    if threshold >= size or threshold < 3:
+        return np.arange(size)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    bucket_size = (size - 2) / float(threshold - 2)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = size - 1
+    selected = 0
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, size)
+        if end < next_end:
+            avg_x = x[end:next_end].mean()
+            avg_y = y[end:next_end].mean()
+        else:
+            avg_x = x[-1]
+            avg_y = y[-1]
+        area = np.abs((x[selected] - avg_x) * (y[start:end] - y[selected]) -
+                      (x[selected] - x[start:end]) * (avg_y - y[selected]))
+        selected = start + int(np.argmax(area))
+        indices[bucket + 1] = selected
+    return indices
+
+
+def m4(x, y, buckets):
+    """
+    first, last, min and max point of each of the x-axis buckets,
+    return sorted indices of the kept points
+    """
+    size = len(x)
+    if size <= 4 * buckets or buckets < 1:
+        return np.arange(size)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    span = x[-1] - x[0]
+    if span <= 0:
+        return np.array([0, size - 1])
+    bucket = np.minimum(((x - x[0]) * buckets / span).astype(np.int64),
+                        buckets - 1)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], size] - 1
+    # within every bucket points are ordered by value
+    order = np.lexsort((y, bucket))
+    return np.unique(np.concatenate((starts, ends, order[starts],
+                                     order[ends])))
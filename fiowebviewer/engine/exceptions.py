@@ -5,3 +5,7 @@
 
 class FioOutputError(Exception):
     pass
+
+
+class ArchiveError(Exception):
+    pass
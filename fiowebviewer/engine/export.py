@@ -0,0 +1,77 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import json
+import zlib
+from io import StringIO
+
+import numpy as np
+
+# rows formatted at once, bounds the memory used by a streamed export
+CHUNK_ROWS = 65536
+# same line terminator as csv.writer
+LINE_TERMINATOR = '\r\n'
+GZIP_LEVEL = 6
+
+
+def iter_csv(columns, fmt, chunk_rows=CHUNK_ROWS):
+    """
+    yield the rows of equally long columns as csv text, chunk by chunk,
+    columns may be memory mapped, only one chunk is read at a time
+    """
+    size = len(columns[0]) if columns else 0
+    for start in range(0, size, chunk_rows):
+        chunk = np.column_stack([np.asarray(column[start:start + chunk_rows])
+                                 for column in columns])
+        data_buf = StringIO()
+        np.savetxt(data_buf, chunk, fmt=fmt, delimiter=',',
+                   newline=LINE_TERMINATOR)
+        yield data_buf.getvalue()
+
+
+def iter_json(chunks, fields):
+    """
+    yield a json object of number arrays as text, chunk by chunk, fields
+    are pairs of a key and the column of the chunks it holds; chunks()
+    iterates over the columns anew for every field
+    """
+    yield '{'
+    for index, (key, column) in enumerate(fields):
+        yield '{}{}:['.format(',' if index else '', json.dumps(key))
+        separator = ''
+        for columns in chunks():
+            values = np.asarray(columns[column])
+            if len(values):
+                yield separator + json.dumps(values.astype(float).tolist(),
+                                             separators=(',', ':'))[1:-1]
+                separator = ','
+        yield ']'
+    yield '}'
+
+
+def iter_frame_csv(data_frame, chunk_rows=CHUNK_ROWS):
+    """
+    yield a bucketed frame as csv rows of the bucket label in msec
+    followed by the mean (and the envelope) of the bucket
+    """
+    time = data_frame.index.values.astype('timedelta64[ms]').astype(np.int64)
+    columns = [time, data_frame[1].values.astype(float)]
+    fmt = ['%d', '%.3f']
+    if 'min' in data_frame.columns:
+        columns += [data_frame['min'].values.astype(float),
+                    data_frame['max'].values.astype(float)]
+        fmt += ['%.3f', '%.3f']
+    return iter_csv(columns, fmt, chunk_rows)
+
+
+def gzip_chunks(chunks, level=GZIP_LEVEL):
+    """
+    compress a stream of text chunks into a single gzip member
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
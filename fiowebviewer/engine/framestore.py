@@ -0,0 +1,276 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import fcntl
+import json
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+
+FILENAME = 'frames.fwvc'
+MAGIC = b'FWVC'
+# little-endian uint32 size of the footer of a record, then MAGIC
+TRAILER = struct.Struct('<I4s')
+# columns start on multiples of 64 bytes, so numpy can view them
+ALIGNMENT = 64
+
+
+def _padding(size):
+    return -size % ALIGNMENT
+
+
+def _read_footers(buffer, start, end):
+    """
+    footers of the records between start and end, newest first, None
+    when end is not the end of a record (a writer did not complete)
+    """
+    footers = []
+    while end > start:
+        if end - start < TRAILER.size:
+            return None
+        size, magic = TRAILER.unpack_from(buffer, end - TRAILER.size)
+        footer_start = end - TRAILER.size - size
+        if magic != MAGIC or footer_start < start:
+            return None
+        try:
+            footer = json.loads(bytes(buffer[footer_start:end -
+                                             TRAILER.size]).decode())
+        except ValueError:
+            return None
+        if not start <= footer['start'] < footer_start:
+            return None
+        footers.append(footer)
+        end = footer['start']
+    return footers
+
+
+def _name(name):
+    # numpy scalars, e.g. in object indexes, are not json serializable
+    return name.item() if isinstance(name, np.generic) else name
+
+
+def _record(start, key, data_frame):
+    """
+    bytes of a record appended at offset start: the index and every
+    column of data_frame, a json footer describing them and the trailer
+    """
+    arrays = [np.ascontiguousarray(data_frame.index.values)]
+    arrays += [np.ascontiguousarray(data_frame[name].values)
+               for name in data_frame.columns]
+    if any(values.dtype.hasobject for values in arrays):
+        raise TypeError('Only numeric frames can be stored')
+    parts = [bytes(_padding(start))]
+    offset = start + len(parts[0])
+    fields = []
+    for values in arrays:
+        fields.append(dict(dtype=values.dtype.str, offset=offset))
+        data = values.tobytes()
+        parts.append(data + bytes(_padding(len(data))))
+        offset += len(parts[-1])
+    footer = json.dumps(dict(
+        start=start, key=key, rows=len(data_frame),
+        index=dict(fields[0], name=_name(data_frame.index.name)),
+        columns=[dict(field, name=_name(name)) for name, field
+                 in zip(data_frame.columns, fields[1:])],
+    )).encode()
+    parts.append(footer + TRAILER.pack(len(footer), MAGIC))
+    return b''.join(parts)
+
+
+class FrameStore(object):
+    """
+    every cached frame of a result in a single append-only file, read
+    through memory maps: the columns of the frames, each followed by a
+    json footer indexing them
+
+    Appends are serialized with a lock on the file, readers only lock
+    it to index the records appended since their last look. A file
+    left incomplete by a writer is replaced by the next one. Only the
+    frames read keep the file mapped, so the space of an evicted file
+    is freed once they are gone.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._inode = None
+        self._size = 0
+        self._frames = {}
+
+    def _reset(self):
+        self._inode = None
+        self._size = 0
+        self._frames = {}
+
+    def _load(self, fd, stat):
+        """
+        index the records of the locked file fd, False when the file is
+        incomplete
+        """
+        if stat.st_ino != self._inode:
+            self._reset()
+        if stat.st_size == self._size:
+            return True
+        buffer = mmap.mmap(fd, stat.st_size, access=mmap.ACCESS_READ)
+        try:
+            footers = _read_footers(buffer, self._size, stat.st_size)
+        finally:
+            buffer.close()
+        if footers is None:
+            self._reset()
+            return False
+        for footer in reversed(footers):
+            self._frames[footer['key']] = footer
+        self._inode = stat.st_ino
+        self._size = stat.st_size
+        return True
+
+    def _refresh(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:  # not written yet or evicted
+            self._reset()
+            return
+        if stat.st_ino == self._inode and stat.st_size == self._size:
+            return
+        try:
+            with open(self.path, 'rb') as f:
+                fcntl.flock(f, fcntl.LOCK_SH)
+                try:
+                    self._load(f.fileno(), os.fstat(f.fileno()))
+                finally:
+                    # the memory map shares the lock, it outlives f
+                    fcntl.flock(f, fcntl.LOCK_UN)
+        except FileNotFoundError:
+            self._reset()
+
+    def _open_locked(self):
+        """
+        the store file opened for appending and locked, the lock taken on
+        the file which is at path once it is held
+        """
+        while True:
+            f = open(self.path, 'a+b')
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                if os.stat(self.path).st_ino == os.fstat(f.fileno()).st_ino:
+                    return f
+            except FileNotFoundError:
+                pass
+            # replaced or evicted while waiting for the lock
+            f.close()
+
+    def keys(self):
+        with self._lock:
+            self._refresh()
+            return list(self._frames)
+
+    def __contains__(self, key):
+        with self._lock:
+            self._refresh()
+            return key in self._frames
+
+    def size(self):
+        with self._lock:
+            self._refresh()
+            return self._size
+
+    def read(self, key, columns=None, start=None, stop=None):
+        """
+        the frame stored under key, None when there is none; only the
+        given columns and the rows in [start, stop) are read from disk
+        """
+        import pandas as pd
+        with self._lock:
+            self._refresh()
+            footer = self._frames.get(key)
+            inode = self._inode
+        if footer is None:
+            return None
+        try:
+            with open(self.path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                if stat.st_ino != inode:  # replaced or evicted meanwhile
+                    return None
+                # the frame keeps the map, not the store
+                buffer = mmap.mmap(f.fileno(), stat.st_size,
+                                   access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+        fields = {field['name']: field for field in footer['columns']}
+        if columns is None:
+            columns = list(fields)
+        missing = [name for name in columns if name not in fields]
+        if missing:
+            raise KeyError(missing)
+        rows = slice(start, stop)
+
+        def view(field):
+            return np.frombuffer(buffer, dtype=field['dtype'],
+                                 count=footer['rows'],
+                                 offset=field['offset'])[rows]
+        index = pd.Index(view(footer['index']), name=footer['index']['name'])
+        return pd.DataFrame({name: view(fields[name]) for name in columns},
+                            index=index, columns=columns)
+
+    def write(self, key, data_frame):
+        """
+        append data_frame under key, False when another writer stored
+        it meanwhile
+        """
+        directory = os.path.dirname(self.path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory, exist_ok=True)
+        with self._lock, self._open_locked() as f:
+            try:
+                stat = os.fstat(f.fileno())
+                if not self._load(f.fileno(), stat):
+                    self._replace(key, data_frame)
+                    return True
+                if key in self._frames:
+                    return False
+                f.write(_record(stat.st_size, key, data_frame))
+                f.flush()
+                self._load(f.fileno(), os.fstat(f.fileno()))
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return True
+
+    def _replace(self, key, data_frame):
+        # readers which mapped the incomplete file keep their map
+        tmp_path = '{}.{}.{}.tmp'.format(self.path, os.getpid(),
+                                         threading.get_ident())
+        with open(tmp_path, 'wb') as f:
+            f.write(_record(0, key, data_frame))
+        os.rename(tmp_path, self.path)
+        self._reset()
+
+
+def migrate(cache_dir, remove=True):
+    """
+    move the frames of the per-series .h5 files of an older version
+    into the store of cache_dir, returns the number of migrated files;
+    reading them needs PyTables
+    """
+    import pandas as pd
+    store = FrameStore(os.path.join(cache_dir, FILENAME))
+    migrated = 0
+    for filename in sorted(os.listdir(cache_dir)):
+        if not filename.endswith('.h5'):
+            continue
+        path = os.path.join(cache_dir, filename)
+        key = filename[:-len('.h5')]
+        if key not in store:
+            data_frame = pd.read_hdf(path, 'df')
+            if '.combined.' in key:
+                # stored as 'mean', PyTables cannot mix int and str names
+                data_frame = data_frame.rename(columns={'mean': 1})
+            store.write(key, data_frame)
+        if remove:
+            os.remove(path)
+        migrated += 1
+    return migrated
@@ -0,0 +1,202 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import fcntl
+import os
+import threading
+from concurrent.futures import (
+    ProcessPoolExecutor,
+)
+
+from sqlalchemy.exc import (
+    SQLAlchemyError,
+)
+
+from fiowebviewer.engine import (
+    database,
+    models,
+    series,
+)
+from fiowebviewer.engine.database import (
+    DBSession,
+    Result,
+)
+from fiowebviewer.engine.run import fio_webviewer
+
+logger = fio_webviewer.logger
+
+STATUS_QUEUED = 'queued'
+STATUS_CONVERTING = 'converting'
+STATUS_SUMMARIZING = 'summarizing'
+STATUS_READY = 'ready'
+STATUS_FAILED = 'failed'
+# processing steps in order, the index of the current one is the progress
+STEPS = (STATUS_QUEUED, STATUS_CONVERTING, STATUS_SUMMARIZING, STATUS_READY)
+PROCESSING = STEPS[:-1]
+# 'pool' runs the steps in a process pool of the web server, 'external'
+# leaves them to ingest_worker.py and 'inline' runs them in the request
+INGEST_MODE = 'pool'
+INGEST_WORKERS = 2
+# holds a lock file per result while a worker processes it, below
+# CACHE_PATH, or DATA_PATH when caching is disabled, never in a result
+LOCK_DIRNAME = '.ingest'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def init_worker():
+    # connections inherited from the parent process must not be shared
+    database.engine.dispose()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=fio_webviewer.config.get('INGEST_WORKERS',
+                                                     INGEST_WORKERS),
+                initializer=init_worker)
+        return _executor
+
+
+def _try_lock(base_dir, result_id):
+    """
+    the lock file of a result, locked, None when a worker holds it
+    """
+    lock_dir = os.path.join(
+        fio_webviewer.config.get('CACHE_PATH') or base_dir, LOCK_DIRNAME)
+    os.makedirs(lock_dir, exist_ok=True)
+    f = open(os.path.join(lock_dir, '{}.lock'.format(result_id)), 'a')
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        f.close()
+        return None
+    return f
+
+
+def set_status(result_id, status, expected=None):
+    """
+    returns False when the status was not the expected one
+    """
+    session = DBSession()
+    try:
+        query = session.query(Result).filter(Result.id == result_id)
+        if expected is not None:
+            query = query.filter(Result.status == expected)
+        updated = query.update({Result.status: status},
+                               synchronize_session=False)
+        session.commit()
+    finally:
+        session.close()
+    return updated == 1
+
+
+def process_result(base_dir, result_id):
+    """
+    run the post-upload steps of a queued result, returns its final
+    status or None when it was claimed by another worker
+    """
+    lock = _try_lock(base_dir, result_id)
+    if lock is None:
+        return None
+    # closing the file releases the lock, also when the worker dies
+    with lock:
+        if not set_status(result_id, STATUS_CONVERTING,
+                          expected=STATUS_QUEUED):
+            return None
+        try:
+            # logs are converted to the binary columnar form once, so
+            # plots and exports never have to parse the text logs again
+            series.convert_result(os.path.join(base_dir, str(result_id)))
+            set_status(result_id, STATUS_SUMMARIZING)
+            models.save_metrics(base_dir, result_id)
+        except Exception as e:
+            logger.exception(e)
+            set_status(result_id, STATUS_FAILED)
+            return STATUS_FAILED
+        set_status(result_id, STATUS_READY)
+        return STATUS_READY
+
+
+def submit(base_dir, result_id):
+    mode = fio_webviewer.config.get('INGEST_MODE', INGEST_MODE)
+    if mode == 'inline':
+        return process_result(base_dir, result_id)
+    if mode == 'pool':
+        _get_executor().submit(process_result, base_dir, result_id)
+    return STATUS_QUEUED
+
+
+def resume(base_dir):
+    """
+    submit the results a restart left queued or a crash left processing
+    to the pool, returns their number; only done in the 'pool' mode
+    """
+    if fio_webviewer.config.get('INGEST_MODE', INGEST_MODE) != 'pool':
+        return 0
+    try:
+        requeue_stale(base_dir)
+        result_ids = pending_results()
+    except SQLAlchemyError as e:  # e.g. the tables are not created yet
+        logger.warning('Results not resumed: %s', e)
+        return 0
+    for result_id in result_ids:
+        _get_executor().submit(process_result, base_dir, result_id)
+    return len(result_ids)
+
+
+def pending_results():
+    session = DBSession()
+    try:
+        return [result_id for result_id, in
+                session.query(Result.id).
+                filter(Result.status == STATUS_QUEUED).
+                order_by(Result.id).all()]
+    finally:
+        session.close()
+
+
+def requeue_stale(base_dir):
+    """
+    queue the results again whose worker died while processing them,
+    returns their ids
+    """
+    session = DBSession()
+    try:
+        processing = session.query(Result.id, Result.status).filter(
+            Result.status.in_([STATUS_CONVERTING, STATUS_SUMMARIZING])).\
+            order_by(Result.id).all()
+    finally:
+        session.close()
+    requeued = []
+    for result_id, status in processing:
+        lock = _try_lock(base_dir, result_id)
+        if lock is None:  # still processed
+            continue
+        with lock:
+            if set_status(result_id, STATUS_QUEUED, expected=status):
+                requeued.append(result_id)
+    if requeued:
+        logger.warning('Requeued results left processing: %s', requeued)
+    return requeued
+
+
+def process_pending(base_dir, executor=None):
+    """
+    process every queued result, and the ones left processing by a dead
+    worker, returns the number of processed ones
+    """
+    requeue_stale(base_dir)
+    result_ids = pending_results()
+    if executor is None:
+        statuses = [process_result(base_dir, result_id)
+                    for result_id in result_ids]
+    else:
+        statuses = list(executor.map(process_result,
+                                     [base_dir] * len(result_ids),
+                                     result_ids))
+    return len([status for status in statuses if status is not None])
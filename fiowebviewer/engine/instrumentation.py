@@ -0,0 +1,268 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import (
+    g,
+    has_request_context,
+    request,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from fiowebviewer.engine.run import fio_webviewer
+
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# upper bounds in seconds of the latency histogram buckets
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SLOW_REQUEST_MS = 1000
+# stages timed within requests, in the order of Server-Timing
+STAGES = ('db', 'parse', 'cache_read', 'cache_write', 'resample', 'encode')
+HELP = {
+    'fiowebviewer_request_seconds': 'Latency of requests by route',
+    'fiowebviewer_stage_seconds': 'Time spent in a stage of a request',
+    'fiowebviewer_cache_requests_total': 'Cache lookups by outcome',
+    'fiowebviewer_cache_hit_ratio': 'Hits out of all lookups of a cache',
+    'fiowebviewer_bytes_read_total': 'Bytes of result data read by source',
+    'fiowebviewer_rows_read_total': 'Log samples read by source',
+}
+
+slow_logger = logging.getLogger('fiowebviewer.slow_requests')
+
+
+def enabled():
+    return fio_webviewer.config.get('INSTRUMENTATION', False)
+
+
+class Histogram(object):
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield bound, total
+
+
+def _labels(labels):
+    return ','.join('{}="{}"'.format(
+        key, str(value).replace('\\', '\\\\').replace('"', '\\"'))
+        for key, value in labels)
+
+
+class Registry(object):
+    """
+    histograms and counters, keyed by name and sorted label pairs,
+    rendered in the Prometheus text format
+    """
+
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def clear(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+
+    def render(self, counters=None):
+        """
+        every metric, counters are extended with the given ones
+        """
+        with self._lock:
+            all_counters = dict(self.counters)
+            histograms = sorted(self.histograms.items())
+        all_counters.update(counters or {})
+        lines = []
+        names = set()
+
+        def header(name, metric_type):
+            if name not in names:
+                names.add(name)
+                lines.append('# HELP {} {}'.format(name, HELP.get(name, '')))
+                lines.append('# TYPE {} {}'.format(name, metric_type))
+
+        for (name, labels), histogram in histograms:
+            header(name, 'histogram')
+            for bound, count in histogram.cumulative():
+                lines.append('{}_bucket{{{}}} {}'.format(
+                    name, _labels(labels + (('le', bound),)), count))
+            lines.append('{}_bucket{{{}}} {}'.format(
+                name, _labels(labels + (('le', '+Inf'),)), histogram.count))
+            lines.append('{}_sum{{{}}} {}'.format(name, _labels(labels),
+                                                  histogram.sum))
+            lines.append('{}_count{{{}}} {}'.format(name, _labels(labels),
+                                                    histogram.count))
+        for (name, labels), value in sorted(all_counters.items()):
+            header(name, 'counter')
+            lines.append('{}{{{}}} {}'.format(name, _labels(labels), value))
+        lookups = {}
+        for (name, labels), value in all_counters.items():
+            if name == 'fiowebviewer_cache_requests_total':
+                labels = dict(labels)
+                hits, total = lookups.get(labels['cache'], (0, 0))
+                if labels['outcome'] == 'hit':
+                    hits += value
+                lookups[labels['cache']] = (hits, total + value)
+        for cache, (hits, total) in sorted(lookups.items()):
+            header('fiowebviewer_cache_hit_ratio', 'gauge')
+            lines.append('fiowebviewer_cache_hit_ratio{{{}}} {}'.format(
+                _labels((('cache', cache),)), hits / total if total else 0))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+def _request_stats():
+    if not has_request_context():
+        return None
+    try:
+        return g.instrumentation
+    except AttributeError:
+        return None
+
+
+@contextmanager
+def span(stage):
+    """
+    time a stage, per request (Server-Timing) and process-wide
+    """
+    if not enabled():
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.observe('fiowebviewer_stage_seconds', elapsed, stage=stage)
+        stats = _request_stats()
+        if stats is not None:
+            stats['stages'][stage] = stats['stages'].get(stage, 0) + elapsed
+
+
+def count(name, value=1, **labels):
+    if not enabled():
+        return
+    registry.inc(name, value, **labels)
+    stats = _request_stats()
+    if stats is not None:
+        key = '{}{{{}}}'.format(name, _labels(sorted(labels.items())))
+        stats['counts'][key] = stats['counts'].get(key, 0) + value
+
+
+def cache_lookup(cache, hit):
+    count('fiowebviewer_cache_requests_total', cache=cache,
+          outcome='hit' if hit else 'miss')
+
+
+def data_read(source, nbytes, rows=None):
+    count('fiowebviewer_bytes_read_total', int(nbytes), source=source)
+    if rows is not None:
+        count('fiowebviewer_rows_read_total', int(rows), source=source)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    if enabled():
+        conn.info.setdefault('instrumentation', []).append(
+            time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    starts = conn.info.get('instrumentation')
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    registry.observe('fiowebviewer_stage_seconds', elapsed, stage='db')
+    stats = _request_stats()
+    if stats is not None:
+        stats['stages']['db'] = stats['stages'].get('db', 0) + elapsed
+        stats['queries'] += 1
+
+
+@fio_webviewer.before_request
+def _start_request():
+    if enabled():
+        g.instrumentation = dict(start=time.perf_counter(), stages={},
+                                 counts={}, queries=0)
+
+
+def server_timing(stages, total):
+    """
+    Server-Timing header value, durations in milliseconds
+    """
+    metrics = ['{};dur={:.2f}'.format(stage, stages[stage] * 1000)
+               for stage in STAGES if stage in stages]
+    metrics.append('total;dur={:.2f}'.format(total * 1000))
+    return ', '.join(metrics)
+
+
+@fio_webviewer.after_request
+def _finish_request(response):
+    """
+    streamed bodies are produced after this point, their time is not
+    part of the measured latency
+    """
+    stats = _request_stats()
+    if stats is None:
+        return response
+    elapsed = time.perf_counter() - stats['start']
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    registry.observe('fiowebviewer_request_seconds', elapsed,
+                     method=request.method, route=route,
+                     status=response.status_code)
+    response.headers['Server-Timing'] = server_timing(stats['stages'],
+                                                      elapsed)
+    slow_ms = fio_webviewer.config.get('SLOW_REQUEST_MS', SLOW_REQUEST_MS)
+    if elapsed * 1000 >= slow_ms:
+        slow_logger.warning('slow request %s', json.dumps(dict(
+            method=request.method,
+            path=request.path,
+            route=route,
+            args=request.args.to_dict(flat=False),
+            view_args=request.view_args,
+            status=response.status_code,
+            duration_ms=round(elapsed * 1000, 2),
+            stages_ms={stage: round(duration * 1000, 2)
+                       for stage, duration in stats['stages'].items()},
+            queries=stats['queries'],
+            counts=stats['counts'],
+        ), sort_keys=True))
+    return response
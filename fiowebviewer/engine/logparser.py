@@ -0,0 +1,93 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import numpy as np
+
+# fio log line layout: time (msec), value, data direction, block size
+# and an optional offset, which is never needed here
+LOG_COLUMNS = ('time', 'value', 'ddir', 'bs')
+REQUIRED_COLUMNS = ('time', 'value')
+LOG_DTYPE = np.int64
+
+
+def _skip_bad_lines(pd):
+    if tuple(int(v) for v in pd.__version__.split('.')[:2]) >= (1, 3):
+        return {'on_bad_lines': 'skip'}
+    return {'error_bad_lines': False, 'warn_bad_lines': False}
+
+
+def _count_columns(log_path):
+    with open(log_path, 'r') as f:
+        first_line = f.readline()
+    if not first_line.strip():
+        return 0
+    return min(first_line.count(',') + 1, len(LOG_COLUMNS))
+
+
+def _read_csv(log_path, names, dtype, chunksize=None):
+    import pandas as pd
+    return pd.read_csv(log_path, header=None, names=names,
+                       usecols=range(len(names)), dtype=dtype,
+                       skipinitialspace=True, engine='c',
+                       chunksize=chunksize, **_skip_bad_lines(pd))
+
+
+def _to_columns(data_frame, names):
+    import pandas as pd
+    for name in names:
+        if data_frame[name].dtype != LOG_DTYPE:
+            data_frame[name] = pd.to_numeric(data_frame[name],
+                                             errors='coerce')
+    valid = data_frame.notnull().all(axis=1).values
+    return {
+        name: np.ascontiguousarray(data_frame[name].values[valid],
+                                   dtype=LOG_DTYPE)
+        for name in names}
+
+
+def read_fio_log(log_path):
+    """
+    parse fio log into int64 columns, skipping malformed or truncated lines
+    """
+    names = LOG_COLUMNS[:_count_columns(log_path)]
+    if not names:
+        return {column: np.empty(0, dtype=LOG_DTYPE)
+                for column in REQUIRED_COLUMNS}
+    try:
+        # fast path, every field is a well formed integer
+        data_frame = _read_csv(log_path, names,
+                               {name: LOG_DTYPE for name in names})
+    except (ValueError, TypeError):
+        data_frame = _read_csv(log_path, names, None)
+    return _to_columns(data_frame, names)
+
+
+def iter_fio_log(log_path, chunk_rows):
+    """
+    read_fio_log() in chunks of at most chunk_rows lines
+    """
+    names = LOG_COLUMNS[:_count_columns(log_path)]
+    if not names:
+        return
+    # types are inferred per chunk, well formed ones are int64 already
+    for data_frame in _read_csv(log_path, names, None, chunk_rows):
+        yield _to_columns(data_frame, names)
+
+
+def to_timedelta_index(time):
+    import pandas as pd
+    index = pd.TimedeltaIndex(np.asarray(time, dtype=LOG_DTYPE)
+                              .astype('timedelta64[ms]'))
+    index.name = 0
+    return index
+
+
+def columns_to_dataframe(columns):
+    import pandas as pd
+    return pd.DataFrame({1: columns['value']},
+                        index=to_timedelta_index(columns['time']))
+
+
+def read_fio_log_dataframe(log_path):
+    return columns_to_dataframe(read_fio_log(log_path))
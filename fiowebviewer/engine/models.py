@@ -2,28 +2,250 @@
 # license that can be found in the LICENSE file.
 # Copyright 2019 The fiowebviewer Authors. All rights reserved.
 
-import csv
-import datetime
 import json
+import operator
 import os
 import re
-import tarfile
 from collections import namedtuple
 from io import StringIO
-from io import BytesIO
 
-import pandas as pd
-from pandas.tseries.offsets import Milli
-from pint import UnitRegistry
+import numpy as np
+from sqlalchemy import (
+    and_,
+    or_,
+)
+from sqlalchemy.orm import (
+    selectinload,
+)
+from sqlalchemy.orm.exc import (
+    NoResultFound,
+)
 
+from fiowebviewer.engine import (
+    cache,
+    chunked,
+    diskcache,
+    export,
+    framestore,
+    instrumentation,
+    logparser,
+    pyramid,
+    series,
+    units,
+)
 from fiowebviewer.engine.database import (
     DBSession,
+    Metrics,
     Result,
     Tag,
 )
 from fiowebviewer.engine.run import fio_webviewer
 
 ROUNDING_RANGE = 3
+# resolution at which the series of all jobs are combined and cached
+COMBINED_GRANULARITY = '1S'
+# parsed results kept in memory, sized by their input files
+RESULT_CACHE_ENTRIES = fio_webviewer.config.get('RESULT_CACHE_ENTRIES', 128)
+RESULT_CACHE_BYTES = fio_webviewer.config.get('RESULT_CACHE_BYTES',
+                                              256 * 1024 * 1024)
+
+fio_result_cache = cache.LRUCache(RESULT_CACHE_ENTRIES, RESULT_CACHE_BYTES)
+
+
+def data_path():
+    """
+    the directory of the results, read from the settings when needed
+    """
+    return fio_webviewer.config['DATA_PATH']
+
+
+def invalidate_fio_result(result_id):
+    fio_result_cache.invalidate(str(result_id))
+
+
+FioResultSummary = namedtuple('FioResultSummary',
+                              'dir_name fio_name upload_date tags_list '
+                              'status')
+
+
+def list_fio_results(after=None, limit=None, tag=None):
+    """
+    newest first results with their tags, loaded in two queries,
+    after is the id of the last result of the previous page
+    """
+    session = DBSession()
+    try:
+        query = session.query(Result).options(selectinload(Result.tags))
+        if tag is not None:
+            query = query.filter(Result.tags.any(Tag.tag == tag))
+        if after is not None:
+            last = session.query(Result.date_submitted). \
+                filter(Result.id == after).one()
+            query = query.filter(or_(
+                Result.date_submitted < last.date_submitted,
+                and_(Result.date_submitted == last.date_submitted,
+                     Result.id < after)))
+        query = query.order_by(Result.date_submitted.desc(),
+                               Result.id.desc())
+        if limit is not None:
+            query = query.limit(limit)
+        summaries = []
+        for result in query.all():
+            if result.name is not None:
+                fio_name = str(result.name)
+            else:
+                fio_name = result.date_submitted
+            summaries.append(FioResultSummary(
+                dir_name=str(result.id),
+                fio_name=fio_name,
+                upload_date=result.date_submitted,
+                tags_list=[result_tag.tag for result_tag in result.tags],
+                status=result.status))
+        return summaries
+    finally:
+        session.close()
+
+
+# columns of the metrics table which can be filtered and sorted on
+METRICS = tuple(column for column in Metrics.__table__.columns.keys()
+                if column.startswith(('read_', 'write_')))
+METRICS_OPERATORS = {
+    'lt': operator.lt,
+    'le': operator.le,
+    'gt': operator.gt,
+    'ge': operator.ge,
+    'eq': operator.eq,
+}
+CLAT_PERCENTILES = {
+    'p50': 50.0,
+    'p95': 95.0,
+    'p99': 99.0,
+    'p999': 99.9,
+}
+
+
+def group_report_metrics(group_report):
+    metrics = dict(group_id=group_report.group_id,
+                   jobname=group_report.jobname)
+    for iotype in ('read', 'write'):
+        for name, attribute in (
+                ('iops', 'iops'),
+                ('bw_kbps', 'bw_kbps'),
+                ('runtime_ms', 'runtime_ms'),
+                ('clat_mean_usec', 'completion_lat_mean_usec')):
+            metrics['{}_{}'.format(iotype, name)] = getattr(
+                group_report, '{}_{}'.format(iotype, attribute))
+        percentiles = getattr(group_report,
+                              '{}_completion_lat_percentiles_usec'.format(
+                                  iotype))
+        for name, percentile in CLAT_PERCENTILES.items():
+            metrics['{}_clat_{}_usec'.format(iotype, name)] = \
+                percentiles.get(percentile)
+    return metrics
+
+
+def save_metrics(base_dir, result_id):
+    """
+    (re)write the metrics rows of a result from its fio json output
+    """
+    fio_result = FioResult.new_from_database(base_dir, result_id)
+    session = DBSession()
+    try:
+        session.query(Metrics). \
+            filter(Metrics.result_id == fio_result.dir_name).delete()
+        for group_report in fio_result.group_reports:
+            session.add(Metrics(result_id=int(fio_result.dir_name),
+                                rw=fio_result.get_group_rw(
+                                    group_report.group_id),
+                                **group_report_metrics(group_report)))
+        session.commit()
+    except Exception:
+        session.rollback()
+        raise
+    finally:
+        session.close()
+
+
+def search_metrics(filters=(), rw=None, tag=None, sort=None,
+                   descending=False, limit=None):
+    """
+    metrics rows, joined with their result, matching every
+    (column, operator, value) filter
+    """
+    session = DBSession()
+    try:
+        query = session.query(Metrics, Result).join(Result). \
+            options(selectinload(Result.tags))
+        for column, operator_name, value in filters:
+            query = query.filter(METRICS_OPERATORS[operator_name](
+                getattr(Metrics, column), value))
+        if rw is not None:
+            query = query.filter(Metrics.rw == rw)
+        if tag is not None:
+            query = query.filter(Result.tags.any(Tag.tag == tag))
+        if sort is not None:
+            order = getattr(Metrics, sort)
+            query = query.order_by(order.desc() if descending else order)
+        query = query.order_by(Result.date_submitted.desc(), Metrics.id)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+    finally:
+        session.close()
+
+
+def _read_cached(store, key):
+    """
+    the frame cached under key, None when it is missing or was evicted
+    """
+    with instrumentation.span('cache_read'):
+        data_frame = store.read(key)
+    instrumentation.cache_lookup('series', data_frame is not None)
+    if data_frame is None:
+        diskcache.miss()
+        return None
+    instrumentation.data_read('series', data_frame.memory_usage().sum(),
+                              len(data_frame))
+    diskcache.hit(store.path)
+    return data_frame
+
+
+def _write_cached(store, key, data_frame):
+    # concurrent requests may compute it too, the first one stores it
+    with instrumentation.span('cache_write'):
+        written = store.write(key, data_frame)
+    if written:
+        diskcache.stored(store.path)
+
+
+def _select_window(columns, start_frame, end_frame):
+    """
+    time and value of the samples strictly within (start_frame,
+    end_frame) of sorted columns, all of them without a window
+    """
+    time = columns['time']
+    first, last = 0, len(time)
+    if start_frame is not None and end_frame is not None:
+        first = np.searchsorted(time, int(start_frame), side='right')
+        last = np.searchsorted(time, int(end_frame), side='left')
+    return np.asarray(time[first:last]), np.asarray(
+        columns['value'][first:last])
+
+
+def _window(data_frame, start_frame, end_frame):
+    """
+    rows strictly within (start_frame, end_frame), as a slice of the
+    frame when its index is sorted
+    """
+    from pandas.tseries.offsets import Milli
+    start = Milli(int(start_frame))
+    end = Milli(int(end_frame))
+    if not data_frame.index.is_monotonic_increasing:
+        return data_frame[(data_frame.index > start) &
+                          (data_frame.index < end)]
+    first = data_frame.index.searchsorted(start, side='right')
+    last = data_frame.index.searchsorted(end, side='left')
+    return data_frame.iloc[first:max(first, last)]
 
 
 class FioResult(object):
@@ -36,19 +258,37 @@ class FioResult(object):
 
     @classmethod
     def new_from_database(cls, base_dir, result_id):
-        return cls(base_dir, result_id)
+        """
+        shared instance from the result cache, the files of a result do
+        not change after upload; its name and tags are read from the
+        database, which other processes may change, when used
+        """
+        fio_result = fio_result_cache.get(str(result_id))
+        if fio_result is None or fio_result.base_dir != base_dir:
+            fio_result = cls(base_dir, result_id)
+            fio_result_cache.put(fio_result.dir_name, fio_result,
+                                 fio_result.approximate_size)
+        else:
+            try:
+                # deleted by another process meanwhile
+                fio_result._query_result(Result.id)
+            except NoResultFound:
+                invalidate_fio_result(result_id)
+                raise
+        return fio_result
 
     def __init__(self, base_dir, dir_name):
         self.base_dir = base_dir
         self.dir_name = str(dir_name)
-        self._fio_name = None
-        self.upload_date = self._get_upload_date()
+        # raises NoResultFound for unknown results
+        self._query_result(Result.id)
         self._fio_output = None
         self._fio_terse_output = None
         self._fio_json_output = None
         self._fio_userargs = None
         self._group_reports = None
         self._group_id_to_job_ids = None
+        self._cache_store = None
 
     def __str__(self):
         return self.dir_name
@@ -61,38 +301,64 @@ class FioResult(object):
             data = json.load(f)
             return [FioGroupReport(self.path, self.group_id_to_job_ids, data)]
 
-    def _get_upload_date(self):
+    def _query_result(self, *columns):
         session = DBSession()
-        result = session.query(Result). \
-            filter(Result.id == self.dir_name).one()
-        return result.date_submitted
+        try:
+            return session.query(*columns). \
+                filter(Result.id == self.dir_name).one()
+        finally:
+            session.close()
+
+    @property
+    def upload_date(self):
+        upload_date, = self._query_result(Result.date_submitted)
+        return upload_date
 
     @property
     def tags_list(self):
         session = DBSession()
-        result = session.query(Result).filter(Result.id ==
-                                              self.dir_name).one()
-        tags = session.query(Tag).filter(Tag.result == result).all()
-        return tags
+        try:
+            return session.query(Tag).filter(Tag.result_id ==
+                                             self.dir_name).all()
+        finally:
+            session.close()
+
+    @property
+    def status(self):
+        status, = self._query_result(Result.status)
+        return status
 
     @property
     def fio_name(self):
-        if self._fio_name is None:
-            session = DBSession()
-            result = session.query(Result).filter(Result.id ==
-                                                  self.dir_name).first()
-            if result.name is not None:
-                self._fio_name = str(result.name)
-            else:
-                self._fio_name = result.date_submitted
-            return self._fio_name
-        else:
-            return self._fio_name
+        name, date_submitted = self._query_result(Result.name,
+                                                  Result.date_submitted)
+        if name is not None:
+            return str(name)
+        return date_submitted
 
     @property
     def path(self):
         return os.path.join(self.base_dir, self.dir_name)
 
+    @property
+    def approximate_size(self):
+        size = 0
+        for filename in (self._fio_output_filename,
+                         self._fio_output_terse_filename,
+                         self._fio_output_json_filename,
+                         self._fio_userargs_filename):
+            try:
+                size += os.path.getsize(self._get_file_path(filename))
+            except OSError:
+                pass
+        return size
+
+    @property
+    def runtime_ms(self):
+        return max([max(group_report.read_runtime_ms,
+                        group_report.write_runtime_ms)
+                    for group_report in self.group_reports] or [0])
+
     @property
     def group_reports(self):
         if self._group_reports is None:
@@ -111,12 +377,16 @@ class FioResult(object):
             for group_id, job_cnt in \
                     re.findall(r'\(groupid=(\d+), jobs=(\d+)\)',
                                self.fio_output):
-                self._group_id_to_job_ids[int(group_id)] = tuple(range(job_id,
-                                                            int(job_cnt) +
-                                                            job_id))
+                self._group_id_to_job_ids[int(group_id)] = tuple(
+                    range(job_id, int(job_cnt) + job_id))
                 job_id = job_id + int(job_cnt)
         return self._group_id_to_job_ids
 
+    def get_group_rw(self, group_id):
+        match = re.search(r'\(g={}\): rw=(\w+)'.format(group_id),
+                          self.fio_output)
+        return match.group(1) if match else None
+
     @property
     def fio_userargs(self):
         if self._fio_userargs is None:
@@ -162,85 +432,251 @@ class FioResult(object):
                 return job
         return None
 
+    def get_log(self, job_id, log_type):
+        """
+        the log_type log of a job, None when the result has no such job
+        or log
+        """
+        try:
+            fio_job = self.get_job(job_id)
+        except ValueError:  # not a job id
+            return None
+        if fio_job is None:
+            return None
+        return fio_job.get_log_by_type(log_type)
+
     def _get_dataframe(self, job_id, log_type, iotype):
-        fio_job = self.get_job(job_id)
-        fio_log = fio_job.get_log_by_type(log_type)
-        if getattr(fio_log.exists, iotype):
-            data_frame = pd.read_csv(getattr(fio_log.path, iotype),
-                                     index_col=0, header=None,
-                                     parse_dates=True,
-                                     date_parser=self._dateparse)
-            data_frame.drop(data_frame.columns[[1, 2]], axis=1, inplace=True)
-            return data_frame
+        fio_log = self.get_log(job_id, log_type)
+        if fio_log is None:
+            return None
+        columns = fio_log.parse(iotype)
+        if columns is not None:
+            return logparser.columns_to_dataframe(columns)
         return None
 
-    def _dateparse(self, time):
-        return pd.Timedelta(Milli(time))
+    def _get_columns(self, job_id, log_type, iotype):
+        fio_log = self.get_log(job_id, log_type)
+        if fio_log is None:
+            return None
+        columns = fio_log.columns(iotype)
+        if columns is None:
+            # result uploaded before logs were converted at upload time,
+            # or still being processed
+            columns = fio_log.parse(iotype)
+        return columns
 
     def to_dataframe(self, job_id, log_type, iotype):
-        try:
-            CACHE_PATH = fio_webviewer.config['CACHE_PATH']
-        except KeyError:
-            CACHE_PATH = None
-        if CACHE_PATH is not None:  # Caching enabled
-            dataframe_file_dir = os.path.join(CACHE_PATH, str(self.dir_name))
-            dataframe_file = os.path.join(dataframe_file_dir,
-                                          "{}.{}.{}.h5".format(log_type,
-                                                               job_id,
-                                                               iotype))
-            if os.path.isfile(dataframe_file):  # Cached version exists
-                data_frame = pd.read_hdf(dataframe_file, 'df')
-            else:  # Cached version doesn't exists
-                if not os.path.exists(dataframe_file_dir):
-                    os.makedirs(dataframe_file_dir)
+        fio_log = self.get_log(job_id, log_type)
+        if fio_log is None:
+            return None
+        columns = fio_log.columns(iotype)
+        if columns is not None:  # Converted at upload, no parsing needed
+            return logparser.columns_to_dataframe(columns)
+        store = self.cache_store()
+        if store is not None:  # Caching enabled
+            key = self.dataframe_cache_key(job_id, log_type, iotype)
+            data_frame = _read_cached(store, key)
+            if data_frame is None:  # Cached version doesn't exists
                 data_frame = self._get_dataframe(job_id, log_type, iotype)
                 if data_frame is None:
                     return None
-                data_frame.to_hdf(dataframe_file, 'df', mode='w')
+                _write_cached(store, key, data_frame)
             return data_frame
         else:  # Caching disabled
             # Just return the dataframe
             return self._get_dataframe(job_id, log_type, iotype)
 
-    def to_json(self, job_id, log_type):
-        fio_job = self.get_job(job_id)
-        fio_log = fio_job.get_log_by_type(log_type)
-        x = []
-        y = []
-        with open(fio_log.path) as fh:
-            for line in csv.reader(fh, delimiter=','):
-                x.append(float(line[0]))
-                y.append(float(line[1]))
-        return dict(x=x, y=y)
+    def resample(self, job_id, log_type, iotype, granularity,
+                 start_frame=None, end_frame=None, envelope=False):
+        fio_log = self.get_log(job_id, log_type)
+        if fio_log is None:
+            return None
+        if granularity:
+            with instrumentation.span('resample'):
+                buckets = pyramid.query(getattr(fio_log.path, iotype),
+                                        granularity, start_frame, end_frame)
+                instrumentation.cache_lookup('pyramid', buckets is not None)
+                if buckets is not None:  # Answered from precomputed buckets
+                    return pyramid.to_dataframe(buckets, envelope)
+            granularity_ms = pyramid.granularity_to_ms(granularity)
+            chunks = self._get_chunks(fio_log, iotype)
+            if granularity_ms and chunks is not None:  # Too large to load
+                with instrumentation.span('resample'):
+                    buckets = chunked.aggregate(chunks, granularity_ms,
+                                                start_frame, end_frame)
+                return pyramid.to_dataframe(buckets, envelope)
+        data_frame = self.to_dataframe(job_id, log_type, iotype)
+        if data_frame is None:
+            return None
+        with instrumentation.span('resample'):
+            if start_frame is not None and end_frame is not None:
+                data_frame = _window(data_frame, start_frame, end_frame)
+            if granularity:
+                data_frame = pyramid.resample_frame(data_frame, granularity,
+                                                    envelope)
+        return data_frame
+
+    def _get_chunks(self, fio_log, iotype):
+        """
+        chunks of a series too large to be processed at once, None for
+        other series
+        """
+        columns = fio_log.columns(iotype)
+        if columns is not None:
+            if chunked.use_chunks(columns['time'].nbytes +
+                                  columns['value'].nbytes):
+                return chunked.iter_columns(columns)
+            return None
+        path = getattr(fio_log.path, iotype)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            if chunked.use_chunks(os.path.getsize(path)):
+                return chunked.iter_log(path)
+            return None
+        if os.path.exists(fio_log.raw_path) and \
+                not series.is_split(fio_log.raw_path) and \
+                chunked.use_chunks(os.path.getsize(fio_log.raw_path)):
+            return chunked.iter_log(fio_log.raw_path,
+                                    series.IO_TYPES.index(iotype))
+        return None
+
+    def get_cache_dir(self):
+        try:
+            CACHE_PATH = fio_webviewer.config['CACHE_PATH']
+        except KeyError:
+            CACHE_PATH = None
+        if CACHE_PATH is None:  # Caching disabled
+            return None
+        return os.path.join(CACHE_PATH, str(self.dir_name))
+
+    def cache_store(self):
+        """
+        the store of the cached frames of the result, None when caching
+        is disabled
+        """
+        cache_dir = self.get_cache_dir()
+        if cache_dir is None:
+            return None
+        path = os.path.join(cache_dir, framestore.FILENAME)
+        if self._cache_store is None or self._cache_store.path != path:
+            self._cache_store = framestore.FrameStore(path)
+        return self._cache_store
+
+    @staticmethod
+    def dataframe_cache_key(job_id, log_type, iotype):
+        return "{}.{}.{}".format(log_type, job_id, iotype)
+
+    @staticmethod
+    def combined_cache_key(log_type, iotype):
+        return "{}.combined.{}".format(log_type, iotype)
+
+    def _combine_jobs(self, log_type, iotype):
+        import pandas as pd
+        data_frames = []
+        for group_report in self.group_reports:
+            for job in group_report.jobs:
+                data_frame = self.resample(job.job_id, log_type, iotype,
+                                           COMBINED_GRANULARITY,
+                                           envelope=True)
+                if data_frame is not None:
+                    data_frames.append(data_frame)
+        if not data_frames:
+            return None
+        # every job is bucketed on the same labels
+        grouped = pd.concat(data_frames).groupby(level=0)
+        if "lat" in log_type:
+            data_frame = grouped.agg({1: 'mean', 'min': 'min', 'max': 'max'})
+        else:
+            # buckets without any sample stay NaN instead of summing to 0
+            data_frame = grouped.sum().where(grouped.count() > 0)
+        return pyramid.densify(data_frame, COMBINED_GRANULARITY)
+
+    def combined_dataframe(self, log_type, iotype):
+        store = self.cache_store()
+        if store is None:
+            return self._combine_jobs(log_type, iotype)
+        key = self.combined_cache_key(log_type, iotype)
+        data_frame = _read_cached(store, key)
+        if data_frame is not None:  # Cached version exists
+            return data_frame
+        data_frame = self._combine_jobs(log_type, iotype)
+        if data_frame is None:
+            return None
+        _write_cached(store, key, data_frame)
+        return data_frame
+
+    def iter_columns(self, job_id, log_type, iotype):
+        """
+        the columns of a series, in chunks when it is too large to be
+        loaded at once
+        """
+        fio_log = self.get_log(job_id, log_type)
+        if fio_log is None:
+            return iter(())
+        chunks = self._get_chunks(fio_log, iotype)
+        if chunks is not None:
+            return chunks
+        columns = self._get_columns(job_id, log_type, iotype)
+        return iter(() if columns is None else (columns,))
+
+    def is_large(self, job_id, log_type, iotype):
+        """
+        whether a series is too large to be loaded at once
+        """
+        fio_log = self.get_log(job_id, log_type)
+        return fio_log is not None and \
+            self._get_chunks(fio_log, iotype) is not None
+
+    def window(self, job_id, log_type, iotype, start_frame=None,
+               end_frame=None):
+        fio_log = self.get_log(job_id, log_type)
+        if fio_log is None:
+            return None
+        chunks = self._get_chunks(fio_log, iotype)
+        if chunks is None:
+            columns = self._get_columns(job_id, log_type, iotype)
+            if columns is None:
+                return None
+            return _select_window(columns, start_frame, end_frame)
+        # only the rows within the window are kept
+        selected = [_select_window(columns, start_frame, end_frame)
+                    for columns in chunks]
+        if not selected:
+            return None
+        return (np.concatenate([time for time, _ in selected]),
+                np.concatenate([value for _, value in selected]))
+
+    def iter_csv(self, job_id, log_type, iotype):
+        for columns in self.iter_columns(job_id, log_type, iotype):
+            for chunk in export.iter_csv([columns['time'], columns['value']],
+                                         ['%d.0', '%d.0']):
+                yield chunk
 
     def to_csv(self, job_id, log_type, iotype):
-        fio_job = self.get_job(job_id)
-        fio_log = fio_job.get_log_by_type(log_type)
-        data_buf = StringIO()
-        buf_writer = csv.writer(data_buf, delimiter=',')
-        with open(getattr(fio_log.path, iotype)) as fr:
-            for line in csv.reader(fr, delimiter=','):
-                buf_writer.writerow((float(line[0]), float(line[1])))
-        return data_buf
-
-    def to_tar_gz(self):
-        tar_gz_file = BytesIO()
-        tar = tarfile.open(mode="w:gz", fileobj=tar_gz_file)
-        for log_file in os.listdir(self.path):
-            if log_file.endswith('.log'):
-                tar.add(os.path.join(self.path, log_file), arcname=log_file)
-        tar.close()
-        tar_gz_file.seek(0)
-        return tar_gz_file
+        return StringIO(''.join(self.iter_csv(job_id, log_type, iotype)))
+
+    def archive_files(self, include_outputs=False):
+        """
+        paths of the files of a downloaded archive, the fio logs and
+        optionally the fio outputs and user arguments
+        """
+        filenames = sorted(filename for filename in os.listdir(self.path)
+                           if filename.endswith('.log'))
+        if include_outputs:
+            filenames += [filename for filename in (
+                self._fio_output_filename,
+                self._fio_output_terse_filename,
+                self._fio_output_json_filename,
+                self._fio_userargs_filename)
+                if os.path.isfile(self._get_file_path(filename))]
+        return [os.path.join(self.path, filename) for filename in filenames]
 
 
 class FioGroupReport(object):
     supported_terse_versions = (3,)
-    ureg = UnitRegistry()
-    ureg.default_format = '~'
 
     def __init__(self, base_dir, group_id_to_job_ids, fio_data):
         self.base_dir = base_dir
+        self._converted = {}
         self._set_params(fio_data)
         self.jobs = [FioJob(self.base_dir, job_id)
                      for job_id in group_id_to_job_ids[self.group_id]]
@@ -349,31 +785,19 @@ class FioGroupReport(object):
         return None
 
     def convert_unit(self, key, inner_key=None):
+        # every table cell is converted once per report
+        try:
+            return self._converted[key, inner_key]
+        except KeyError:
+            pass
         if "runt" in key:
-            data = getattr(self, key)
-            duration = datetime.timedelta(milliseconds=data)
-            hours = int(duration.total_seconds() // 3600)
-            minutes = int((duration.total_seconds() % 3600) // 60)
-            seconds = int((duration.total_seconds() % 3600) % 60)
-            data = "{}h:{:02d}m:{:02d}s".format(
-                hours, minutes, seconds)
+            data = units.format_duration(getattr(self, key))
+        elif inner_key:
+            data = units.convert(key, getattr(self, key)[inner_key],
+                                 ROUNDING_RANGE)
         else:
-            if inner_key:
-                data = float(getattr(self, key)[inner_key])
-            else:
-                data = float(getattr(self, key))
-            if "lat"in key:
-                data /= 1000
-                data *= self.ureg.millisecond
-            elif "bw" in key:
-                data /= 1000
-                data *= (self.ureg.megabyte / self.ureg.second)
-            elif "io" in key:
-                data /= 1000
-                data *= self.ureg.megabyte
-            value = data.magnitude
-            metric = data.units
-            data = round(value, ROUNDING_RANGE) * metric
+            data = units.convert(key, getattr(self, key), ROUNDING_RANGE)
+        self._converted[key, inner_key] = data
         return data
 
 
@@ -411,28 +835,67 @@ class FioLog(object):
 
     def get_file_names(self, log_type, job_id):
         rwlog = namedtuple('{}_{}_log'.format(self.log_type, self.job_id),
-                           'read write')
-        return rwlog(
-            read='fio-webviewer_{}.{}.log.read'.format(self.log_type, self.job_id),
-            write='fio-webviewer_{}.{}.log.write'.format(self.log_type, self.job_id)
-        )
+                           'read write trim')
+        return rwlog(*['fio-webviewer_{}.{}.log.{}'.format(
+            self.log_type, self.job_id, io_type)
+            for io_type in ('read', 'write', 'trim')])
+
+    @property
+    def raw_path(self):
+        return os.path.join(self.base_dir, 'fio-webviewer_{}.{}.log'.format(
+            self.log_type, self.job_id))
 
     @property
     def path(self):
-        path = namedtuple("path", 'read write')
+        path = namedtuple("path", 'read write trim')
         return path(
             read=os.path.join(self.base_dir, self.filename.read),
-            write=os.path.join(self.base_dir, self.filename.write)
+            write=os.path.join(self.base_dir, self.filename.write),
+            trim=os.path.join(self.base_dir, self.filename.trim)
         )
 
+    def columns(self, iotype):
+        columns = series.load_columns(getattr(self.path, iotype))
+        if columns is not None:
+            instrumentation.data_read(
+                'columns', sum(values.nbytes for values in columns.values()),
+                len(columns['time']))
+        return columns
+
+    def parse(self, iotype):
+        """
+        columns read from the text logs, for results whose logs are not
+        converted (yet)
+        """
+        path = getattr(self.path, iotype)
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with instrumentation.span('parse'):
+                columns = series.parse_log(path)
+            instrumentation.data_read('log', os.path.getsize(path),
+                                      len(columns['time']))
+            return columns
+        if os.path.exists(self.raw_path) and \
+                not series.is_split(self.raw_path):
+            with instrumentation.span('parse'):
+                columns = series.parse_raw_log(self.raw_path, iotype)
+            if columns is not None and len(columns['time']):
+                instrumentation.data_read('log',
+                                          os.path.getsize(self.raw_path),
+                                          len(columns['time']))
+                return columns
+        return None
+
+    def _exists(self, path):
+        return ((os.path.exists(path) and os.path.getsize(path) > 0) or
+                series.is_converted(path))
+
     @property
     def exists(self):
-        exists = namedtuple("exists", 'read write')
+        exists = namedtuple("exists", 'read write trim')
         return exists(
-            read=(os.path.exists(self.path.read) and
-                  os.path.getsize(self.path.read) > 0),
-            write=(os.path.exists(self.path.write) and
-                   os.path.getsize(self.path.write) > 0)
+            read=self._exists(self.path.read),
+            write=self._exists(self.path.write),
+            trim=self._exists(self.path.trim)
         )
 
 
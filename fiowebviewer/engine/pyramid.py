@@ -0,0 +1,219 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import os
+
+import numpy as np
+
+from fiowebviewer.engine.logparser import (
+    to_timedelta_index,
+)
+
+# bucket sizes in msec, every level is a multiple of the previous one
+LEVELS_MS = (1000, 10000, 60000, 600000, 3600000)
+# buckets are stored as rows of int64 values, only non-empty ones are kept
+STATS = ('bucket', 'count', 'sum', 'min', 'max')
+BUCKET, COUNT, SUM, MIN, MAX = range(len(STATS))
+
+
+def level_path(log_path, level_ms):
+    return '{}.pyramid.{}.npy'.format(log_path, level_ms)
+
+
+def granularity_to_ms(granularity):
+    from pandas.tseries.frequencies import to_offset
+    try:
+        nanos = to_offset(granularity).nanos
+    except ValueError:  # not a fixed frequency (e.g. months)
+        return None
+    if nanos % 10 ** 6:
+        return None
+    return nanos // 10 ** 6
+
+
+def choose_level(granularity_ms):
+    for level_ms in reversed(LEVELS_MS):
+        if level_ms <= granularity_ms and granularity_ms % level_ms == 0:
+            return level_ms
+    return None
+
+
+def fit_granularity(span_ms, max_points):
+    """
+    smallest granularity, aligned on a stored level, giving at most
+    max_points buckets over span_ms
+    """
+    needed_ms = max(-(-int(span_ms) // max(int(max_points), 1)), 1)
+    level_ms = LEVELS_MS[0]
+    for candidate_ms in LEVELS_MS:
+        if candidate_ms <= needed_ms:
+            level_ms = candidate_ms
+    return max(-(-needed_ms // level_ms), 1) * level_ms
+
+
+def _ceil_div(values, divisor):
+    return -(-values // divisor)
+
+
+def _aggregate(bucket, count, total, minimum, maximum):
+    if not len(bucket):
+        return np.empty((0, len(STATS)), dtype=np.int64)
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    return np.column_stack((
+        bucket[starts],
+        np.add.reduceat(count, starts),
+        np.add.reduceat(total, starts),
+        np.minimum.reduceat(minimum, starts),
+        np.maximum.reduceat(maximum, starts),
+    )).astype(np.int64)
+
+
+def aggregate_samples(time, value, bucket_ms):
+    """
+    aggregate samples into buckets of bucket_ms closed and labeled on the
+    right, the same way as resample(label='right', closed='right')
+    """
+    time = np.asarray(time, dtype=np.int64)
+    value = np.asarray(value, dtype=np.int64)
+    if len(time) > 1 and (np.diff(time) < 0).any():
+        order = np.argsort(time, kind='mergesort')
+        time = time[order]
+        value = value[order]
+    return _aggregate(_ceil_div(time, bucket_ms), np.ones_like(value),
+                      value, value, value)
+
+
+def merge(data, other):
+    """
+    buckets of two aggregations of the same bucket size
+    """
+    data = np.concatenate((data, other))
+    if len(data) > 1 and (np.diff(data[:, BUCKET]) < 0).any():
+        data = data[np.argsort(data[:, BUCKET], kind='mergesort')]
+    return _aggregate(data[:, BUCKET], data[:, COUNT], data[:, SUM],
+                      data[:, MIN], data[:, MAX])
+
+
+def build_levels(data):
+    """
+    every level from the buckets of the first one
+    """
+    levels = {}
+    level_ms = LEVELS_MS[0]
+    levels[level_ms] = data
+    for next_level_ms in LEVELS_MS[1:]:
+        data = _aggregate(_ceil_div(data[:, BUCKET],
+                                    next_level_ms // level_ms),
+                          data[:, COUNT], data[:, SUM],
+                          data[:, MIN], data[:, MAX])
+        levels[next_level_ms] = data
+        level_ms = next_level_ms
+    return levels
+
+
+def build_pyramid(time, value):
+    return build_levels(aggregate_samples(time, value, LEVELS_MS[0]))
+
+
+def write_levels(log_path, levels):
+    for level_ms, data in levels.items():
+        path = level_path(log_path, level_ms)
+        tmp_path = '{}.tmp'.format(path)
+        with open(tmp_path, 'wb') as f:
+            np.save(f, data)
+        os.rename(tmp_path, path)
+
+
+def write_pyramid(log_path, time, value):
+    write_levels(log_path, build_pyramid(time, value))
+
+
+def query(log_path, granularity, start_ms=None, end_ms=None):
+    """
+    return buckets of the requested granularity, computed from the
+    coarsest stored level which divides it, or None when there is none
+    """
+    granularity_ms = granularity_to_ms(granularity)
+    if not granularity_ms:
+        return None
+    level_ms = choose_level(granularity_ms)
+    if level_ms is None:
+        return None
+    path = level_path(log_path, level_ms)
+    if not os.path.isfile(path):
+        return None
+    data = np.load(path, mmap_mode='r')
+    if start_ms is not None and end_ms is not None:
+        # keep buckets overlapping the (start_ms, end_ms) window
+        labels = data[:, BUCKET] * level_ms
+        first = np.searchsorted(labels, int(start_ms), side='right')
+        last = np.searchsorted(labels, int(end_ms) + level_ms, side='left')
+        data = data[first:last]
+    data = np.asarray(data)
+    data = _aggregate(_ceil_div(data[:, BUCKET], granularity_ms // level_ms),
+                      data[:, COUNT], data[:, SUM],
+                      data[:, MIN], data[:, MAX])
+    return data, granularity_ms
+
+
+def resample_frame(data_frame, granularity, envelope=False):
+    """
+    resample a full resolution frame into the same buckets query() uses
+    """
+    import pandas as pd
+    grouped = data_frame[1].groupby(data_frame.index.ceil(granularity))
+    resampled = pd.DataFrame({1: grouped.mean()})
+    if envelope:
+        resampled['min'] = grouped.min()
+        resampled['max'] = grouped.max()
+    return densify(resampled, granularity)
+
+
+def regroup_frame(data_frame, granularity):
+    """
+    merge the buckets of a resampled frame into coarser ones
+    """
+    aggregation = {1: 'mean'}
+    if 'min' in data_frame.columns:
+        aggregation.update({'min': 'min', 'max': 'max'})
+    grouped = data_frame.groupby(data_frame.index.ceil(granularity))
+    return densify(grouped.agg(aggregation), granularity)
+
+
+def densify(data_frame, granularity):
+    """
+    add the missing (NaN) buckets between the first and the last one
+    """
+    import pandas as pd
+    if len(data_frame):
+        data_frame = data_frame.reindex(pd.timedelta_range(
+            data_frame.index[0], data_frame.index[-1], freq=granularity))
+    data_frame.index.name = 0
+    return data_frame
+
+
+def to_dataframe(buckets, envelope=False):
+    """
+    bucket means on a dense index, empty buckets are NaN,
+    with the envelope bucket minimum and maximum are added
+    """
+    import pandas as pd
+    data, granularity_ms = buckets
+    if len(data):
+        first = data[0, BUCKET]
+        bucket = np.arange(first, data[-1, BUCKET] + 1)
+        position = data[:, BUCKET] - first
+    else:
+        bucket = position = np.empty(0, dtype=np.int64)
+    columns = {1: data[:, SUM] / data[:, COUNT]}
+    if envelope:
+        columns['min'] = data[:, MIN]
+        columns['max'] = data[:, MAX]
+    data_frame = pd.DataFrame(index=to_timedelta_index(
+        bucket * granularity_ms))
+    for name, values in columns.items():
+        dense = np.full(len(bucket), np.nan)
+        dense[position] = values
+        data_frame[name] = dense
+    return data_frame
@@ -6,6 +6,7 @@
 
 import logging
 import os
+import threading
 from logging.handlers import (
     RotatingFileHandler,
 )
@@ -27,23 +28,69 @@ fio_webviewer = Flask(__name__,
 
 fio_webviewer.config.from_envvar('FIOWEBVIEWER_SETTINGS', silent=True)
 
-file_handler = RotatingFileHandler(
-    fio_webviewer.config['ERROR_LOG'],
-    maxBytes=1024 * 1024 * 100,
-    backupCount=20
-)
-file_handler.setLevel(logging.ERROR)
+_setup_lock = threading.Lock()
+# (logger, handler) pairs added by the last create_app() call
+_handlers = []
 
-from fiowebviewer.engine.api import *
-from fiowebviewer.engine.view import *
 
-if __name__ == '__main__':
-    fio_webviewer.debug = True
-    fio_webviewer.run(host='0.0.0.0')
-else:
-    application = fio_webviewer
+def _log_handler(path):
+    return RotatingFileHandler(path, maxBytes=1024 * 1024 * 100,
+                               backupCount=20)
+
+
+def _set_up_logging(config):
+    """
+    log to the files of config, instead of the ones of a previous call
+    """
+    for logger, handler in _handlers:
+        logger.removeHandler(handler)
+        handler.close()
+    del _handlers[:]
+    file_handler = _log_handler(config['ERROR_LOG'])
+    file_handler.setLevel(logging.ERROR)
+    fio_webviewer.logger.setLevel(logging.ERROR)
+    _handlers.append((fio_webviewer.logger, file_handler))
+    if config.get('SLOW_REQUEST_LOG'):
+        slow_logger = logging.getLogger('fiowebviewer.slow_requests')
+        slow_logger.setLevel(logging.WARNING)
+        _handlers.append((slow_logger,
+                          _log_handler(config['SLOW_REQUEST_LOG'])))
+    for logger, handler in _handlers:
+        logger.addHandler(handler)
+
 
+def create_app(config=None):
+    """
+    the application with its logging set up and its routes registered,
+    with config applied over the FIOWEBVIEWER_SETTINGS; every call sets
+    up logging again with the settings it results in, and in the 'pool'
+    INGEST_MODE submits the results left pending to the pool
+
+    Settings are read when needed, never copied at import time, and
+    heavy modules (pandas, pint) are only imported by the routes using
+    them, so a worker is ready to serve as soon as this returns.
+    """
+    with _setup_lock:
+        if config is not None:
+            fio_webviewer.config.update(config)
+        _set_up_logging(fio_webviewer.config)
+        # the route modules register their views when first imported
+        from fiowebviewer.engine import (  # noqa: F401
+            api,
+            ingest,
+            view,
+        )
+        data_path = fio_webviewer.config.get('DATA_PATH')
+        if data_path is not None:
+            # without waiting for an upload to start the pool
+            ingest.resume(data_path)
+    return fio_webviewer
+
+
+if __name__ == '__main__':
+    # the routes are registered on the app of the imported module
+    from fiowebviewer import application
+    application.debug = True
+    application.run(host='0.0.0.0')
 
-logger = application.logger
-logger.setLevel(logging.ERROR)
-logger.addHandler(file_handler)
+logger = fio_webviewer.logger
@@ -0,0 +1,199 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import os
+
+import numpy as np
+
+from fiowebviewer.engine import (
+    chunked,
+    pyramid,
+)
+from fiowebviewer.engine.logparser import (
+    LOG_COLUMNS as COLUMNS,
+    LOG_DTYPE as COLUMN_DTYPE,
+    REQUIRED_COLUMNS,
+    read_fio_log,
+)
+
+COLUMN_SUFFIX = '.npy'
+# io types in the order of fio's data direction (ddir) values
+IO_TYPES = ('read', 'write', 'trim')
+RAW_LOG_SUFFIX = '.log'
+LOG_SUFFIXES = tuple('{}.{}'.format(RAW_LOG_SUFFIX, io_type)
+                     for io_type in IO_TYPES)
+# written next to a raw log once split_log went through it
+SPLIT_SUFFIX = '.split'
+
+
+def column_path(log_path, column):
+    return '{}.{}{}'.format(log_path, column, COLUMN_SUFFIX)
+
+
+def is_converted(log_path):
+    return all(os.path.isfile(column_path(log_path, column))
+               for column in REQUIRED_COLUMNS)
+
+
+def parse_log(log_path):
+    return read_fio_log(log_path)
+
+
+def write_columns(log_path, columns):
+    for column, values in columns.items():
+        path = column_path(log_path, column)
+        tmp_path = '{}.tmp'.format(path)
+        with open(tmp_path, 'wb') as f:
+            np.save(f, np.asarray(values, dtype=COLUMN_DTYPE))
+        os.rename(tmp_path, path)
+
+
+def _close_writers(writers):
+    return [writer.log_path for writer in writers if writer.close()]
+
+
+def _discard_writers(writers):
+    for writer in writers:
+        writer.discard()
+
+
+def convert_log(log_path):
+    if not os.path.isfile(log_path) or os.path.getsize(log_path) == 0:
+        return False
+    if chunked.use_chunks(os.path.getsize(log_path)):
+        return _convert_log_in_chunks(log_path)
+    columns = parse_log(log_path)
+    if not len(columns['time']):
+        return False
+    write_columns(log_path, columns)
+    pyramid.write_pyramid(log_path, columns['time'], columns['value'])
+    return True
+
+
+def _convert_log_in_chunks(log_path):
+    writer = None
+    try:
+        for columns in chunked.iter_log(log_path):
+            if writer is None:
+                writer = chunked.SeriesWriter(log_path, list(columns),
+                                              column_path)
+            writer.append(columns)
+    except Exception:
+        if writer is not None:
+            writer.discard()
+        raise
+    return writer is not None and bool(_close_writers([writer]))
+
+
+def split_path(log_path, io_type):
+    return '{}.{}'.format(log_path, io_type)
+
+
+def split_marker_path(log_path):
+    return '{}{}'.format(log_path, SPLIT_SUFFIX)
+
+
+def _mark_split(log_path):
+    open(split_marker_path(log_path), 'w').close()
+
+
+def is_split(log_path):
+    """
+    whether the log was split by data direction, into text files before
+    the upload as fio-webviewer.sh used to or by split_log; the io types
+    it holds no rows of are not stored at all
+    """
+    return os.path.isfile(split_marker_path(log_path)) or \
+        any(os.path.isfile(split_path(log_path, io_type))
+            for io_type in IO_TYPES)
+
+
+def select_io_type(columns, io_type):
+    selected = columns['ddir'] == IO_TYPES.index(io_type)
+    return {column: values[selected] for column, values in columns.items()}
+
+
+def parse_raw_log(log_path, io_type):
+    columns = parse_log(log_path)
+    if 'ddir' not in columns:
+        return None
+    return select_io_type(columns, io_type)
+
+
+def split_log(log_path):
+    """
+    convert a raw log in one pass into the columns of every io type it
+    holds, stored as if it had been split into text files beforehand
+    """
+    if not os.path.isfile(log_path) or os.path.getsize(log_path) == 0:
+        return []
+    if chunked.use_chunks(os.path.getsize(log_path)):
+        return _split_log_in_chunks(log_path)
+    columns = parse_log(log_path)
+    if 'ddir' not in columns:
+        _mark_split(log_path)
+        return []
+    split = []
+    for io_type in IO_TYPES:
+        selected = select_io_type(columns, io_type)
+        if not len(selected['time']):
+            continue
+        io_type_path = split_path(log_path, io_type)
+        write_columns(io_type_path, selected)
+        pyramid.write_pyramid(io_type_path, selected['time'],
+                              selected['value'])
+        split.append(os.path.basename(io_type_path))
+    _mark_split(log_path)
+    return split
+
+
+def _split_log_in_chunks(log_path):
+    writers = {}
+    try:
+        for columns in chunked.iter_log(log_path):
+            if 'ddir' not in columns:
+                break
+            for io_type in IO_TYPES:
+                selected = select_io_type(columns, io_type)
+                if not len(selected['time']):
+                    continue
+                if io_type not in writers:
+                    writers[io_type] = chunked.SeriesWriter(
+                        split_path(log_path, io_type), list(columns),
+                        column_path)
+                writers[io_type].append(selected)
+    except Exception:
+        _discard_writers(writers.values())
+        raise
+    split = [os.path.basename(path) for path in _close_writers(
+        writers[io_type] for io_type in IO_TYPES if io_type in writers)]
+    _mark_split(log_path)
+    return split
+
+
+def convert_result(result_path):
+    converted = []
+    for filename in sorted(os.listdir(result_path)):
+        log_path = os.path.join(result_path, filename)
+        try:
+            if filename.endswith(LOG_SUFFIXES):
+                if convert_log(log_path):
+                    converted.append(filename)
+            elif filename.endswith(RAW_LOG_SUFFIX) and not is_split(log_path):
+                converted.extend(split_log(log_path))
+        except ValueError:
+            # malformed log, it will be read from the text file instead
+            continue
+    return converted
+
+
+def load_columns(log_path):
+    if not is_converted(log_path):
+        return None
+    columns = {}
+    for column in COLUMNS:
+        path = column_path(log_path, column)
+        if os.path.isfile(path):
+            columns[column] = np.load(path, mmap_mode='r')
+    return columns
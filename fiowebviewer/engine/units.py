@@ -0,0 +1,67 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+from collections import namedtuple
+
+# the first unit whose marker is part of a key applies, fio reports
+# latencies in usec, bandwidths in KB/s and sizes in KB
+UNITS = (
+    ('lat', 1000, 'ms'),
+    ('bw', 1000, 'MB / s'),
+    ('io', 1000, 'MB'),
+)
+PINT_UNITS = {
+    'ms': 'millisecond',
+    'MB / s': 'megabyte / second',
+    'MB': 'megabyte',
+}
+
+_registry = None
+
+
+class Quantity(namedtuple('Quantity', 'magnitude units')):
+    """
+    a converted value, printed the way pint prints abbreviated units
+    """
+    __slots__ = ()
+
+    def __str__(self):
+        if not self.units:
+            return str(self.magnitude)
+        return '{} {}'.format(self.magnitude, self.units)
+
+    def to_pint(self):
+        global _registry
+        # optional and slow to import, only needed here
+        import pint
+        if _registry is None:
+            _registry = pint.UnitRegistry()
+            _registry.default_format = '~'
+        if not self.units:
+            return _registry.Quantity(self.magnitude)
+        return self.magnitude * _registry(PINT_UNITS[self.units])
+
+
+def unit(key):
+    """
+    divisor and unit of the converted values of a metric
+    """
+    for marker, divisor, name in UNITS:
+        if marker in key:
+            return divisor, name
+    return 1, ''
+
+
+def convert(key, value, ndigits):
+    divisor, name = unit(key)
+    return Quantity(round(float(value) / divisor, ndigits), name)
+
+
+def format_duration(milliseconds):
+    """
+    duration as hours, minutes and seconds, e.g. 1h:02m:03s
+    """
+    minutes, seconds = divmod(int(milliseconds // 1000), 60)
+    hours, minutes = divmod(minutes, 60)
+    return "{}h:{:02d}m:{:02d}s".format(hours, minutes, seconds)
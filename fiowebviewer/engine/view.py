@@ -6,7 +6,10 @@ import datetime
 import os
 import re
 from collections import OrderedDict
-from fiowebviewer.engine.exceptions import FioOutputError
+from fiowebviewer.engine.exceptions import (
+    ArchiveError,
+    FioOutputError,
+)
 from shutil import rmtree
 
 from flask import (
@@ -20,6 +23,12 @@ from jinja2 import UndefinedError
 from sqlalchemy.orm.exc import NoResultFound
 from werkzeug import secure_filename
 
+from fiowebviewer.engine import (
+    archive,
+    compare,
+    diskcache,
+    ingest,
+)
 from fiowebviewer.engine.database import (
     DBSession,
     Result,
@@ -28,11 +37,13 @@ from fiowebviewer.engine.database import (
 from fiowebviewer.engine.run import fio_webviewer
 from fiowebviewer.engine.models import (
     FioResult,
-    FioResultComparator,
+    data_path,
+    invalidate_fio_result,
+    list_fio_results,
 )
 
 logger = fio_webviewer.logger
-DATA_PATH = fio_webviewer.config['DATA_PATH']
+INDEX_PAGE_SIZE = 100
 
 fio_table = OrderedDict()
 fio_table["Info"] = OrderedDict([
@@ -187,7 +198,7 @@ fio_table["lat (msec)"] = OrderedDict([
 
 def get_all_fio_results(DATA_PATH):
     session = DBSession()
-    return [FioResult(DATA_PATH, r.id)
+    return [FioResult.new_from_database(DATA_PATH, r.id)
             for r in session.query(Result).all()]
 
 
@@ -218,9 +229,10 @@ def generate_fio_webviewer_script():
 @fio_webviewer.route('/summary/<fio_result_id>', methods=['GET'])
 def view_detailed_fio_result(fio_result_id):
     try:
-        fio_result = FioResult(DATA_PATH, fio_result_id)
+        fio_result = FioResult.new_from_database(data_path(), fio_result_id)
         return render_template('fio_result.html',
-                               fio_result=fio_result)
+                               fio_result=fio_result,
+                               processing=ingest.PROCESSING)
     except NoResultFound as e:
         abort(404)
     except Exception as e:
@@ -231,7 +243,6 @@ def view_detailed_fio_result(fio_result_id):
 @fio_webviewer.route('/compare', methods=['GET'])
 def compare_fio_result():
     try:
-        all_fio_results = get_all_fio_results(DATA_PATH)
         fio_results_list = request.args.getlist('result')
         if request.args.get('delete'):
             session = DBSession()
@@ -239,17 +250,15 @@ def compare_fio_result():
                 try:
                     result = session.query(Result).filter(Result.id ==
                                                           fio_result).one()
+                    # tags are deleted along with the result
                     session.delete(result)
-                    tags = session.query(Tag).filter(Tag.result_id ==
-                                                     fio_result).all()
-                    for tag in tags:
-                        session.delete(tag)
                 except Exception as e:
                     session.rollback()
                     logger.exception(e)
                     abort(500)
                 else:
                     session.commit()
+                invalidate_fio_result(fio_result)
                 try:
                     CACHE_PATH = fio_webviewer.config['CACHE_PATH']
                 except KeyError:
@@ -259,41 +268,36 @@ def compare_fio_result():
                                                          fio_result)
                     if os.path.exists(fio_result_cache_path):
                         rmtree(fio_result_cache_path)
-                fio_result_data_path = os.path.join(DATA_PATH, fio_result)
+                    diskcache.forget(fio_result_cache_path)
+                fio_result_data_path = os.path.join(data_path(), fio_result)
                 if os.path.exists(fio_result_data_path):
                     rmtree(fio_result_data_path)
             session.close()
             return redirect('/', code=302)
 
         elif request.args.get('compare'):
-            selected_fio_results = [FioResult(DATA_PATH, fio_result)
-                                    for fio_result in fio_results_list]
+            selected_fio_results = [
+                FioResult.new_from_database(data_path(), fio_result)
+                for fio_result in fio_results_list]
+            # ValueError for an empty selection or an unknown baseline
+            reports, comparison = compare.compare_results(
+                selected_fio_results, request.args.get('baseline'))
             compared_fio_result = {}
-            group_report_count = 0
-            for fio_result in selected_fio_results:
-                compared_fio_result[fio_result.dir_name] = {}
-                group_report_count += len(fio_result.group_reports)
-                for fio_group_report in fio_result.group_reports:
-                    compared_fio_result[
-                        fio_result.dir_name
-                    ][fio_group_report.group_id] = {}
-                    fio_comparator = FioResultComparator()
-                    compared_fio_result[fio_result.dir_name][
-                        fio_group_report.group_id
-                    ] = fio_comparator.compare(
-                        fio_group_report,
-                        selected_fio_results[0].group_reports[0]
-                    )
+            for (fio_result, fio_group_report), diff in zip(
+                    reports, comparison.diffs()):
+                compared_fio_result.setdefault(fio_result.dir_name, {})[
+                    fio_group_report.group_id] = diff
             return render_template('fio_compare.html',
                                    results=fio_results_list,
-                                   fio_results=all_fio_results,
                                    fio_table=fio_table,
                                    selected_fio_results=selected_fio_results,
                                    compared_fio_result=compared_fio_result,
-                                   group_report_count=group_report_count + 1)
+                                   baseline=reports[comparison.baseline][
+                                       0].dir_name,
+                                   group_report_count=len(reports) + 1)
         else:
             raise UndefinedError
-    except UndefinedError as e:
+    except (UndefinedError, ValueError) as e:
         abort(400)
     except NoResultFound as e:
         abort(404)
@@ -305,9 +309,10 @@ def compare_fio_result():
 @fio_webviewer.route('/summary/<fio_result_id>/detailed', methods=['GET'])
 def view_detailed_fio_result_detailed(fio_result_id):
     try:
-        fio_result = FioResult(DATA_PATH, fio_result_id)
+        fio_result = FioResult.new_from_database(data_path(), fio_result_id)
         return render_template('fio_result_detailed.html',
-                               fio_result=fio_result)
+                               fio_result=fio_result,
+                               processing=ingest.PROCESSING)
     except NoResultFound as e:
         abort(404)
     except Exception as e:
@@ -317,34 +322,71 @@ def view_detailed_fio_result_detailed(fio_result_id):
 
 @fio_webviewer.route('/', methods=['GET'])
 def view_fio_results_index():
-    all_fio_results = get_all_fio_results(DATA_PATH)
+    tag = request.args.get('tag')
+    try:
+        after = request.args.get('after')
+        if after is not None:
+            after = int(after)
+        fio_results = list_fio_results(after, INDEX_PAGE_SIZE, tag)
+    except (ValueError, NoResultFound):
+        abort(400)
+    next_page = None
+    if len(fio_results) == INDEX_PAGE_SIZE:
+        next_page = fio_results[-1].dir_name
     return render_template('index.html',
-                           fio_results=all_fio_results)
+                           fio_results=fio_results,
+                           tag=tag,
+                           next_page=next_page,
+                           processing=ingest.PROCESSING)
+
+
+def read_name_and_tags(session, result, fio_result_path):
+    name_path = os.path.join(fio_result_path, 'fio-webviewer.name')
+    if os.path.isfile(name_path):
+        with open(name_path, 'r') as f:
+            result.name = f.read().strip()
+    tags_path = os.path.join(fio_result_path, 'fio-webviewer.tags')
+    if os.path.isfile(tags_path):
+        with open(tags_path, 'r') as f:
+            for line in f.readlines():
+                session.add(Tag(tag=line.strip(), result=result))
 
 
 @fio_webviewer.route('/', methods=['POST'])
+@fio_webviewer.route('/api/upload', methods=['POST'])
 def upload_fio_results():
     session = DBSession()
     new_result = Result(date_submitted=datetime.datetime.utcnow())
     session.add(new_result)
     session.flush()
-    fio_result_path = os.path.join(DATA_PATH, str(new_result.id))
+    fio_result_path = os.path.join(data_path(), str(new_result.id))
     try:
         os.mkdir(fio_result_path)
-        for upload_filename, upload_file in request.files.items():
-            logger.debug("Uploading file: {}".format(upload_file.filename))
-            local_file_path = os.path.join(
-                fio_result_path, secure_filename(upload_file.filename))
-            if "fio-webviewer.name" in upload_file.filename:
-                new_result.name = upload_file.read().strip()
-            if "fio-webviewer.tags" in upload_file.filename:
-                for line in upload_file.readlines():
-                    line = line.strip()
-                    new_tag = Tag(tag=line.decode(), result=new_result)
-                    session.add(new_tag)
-            upload_file.stream.seek(0)
-            upload_file.save(local_file_path)
+        if archive.is_archive(request.mimetype):
+            # fio-webviewer.sh sends a single archive as the request body,
+            # it is extracted while being received
+            logger.debug("Uploading archive: {}".format(request.mimetype))
+            archive.extract_archive(
+                request.stream, request.mimetype, fio_result_path,
+                fio_webviewer.config.get('MAX_UPLOAD_SIZE',
+                                         archive.MAX_SIZE))
+        else:
+            for upload_filename, upload_file in request.files.items():
+                logger.debug("Uploading file: {}".format(
+                    upload_file.filename))
+                local_file_path = os.path.join(
+                    fio_result_path, secure_filename(upload_file.filename))
+                upload_file.save(local_file_path)
+        read_name_and_tags(session, new_result, fio_result_path)
+        new_result.status = ingest.STATUS_QUEUED
 
+    except ArchiveError as e:
+        logger.warning("Rejected upload archive: {}".format(e))
+        logger.warning(
+            "Deleting fio results upload dir: {}".format(fio_result_path))
+        rmtree(fio_result_path)
+        session.rollback()
+        return "Bad Request ({})\n".format(e), 400
     except FioOutputError:
         logger.warning("Wrong format of fio-webviewer.input")
         logger.warning(
@@ -363,4 +405,8 @@ def upload_fio_results():
         return "Bad Request\n", 400
     else:
         session.commit()
-        return "Upload OK\n"
+        # ids of deleted results may be handed out again
+        invalidate_fio_result(new_result.id)
+        # conversion and summaries run after the upload is acknowledged
+        status = ingest.submit(data_path(), new_result.id)
+        return "Upload OK\nid: {}\nstatus: {}\n".format(new_result.id, status)
@@ -0,0 +1,117 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import os
+import time
+from collections import namedtuple
+
+from sqlalchemy import (
+    or_,
+)
+
+from fiowebviewer.engine import (
+    ingest,
+    series,
+)
+from fiowebviewer.engine.database import (
+    DBSession,
+    Result,
+    Tag,
+)
+from fiowebviewer.engine.models import (
+    FioResult,
+)
+
+Artifact = namedtuple('Artifact', 'key job_id log_type io_type')
+Warmed = namedtuple('Warmed', 'result_id written skipped size seconds error')
+
+
+def select_results(tag=None, since=None, until=None, first_id=None,
+                   last_id=None, limit=None):
+    """
+    ids of the processed results matching every given filter, newest first
+    """
+    session = DBSession()
+    try:
+        query = session.query(Result.id).filter(or_(
+            Result.status.is_(None), Result.status == ingest.STATUS_READY))
+        if tag is not None:
+            query = query.filter(Result.tags.any(Tag.tag == tag))
+        if since is not None:
+            query = query.filter(Result.date_submitted >= since)
+        if until is not None:
+            query = query.filter(Result.date_submitted < until)
+        if first_id is not None:
+            query = query.filter(Result.id >= first_id)
+        if last_id is not None:
+            query = query.filter(Result.id <= last_id)
+        query = query.order_by(Result.date_submitted.desc(),
+                               Result.id.desc())
+        if limit is not None:
+            query = query.limit(limit)
+        return [result_id for result_id, in query.all()]
+    finally:
+        session.close()
+
+
+def artifacts(fio_result):
+    """
+    cached frames the plots of a result read, job_id is None for the
+    combined series of all jobs
+    """
+    combined = set()
+    for group_report in fio_result.group_reports:
+        for job in group_report.jobs:
+            for fio_log in job.logs:
+                exists = fio_log.exists
+                # io types of unconverted raw logs are only known once
+                # they are parsed
+                raw = os.path.exists(fio_log.raw_path) and \
+                    not series.is_split(fio_log.raw_path)
+                for io_type in series.IO_TYPES:
+                    if not (raw or getattr(exists, io_type)):
+                        continue
+                    combined.add((fio_log.log_type, io_type))
+                    if fio_log.columns(io_type) is not None:
+                        continue  # converted, read without a cache file
+                    yield Artifact(
+                        fio_result.dataframe_cache_key(
+                            job.job_id, fio_log.log_type, io_type),
+                        job.job_id, fio_log.log_type, io_type)
+    for log_type, io_type in sorted(combined):
+        yield Artifact(fio_result.combined_cache_key(log_type, io_type),
+                       None, log_type, io_type)
+
+
+def warm_result(base_dir, result_id):
+    """
+    store the missing frames of a result, the ones already cached are
+    skipped so an interrupted warm-up resumes where it stopped
+    """
+    start = time.perf_counter()
+    written = skipped = size = 0
+    try:
+        fio_result = FioResult(base_dir, result_id)
+        store = fio_result.cache_store()
+        if store is None:  # caching disabled
+            return Warmed(result_id, 0, 0, 0, 0.0, None)
+        initial_size = store.size()
+        for artifact in artifacts(fio_result):
+            if artifact.key in store:
+                skipped += 1
+                continue
+            if artifact.job_id is None:
+                fio_result.combined_dataframe(artifact.log_type,
+                                              artifact.io_type)
+            else:
+                fio_result.to_dataframe(artifact.job_id, artifact.log_type,
+                                        artifact.io_type)
+            if artifact.key in store:
+                written += 1
+        size = store.size() - initial_size
+    except Exception as e:
+        return Warmed(result_id, written, skipped, size,
+                      time.perf_counter() - start, repr(e))
+    return Warmed(result_id, written, skipped, size,
+                  time.perf_counter() - start, None)
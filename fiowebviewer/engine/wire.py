@@ -0,0 +1,123 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import json
+import struct
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # msgpack responses are optional
+    msgpack = None
+
+JSON_MIMETYPE = 'application/json'
+BINARY_MIMETYPE = 'application/x-fiowebviewer-series'
+MSGPACK_MIMETYPE = 'application/x-msgpack'
+FORMATS = {
+    'json': JSON_MIMETYPE,
+    'binary': BINARY_MIMETYPE,
+    'msgpack': MSGPACK_MIMETYPE,
+}
+MAGIC = b'FWVS'
+# arrays start on multiples of 8 bytes, so typed arrays can view them
+ALIGNMENT = 8
+ARRAYS = ('x', 'y', 'y_min', 'y_max')
+DTYPES = ('<i4', '<f4', '<f8')
+INT32 = np.iinfo(np.int32)
+
+
+def available_formats():
+    formats = ['json', 'binary']
+    if msgpack is not None:
+        formats.append('msgpack')
+    return formats
+
+
+def compact(values, exact=False):
+    """
+    smallest of the wire dtypes which holds the values without loss of
+    range, integers (and durations) fitting int32 stay integers, other
+    values are single precision floats unless exact
+    """
+    values = np.asarray(values)
+    if values.dtype.kind == 'm':
+        values = values.astype(np.int64)
+    if values.dtype.kind in 'iu':
+        if not len(values) or (values.min() >= INT32.min and
+                               values.max() <= INT32.max):
+            return values.astype('<i4')
+        return values.astype('<f8')
+    return values.astype('<f8' if exact else '<f4')
+
+
+def _padding(size):
+    return -size % ALIGNMENT
+
+
+def encode(series_list):
+    """
+    MAGIC, the little-endian uint32 size of a json header describing
+    every series, then the arrays, field offsets count from the end of
+    the header
+    """
+    headers = []
+    arrays = []
+    offset = 0
+    for series in series_list:
+        header = {key: value for key, value in series.items()
+                  if key not in ARRAYS}
+        fields = []
+        for name in ARRAYS:
+            if name not in series:
+                continue
+            values = np.asarray(series[name])
+            if values.dtype.str not in DTYPES:
+                # x are seconds, single precision loses their msec
+                # after a few hours
+                values = compact(values, exact=name == 'x')
+            header['length'] = len(values)
+            fields.append(dict(name=name, dtype=values.dtype.str,
+                               offset=offset))
+            data = values.tobytes()
+            arrays.append(data + bytes(_padding(len(data))))
+            offset += len(arrays[-1])
+        if fields:
+            header['fields'] = fields
+        headers.append(header)
+    header = json.dumps(dict(series=headers)).encode()
+    header += b' ' * _padding(len(MAGIC) + 4 + len(header))
+    return b''.join([MAGIC, struct.pack('<I', len(header)), header] + arrays)
+
+
+def decode(data):
+    """
+    inverse of encode(), arrays are read only views of data
+    """
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError('Not a series payload')
+    size, = struct.unpack_from('<I', data, len(MAGIC))
+    start = len(MAGIC) + 4 + size
+    headers = json.loads(data[len(MAGIC) + 4:start].decode())
+    series_list = []
+    for header in headers['series']:
+        series = {key: value for key, value in header.items()
+                  if key not in ('fields', 'length')}
+        for field in header.get('fields', ()):
+            series[field['name']] = np.frombuffer(
+                data, dtype=field['dtype'], count=header['length'],
+                offset=start + field['offset'])
+        series_list.append(series)
+    return series_list
+
+
+def encode_msgpack(series_list):
+    """
+    arrays become lists of numbers, gaps stay NaN, floats are packed in
+    double precision for the x of downsampled series
+    """
+    return msgpack.packb(dict(series=[
+        {key: np.asarray(value).tolist() if key in ARRAYS else value
+         for key, value in series.items()}
+        for series in series_list]))
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import argparse
+
+from fiowebviewer import (
+    application,
+)
+from fiowebviewer.engine import (
+    database,
+    models,
+)
+
+DATA_PATH = application.config['DATA_PATH']
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--all', help='rewrite metrics of every result, not only '
+                    'of the ones without any', action='store_true',
+                    default=False)
+
+args = parser.parse_args()
+
+session = database.DBSession()
+query = session.query(database.Result.id)
+if not args.all:
+    query = query.filter(~database.Result.id.in_(
+        session.query(database.Metrics.result_id)))
+result_ids = [result_id for result_id, in query.all()]
+session.close()
+
+for result_id in result_ids:
+    try:
+        models.save_metrics(DATA_PATH, result_id)
+    except Exception as e:
+        print('{}: {}'.format(result_id, e))
+    else:
+        print('{}: OK'.format(result_id))
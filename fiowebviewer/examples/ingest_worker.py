@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+"""
+process uploads queued by a server configured with INGEST_MODE = 'external'
+"""
+
+import argparse
+import time
+from concurrent.futures import (
+    ProcessPoolExecutor,
+)
+
+from fiowebviewer import (
+    application,
+)
+from fiowebviewer.engine import (
+    database,
+    ingest,
+)
+
+DATA_PATH = application.config['DATA_PATH']
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--workers', type=int,
+                    default=application.config.get('INGEST_WORKERS',
+                                                   ingest.INGEST_WORKERS),
+                    help='number of worker processes')
+parser.add_argument('--interval', type=float, default=2,
+                    help='seconds between two polls of the queue')
+parser.add_argument('--once', action='store_true', default=False,
+                    help='process the queued results and exit')
+
+args = parser.parse_args()
+
+database.engine.dispose()
+with ProcessPoolExecutor(max_workers=args.workers,
+                         initializer=ingest.init_worker) as executor:
+    while True:
+        processed = ingest.process_pending(DATA_PATH, executor)
+        if processed:
+            print('processed {} result(s)'.format(processed))
+        if args.once:
+            break
+        time.sleep(args.interval)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+"""
+move the per-series .h5 files of CACHE_PATH written by older versions
+into the single store of each result, needs PyTables; safe to run while
+the application serves requests
+"""
+
+import argparse
+import os
+
+from fiowebviewer import (
+    application,
+)
+from fiowebviewer.engine import (
+    diskcache,
+    framestore,
+)
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--keep', action='store_true', default=False,
+                    help='keep the .h5 files once migrated')
+parser.add_argument('result_ids', nargs='*',
+                    help='results to migrate, all of them by default')
+
+args = parser.parse_args()
+
+cache_path = application.config.get('CACHE_PATH')
+if cache_path is None:
+    parser.error('caching is disabled, CACHE_PATH is not set')
+result_ids = args.result_ids or sorted(
+    dirname for dirname in os.listdir(cache_path)
+    if not dirname.startswith('.') and
+    os.path.isdir(os.path.join(cache_path, dirname)))
+total = 0
+for result_id in result_ids:
+    cache_dir = os.path.join(cache_path, result_id)
+    if not os.path.isdir(cache_dir):
+        continue
+    migrated = framestore.migrate(cache_dir, remove=not args.keep)
+    if migrated:
+        print('{}: {} file(s)'.format(result_id, migrated))
+    total += migrated
+# index the stores, forget the removed files
+diskcache.DiskCache(cache_path).sync()
+print('migrated {} file(s) of {} result(s)'.format(total, len(result_ids)))
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+"""
+evict files of CACHE_PATH until it fits CACHE_MAX_BYTES, safe to run
+while the application serves requests, e.g. from cron
+"""
+
+import argparse
+import json
+import time
+
+from fiowebviewer import (
+    application,
+)
+from fiowebviewer.engine import (
+    diskcache,
+)
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--max-bytes', type=int,
+                    default=application.config.get('CACHE_MAX_BYTES'),
+                    help='size budget of the cache, CACHE_MAX_BYTES by '
+                         'default')
+parser.add_argument('--policy', choices=diskcache.POLICIES,
+                    default=application.config.get('CACHE_EVICTION',
+                                                   diskcache.CACHE_EVICTION),
+                    help='evict least recently or least frequently used '
+                         'files first')
+parser.add_argument('--dry-run', action='store_true', default=False,
+                    help='only print what would be evicted')
+parser.add_argument('--stats', action='store_true', default=False,
+                    help='print the cache statistics and exit')
+parser.add_argument('--interval', type=float, default=None,
+                    help='keep pruning every INTERVAL seconds')
+
+args = parser.parse_args()
+
+disk_cache = diskcache.DiskCache(application.config['CACHE_PATH'],
+                                 args.max_bytes, args.policy)
+if args.stats:
+    disk_cache.sync()
+    print(json.dumps(disk_cache.stats(), indent=4))
+elif args.max_bytes is None:
+    parser.error('no budget, set CACHE_MAX_BYTES or --max-bytes')
+else:
+    while True:
+        evicted, freed = disk_cache.prune(dry_run=args.dry_run)
+        for path in evicted:
+            print(path)
+        print('{} {} file(s), {} byte(s)'.format(
+            'would evict' if args.dry_run else 'evicted', len(evicted),
+            freed))
+        if args.interval is None:
+            break
+        time.sleep(args.interval)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+"""
+precompute the cached frames of results, newest first, e.g. after a
+deploy or a cache wipe; frames already cached are skipped so it can be
+stopped and run again
+"""
+
+import argparse
+import datetime
+import os
+import time
+from concurrent.futures import (
+    ProcessPoolExecutor,
+    as_completed,
+)
+
+from fiowebviewer import (
+    application,
+)
+from fiowebviewer.engine import (
+    database,
+    ingest,
+    warmup,
+)
+
+DATA_PATH = application.config['DATA_PATH']
+
+
+def date(value):
+    return datetime.datetime.strptime(value, '%Y-%m-%d')
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                    help='number of worker processes')
+parser.add_argument('--tag', help='only results with this tag')
+parser.add_argument('--since', type=date,
+                    help='only results submitted on or after YYYY-MM-DD')
+parser.add_argument('--until', type=date,
+                    help='only results submitted before YYYY-MM-DD')
+parser.add_argument('--first-id', type=int, help='lowest result id')
+parser.add_argument('--last-id', type=int, help='highest result id')
+parser.add_argument('--limit', type=int, help='newest LIMIT results only')
+
+args = parser.parse_args()
+
+if application.config.get('CACHE_PATH') is None:
+    parser.error('caching is disabled, CACHE_PATH is not set')
+result_ids = warmup.select_results(args.tag, args.since, args.until,
+                                   args.first_id, args.last_id, args.limit)
+print('{} result(s) to warm up'.format(len(result_ids)))
+
+database.engine.dispose()
+start = time.perf_counter()
+written = size = failed = 0
+with ProcessPoolExecutor(max_workers=args.workers,
+                         initializer=ingest.init_worker) as executor:
+    # submitted newest first, so they are also processed first
+    futures = [executor.submit(warmup.warm_result, DATA_PATH, result_id)
+               for result_id in result_ids]
+    for done, future in enumerate(as_completed(futures), 1):
+        warmed = future.result()
+        written += warmed.written
+        size += warmed.size
+        if warmed.error is not None:
+            failed += 1
+            print('{}: {}'.format(warmed.result_id, warmed.error))
+        else:
+            print('{}: {} written, {} cached, {:.1f}s'.format(
+                warmed.result_id, warmed.written, warmed.skipped,
+                warmed.seconds))
+        elapsed = time.perf_counter() - start
+        print('[{}/{}] {:.2f} results/s, {:.1f} frames/s, {:.1f} MB/s'.format(
+            done, len(result_ids), done / elapsed, written / elapsed,
+            size / elapsed / 10 ** 6))
+
+print('{} frame(s), {:.1f} MB written in {:.1f}s, {} failed'.format(
+    written, size / 10 ** 6, time.perf_counter() - start, failed))
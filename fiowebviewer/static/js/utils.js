@@ -34,39 +34,12 @@ function fetchMeta(resultsids) {
     });
 }
 
-function calculateGranularity(width, start_frame, end_frame){
-    var widthInt = parseInt(width);
-    var i = 1;
-    var span = parseInt(end_frame - start_frame);
-    if(isNaN(span)) return 1;
-    while (true && i < 3600){
-        /*
-         * This function estimates plot width based on data span in miliseconds.
-         * First 10 values (1S, 2S, ... , 10S) for aggregation were taken from real aggregation
-         * in the application and using that data function had been estimated.
-         * Keep in mind that you cannot plot more samples on X axis then actual plot width on screen in pixels.
-         * Using this function you can estimate by how many seconds you had to aggregate.
-         * This function return first value for which number of points on X axis is lower then box plot width
-         * on screen in pixels.
-         */
-        var tmp = parseInt(span * 0.00125871022496 * Math.pow(1/i, 1.073596));
-        if(tmp < width) {
-            return i;
-        }
-        i++;
-    }
-}
-
 function getYaxisTitle(job, type){
     if(type == "bw") return "MB/s";
     else if(type == "iops") return "iops";
     else return "ms";
 }
 
-function getGranularity(difference){
-    return `${difference}S`;
-}
-
 function showLoading(job, type){
     $(`#plot${type}`).hide(0);
     $(`#plot${type}loader`).show(0);
@@ -84,24 +57,92 @@ function showError(job, type){
     $(`#plot${type}error`).show(0);
 }
 
-function fetchResult(result, job, type, start_frame, end_frame, iotype) {
+function seriesRequest(result, job, type, start_frame, end_frame, iotype) {
     if(llimit == 0 && rlimit == 0){
         start_frame = 0;
         end_frame = rmax;
     }
-    var width = document.getElementById(`plot${type}wrapper`).clientWidth;
-    var granularity = calculateGranularity(width, start_frame, end_frame);
-    if(granularity < 1) granularity = 1
-    granularity = getGranularity(granularity);
-    if(mode == "aggregated") {
-        var url = `/api/${result}/${type}.json?start_frame=${start_frame}&end_frame=${end_frame}&granularity=${granularity}&io_type=${iotype}`;
-    } else {
-        var url = `/api/${result}/${job}/${type}.json?start_frame=${start_frame}&end_frame=${end_frame}&granularity=${granularity}&io_type=${iotype}`;
-    }
-    showLoading(job, type);
-    return $.ajax({
-        url: url,
-        dataType: "json",
+    // one point per pixel, the server picks the bucket size
+    var maxPoints = document.getElementById(`plot${type}wrapper`).clientWidth;
+    return {
+        result: result,
+        job: (mode == "aggregated") ? "aggregated" : job,
+        log_type: type,
+        io_type: iotype,
+        start_frame: start_frame,
+        end_frame: end_frame,
+        max_points: maxPoints,
+        envelope: true,
+    };
+}
+
+var SERIES_MIMETYPE = "application/x-fiowebviewer-series";
+var SERIES_ARRAYS = {
+    "<i4": Int32Array,
+    "<f4": Float32Array,
+    "<f8": Float64Array,
+};
+
+// "FWVS", uint32 size of a json header, then the little-endian arrays
+// the header points to, NaN values are gaps
+function decodeSeries(buffer) {
+    var view = new DataView(buffer);
+    var size = view.getUint32(4, true);
+    var start = 8 + size;
+    var header = JSON.parse(new TextDecoder().decode(
+        new Uint8Array(buffer, 8, size)));
+    var series = header["series"].map(function(item){
+        var decoded = {};
+        for(var key in item) {
+            if(key != "fields" && key != "length") {
+                decoded[key] = item[key];
+            }
+        }
+        (item["fields"] || []).forEach(function(field){
+            // the bundled plotly does not plot typed arrays
+            decoded[field["name"]] = Array.from(new SERIES_ARRAYS[field["dtype"]](
+                buffer, start + field["offset"], item["length"]));
+        });
+        return decoded;
+    });
+    return { series: series };
+}
+
+// fetch every series of every plot in a single request
+function fetchSeries(requests) {
+    return fetch("/api/series", {
+        method: "POST",
+        headers: {
+            "Accept": SERIES_MIMETYPE,
+            "Content-Type": "application/json",
+        },
+        body: JSON.stringify({ series: requests }),
+    }).then(function(response){
+        if(!response.ok) {
+            throw new Error(`/api/series: ${response.status} ${response.statusText}`);
+        }
+        return response.arrayBuffer();
+    }).then(decodeSeries);
+}
+
+function drawPlots(plots, requests, results, jobs, mode) {
+    plots.forEach(function(plot){
+        showLoading(plot.job, plot.type);
+    });
+    fetchSeries(requests).then(function(response){
+        plots.forEach(function(plot){
+            var fetchedDataArray = plot.series.map(function(series){
+                var fetchedData = response["series"][series.index];
+                fetchedData['name'] = series.name;
+                return fetchedData;
+            });
+            drawPlot(fetchedDataArray, plot.job, plot.type, results, jobs, mode);
+        });
+    }).catch(function(error){
+        console.error(error);
+        plots.forEach(function(plot){
+            showError(plot.job, plot.type);
+        });
     });
 }
 
@@ -164,6 +205,31 @@ function drawPlot(inputData, job, type, results, jobs, mode) {
         } else {
             errors.push(false);
         }
+        if(inputd['y_min'] !== undefined) {
+            // min/max band of every bucket, so spikes hidden by the mean stay visible
+            arr.push({
+                x: inputd['x'],
+                y: inputd['y_min'],
+                mode: 'lines',
+                type: 'scatter',
+                line: { width: 0 },
+                hoverinfo: 'skip',
+                showlegend: false,
+                connectgaps: false,
+            });
+            arr.push({
+                x: inputd['x'],
+                y: inputd['y_max'],
+                mode: 'lines',
+                type: 'scatter',
+                fill: 'tonexty',
+                fillcolor: 'rgba(128, 128, 128, 0.2)',
+                line: { width: 0 },
+                hoverinfo: 'skip',
+                showlegend: false,
+                connectgaps: false,
+            });
+        }
         data = {
             x: inputd['x'],
             y: inputd['y'],
@@ -215,49 +281,41 @@ function drawPlot(inputData, job, type, results, jobs, mode) {
 }
 
 function drawAllPlots(layout, llimit, rlimit, results, jobs) {
-    var iotypes = ['read', 'write']
+    var iotypes = ['read', 'write', 'trim']
+    var plots = new Array();
+    var requests = new Array();
     jobs.forEach(function(job){
         job.types.forEach(function(type){
-            var promiseArray = new Array();
-            var fetchedDataArray = new Array();
-            (function(job,type){
-                results.forEach(function(result){
-                    iotypes.forEach(function(iotype){
-                        promiseArray.push(fetchResult(result.id, job.id, type, llimit, rlimit, iotype).then(function(fetchedData){
-                            fetchedData['name'] = `${iotype} ${result.name}`;
-                            fetchedDataArray.push(fetchedData);
-                        }))
-                    });
-                });
-                Promise.all(promiseArray).then(function(){
-                    drawPlot(fetchedDataArray, job.id, type, results, jobs, "aggregated");
+            var plot = { job: job.id, type: type, series: new Array() };
+            results.forEach(function(result){
+                iotypes.forEach(function(iotype){
+                    plot.series.push({ index: requests.length, name: `${iotype} ${result.name}` });
+                    requests.push(seriesRequest(result.id, job.id, type, llimit, rlimit, iotype));
                 });
-            })(job,type)
+            });
+            plots.push(plot);
         });
     });
+    drawPlots(plots, requests, results, jobs, "aggregated");
 }
 
 function drawAllPlotsDetailed(layout, llimit, rlimit, results, jobs) {
-    var iotypes = ['read', 'write']
+    var iotypes = ['read', 'write', 'trim']
+    var plots = new Array();
+    var requests = new Array();
     results.forEach(function(result){
         jobs[0].types.forEach(function(type){
-            var promiseArray = new Array();
-            var fetchedDataArray = new Array();
+            var plot = { job: jobs[0].id, type: type, series: new Array() };
             jobs.forEach(function(job){
-                (function(job,type){
-                    iotypes.forEach(function(iotype){
-                        promiseArray.push(fetchResult(result.id, job.id, type, llimit, rlimit, iotype).then(function(fetchedData){
-                            fetchedData['name'] = `${iotype} Job:${job.id} ${result.name}`;
-                            fetchedDataArray.push(fetchedData);
-                        }));
-                    });
-                })(job,type)
-                Promise.all(promiseArray).then(function(){
-                    drawPlot(fetchedDataArray, job.id, type, results, jobs, "detailed");
+                iotypes.forEach(function(iotype){
+                    plot.series.push({ index: requests.length, name: `${iotype} Job:${job.id} ${result.name}` });
+                    requests.push(seriesRequest(result.id, job.id, type, llimit, rlimit, iotype));
                 });
             });
+            plots.push(plot);
         });
     });
+    drawPlots(plots, requests, results, jobs, "detailed");
 }
 
 function startPlotting(modeLocal){
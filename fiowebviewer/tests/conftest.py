@@ -28,8 +28,10 @@ from fiowebviewer.engine.run import fio_webviewer
 from fiowebviewer.engine import (
     api,
     database,
+    ingest,
     models,
     view,
+    warmup,
 )
 from fiowebviewer.engine.database import (
     Result,
@@ -53,19 +55,33 @@ def temp_path(request):
 
 
 @pytest.fixture(scope="session")
-def temp_path_with_data(request, temp_path):
+def temp_path_with_data(request, temp_path, temp_cache_path):
     tmp_data_path = os.path.join(temp_path, 'data')
     os.mkdir(tmp_data_path)
-    view.DATA_PATH = tmp_data_path
-    models.DATA_PATH = tmp_data_path
-    api.DATA_PATH = tmp_data_path
+    fio_webviewer.config['DATA_PATH'] = tmp_data_path
     return tmp_data_path
 
 
+@pytest.fixture(scope="session")
+def temp_cache_path(request, temp_path):
+    tmp_cache_path = os.path.join(temp_path, 'cache')
+    os.mkdir(tmp_cache_path)
+    fio_webviewer.config['CACHE_PATH'] = tmp_cache_path
+    return tmp_cache_path
+
+
+def clear_cache_path():
+    cache_path = fio_webviewer.config['CACHE_PATH']
+    for child_dir in sorted(os.listdir(cache_path)):
+        rmtree(os.path.join(cache_path, child_dir))
+
+
 @pytest.fixture
 def app(request):
     app = fio_webviewer
     app.testing = True
+    # uploads are processed within the request unless a test says otherwise
+    app.config['INGEST_MODE'] = 'inline'
     return app
 
 
@@ -87,9 +103,12 @@ def session(request, temp_path):
     view.DBSession = DBSession
     models.DBSession = DBSession
     api.DBSession = DBSession
+    ingest.DBSession = DBSession
+    warmup.DBSession = DBSession
 
     def cleanup():
         database.Base.metadata.drop_all(engine)
+        models.fio_result_cache.clear()
     request.addfinalizer(cleanup)
 
     return DBSession()
@@ -106,6 +125,7 @@ def copy_sample_data(request, temp_path_with_data):
     for child_dir in sorted(os.listdir(temp_path_with_data)):
         child_dir_file_path = os.path.join(temp_path_with_data, child_dir)
         rmtree(child_dir_file_path)
+    clear_cache_path()
 
     def remove_sample_data():
         for child_dir in sorted(os.listdir(temp_path_with_data)):
@@ -114,6 +134,14 @@ def copy_sample_data(request, temp_path_with_data):
     request.addfinalizer(remove_sample_data)
 
 
+@pytest.fixture
+def clean_data_path(request, temp_path_with_data):
+    yield temp_path_with_data
+    for child_dir in sorted(os.listdir(temp_path_with_data)):
+        rmtree(os.path.join(temp_path_with_data, child_dir))
+    clear_cache_path()
+
+
 @pytest.fixture
 def database_with_results_only(request, temp_path_with_data, copy_sample_data,
                                session):
@@ -2,10 +2,28 @@
 # license that can be found in the LICENSE file.
 # Copyright 2019 The fiowebviewer Authors. All rights reserved.
 
+import gzip
+import io
 import json
+import os
+import tarfile
 
+import numpy as np
 import pytest
 
+from fiowebviewer.engine import (
+    framestore,
+    models,
+    wire,
+)
+from fiowebviewer.engine.database import (
+    Result,
+)
+from fiowebviewer.engine.models import (
+    FioResult,
+)
+from fiowebviewer.engine.run import fio_webviewer
+
 
 @pytest.mark.parametrize("result_id, result_name, logtypes", [
     ("1", "Testname1", ['bw', 'iops', 'lat', 'slat', 'clat']),
@@ -35,6 +53,107 @@ def test_api_put_valid_name(app, client, result_id, name, temp_path_with_data,
     assert response_dict['name'] == name
 
 
+def test_api_result_cache(app, client, temp_path_with_data,
+                          database_with_names):
+    client.get('/api/1')
+    client.get('/api/1')
+    info = json.loads(client.get('/api/cache').data.decode())
+    assert info['misses'] == 1
+    assert info['hits'] == 1
+    # renaming drops the cached result
+    client.put('/api/1', content_type="application/json",
+               data=json.dumps({"name": "Renamed"}))
+    response_dict = json.loads(client.get('/api/1').data.decode())
+    assert response_dict['name'] == "Renamed"
+    info = json.loads(client.get('/api/cache').data.decode())
+    assert info['misses'] == 2
+
+
+def test_api_results_pagination(app, client, temp_path_with_data,
+                                database_with_tags):
+    response = client.get('/api/results?limit=1')
+    page = json.loads(response.data.decode())
+    # newest first
+    assert [r['id'] for r in page['results']] == ['2']
+    assert page['results'][0]['tags'] == ['test2', 'test2 with space']
+    assert page['next'] == '2'
+    response = client.get('/api/results?limit=1&after=2')
+    page = json.loads(response.data.decode())
+    assert [r['id'] for r in page['results']] == ['1']
+    response = client.get('/api/results?limit=1&after=1')
+    page = json.loads(response.data.decode())
+    assert page == {'results': [], 'next': None}
+
+
+@pytest.mark.parametrize("query, ids", [
+    ("tag=test1", ['1']),
+    ("tag=test2+with+space", ['2']),
+    ("tag=unknown", []),
+    ("", ['2', '1']),
+])
+def test_api_results_tag(app, client, temp_path_with_data,
+                         database_with_tags, query, ids):
+    response = client.get('/api/results?{}'.format(query))
+    page = json.loads(response.data.decode())
+    assert [r['id'] for r in page['results']] == ids
+    assert page['next'] is None
+
+
+@pytest.mark.parametrize("query", [
+    "limit=foo",
+    "after=foo",
+    "after=42",
+])
+def test_api_results_invalid(app, client, temp_path_with_data,
+                             database_with_tags, query):
+    response = client.get('/api/results?{}'.format(query))
+    assert response.status_code == 400
+
+
+@pytest.fixture
+def metrics(temp_path_with_data, database_with_tags):
+    for result_id in ("1", "2"):
+        models.save_metrics(temp_path_with_data, result_id)
+
+
+def test_api_metrics_sort(app, client, metrics):
+    response = client.get('/api/metrics?rw=randrw&sort=-read_iops')
+    results = json.loads(response.data.decode())['results']
+    assert len(results) == 2
+    iops = [r['metrics']['read_iops'] for r in results]
+    assert iops == sorted(iops, reverse=True)
+    response = client.get('/api/metrics?sort=read_iops')
+    results = json.loads(response.data.decode())['results']
+    assert [r['metrics']['read_iops'] for r in results] == sorted(iops)
+
+
+def test_api_metrics_filter(app, client, metrics):
+    response = client.get('/api/metrics')
+    results = json.loads(response.data.decode())['results']
+    p99 = sorted(r['metrics']['read_clat_p99_usec'] for r in results)
+    response = client.get('/api/metrics?read_clat_p99_usec.lt={}'.format(
+        p99[1]))
+    results = json.loads(response.data.decode())['results']
+    assert [r['metrics']['read_clat_p99_usec'] for r in results] == p99[:1]
+    response = client.get('/api/metrics?tag=test1')
+    results = json.loads(response.data.decode())['results']
+    assert [r['id'] for r in results] == ['1']
+    assert results[0]['tags'] == ['test1', 'test1 with space']
+    response = client.get('/api/metrics?rw=randread')
+    assert json.loads(response.data.decode())['results'] == []
+
+
+@pytest.mark.parametrize("query", [
+    "read_iops.ne=1",
+    "foo.lt=1",
+    "read_iops.lt=foo",
+    "sort=foo",
+])
+def test_api_metrics_invalid(app, client, metrics, query):
+    response = client.get('/api/metrics?{}'.format(query))
+    assert response.status_code == 400
+
+
 @pytest.mark.parametrize("result_id", [
     ("1"),
     ("2"),
@@ -86,3 +205,327 @@ def test_api_json_data_aggregated(app, client, result_id, log_type,
                                                granularity, iotype))
     # this will fail if response cannot be parsed to dict
     json.loads(response.data)
+
+
+@pytest.mark.parametrize("log_type, iotype", [
+    ("bw", "read"),
+    ("clat", "write"),
+])
+def test_api_json_aggregated_cache(app, client, temp_path_with_data,
+                                   database_with_results_only, log_type,
+                                   iotype):
+    store = framestore.FrameStore(os.path.join(
+        fio_webviewer.config['CACHE_PATH'], '2', framestore.FILENAME))
+    key = FioResult.combined_cache_key(log_type, iotype)
+    url = '/api/2/{}.json?start_frame=7000&end_frame=30234&granularity=2S' \
+          '&io_type={}'.format(log_type, iotype)
+    assert key not in store
+    cold = json.loads(client.get(url).data)
+    assert key in store
+    warm = json.loads(client.get(url).data)
+    assert cold == warm
+    assert cold['x'][0] == 8
+    assert len(cold['x']) == len(cold['y'])
+
+
+@pytest.mark.parametrize("url", [
+    "/api/2/1/{}.json?start_frame=0&end_frame=30234&max_points={}"
+    "&io_type=read",
+    "/api/2/{}.json?start_frame=0&end_frame=30234&max_points={}"
+    "&io_type=read",
+])
+@pytest.mark.parametrize("log_type", ["bw", "clat"])
+@pytest.mark.parametrize("max_points", [3, 10])
+def test_api_json_max_points(app, client, temp_path_with_data,
+                             database_with_results_only, url, log_type,
+                             max_points):
+    response = client.get(url.format(log_type, max_points) + "&envelope=1")
+    series = json.loads(response.data.decode())
+    assert len(series['x']) <= max_points
+    assert len(series['x']) == len(series['y']) == len(series['y_min']) \
+        == len(series['y_max'])
+    for y, y_min, y_max in zip(series['y'], series['y_min'],
+                               series['y_max']):
+        if y != 'None':
+            assert y_min <= y <= y_max
+
+
+@pytest.mark.parametrize("url", [
+    "/api/2/1/bw.json?start_frame=0&end_frame=30234&max_points=20"
+    "&io_type=write&downsample={}",
+    "/api/2/bw.json?start_frame=0&end_frame=30234&max_points=20"
+    "&io_type=write&downsample={}",
+])
+@pytest.mark.parametrize("method", ["lttb", "m4"])
+def test_api_json_downsample(app, client, temp_path_with_data,
+                             database_with_results_only, url, method):
+    response = client.get(url.format(method))
+    series = json.loads(response.data.decode())
+    assert 0 < len(series['x']) <= 20
+    assert series['x'] == sorted(series['x'])
+
+
+@pytest.mark.parametrize("result_id, log_type", [
+    ("1", "clat"),  # raw logs
+    ("2", "bw"),
+    ("2", "iops"),
+])
+def test_api_json_units(app, client, temp_path_with_data,
+                        database_with_results_only, monkeypatch, result_id,
+                        log_type):
+    url = '/api/{}/1/{}.json?io_type=read'.format(result_id, log_type)
+    full = json.loads(client.get(url).data.decode())
+    # every sample is kept, only the units could differ
+    downsampled = json.loads(client.get(
+        url + '&start_frame=0&end_frame=10000000&max_points=100000'
+        '&downsample=lttb').data.decode())
+    assert len(full['x']) > 0
+    assert full == downsampled
+    assert wire.decode(client.get(url + '&format=binary').data)[0]['y']. \
+        tolist() == full['y']
+    # streamed for large logs
+    monkeypatch.setitem(fio_webviewer.config, 'CHUNKED_THRESHOLD', 0)
+    assert json.loads(client.get(url).data.decode()) == full
+
+
+def test_api_json_downsample_unknown(app, client, temp_path_with_data,
+                                     database_with_results_only):
+    response = client.get('/api/2/bw.json?max_points=20&downsample=foo')
+    assert response.status_code == 400
+
+
+def test_api_series_batch(app, client, temp_path_with_data,
+                          database_with_results_only):
+    requested = []
+    urls = []
+    for result_id in ("1", "2"):
+        for log_type in ("bw", "lat"):
+            for io_type in ("read", "write"):
+                requested.append(dict(result=result_id, job="aggregated",
+                                      log_type=log_type, io_type=io_type,
+                                      start_frame=0, end_frame=30234,
+                                      max_points=50, envelope=True))
+                urls.append('/api/{}/{}.json?start_frame=0&end_frame=30234'
+                            '&max_points=50&envelope=1&io_type={}'
+                            .format(result_id, log_type, io_type))
+    requested.append(dict(result="2", job=1, log_type="iops",
+                          io_type="write", start_frame=0, end_frame=15000,
+                          granularity="2S"))
+    urls.append('/api/2/1/iops.json?start_frame=0&end_frame=15000'
+                '&granularity=2S&io_type=write')
+    requested.append(dict(result="42", log_type="bw", io_type="read"))
+    # unknown jobs and log types
+    requested.append(dict(result="2", job=99, log_type="bw", io_type="read"))
+    requested.append(dict(result="2", job="x", log_type="bw",
+                          io_type="read", max_points=50, downsample="lttb"))
+    requested.append(dict(result="2", job=1, log_type="foo", io_type="read"))
+    response = client.post('/api/series', content_type="application/json",
+                           data=json.dumps({"series": requested}))
+    assert response.status_code == 200
+    series = json.loads(response.data.decode())['series']
+    assert len(series) == len(requested)
+    for url, batched in zip(urls, series):
+        assert json.loads(client.get(url).data.decode()) == batched
+    assert series[-4:] == [{"error": "404"}] * 4
+
+
+@pytest.mark.parametrize("data", [
+    "not json",
+    json.dumps({"no_series": []}),
+    json.dumps({"series": [{"result": "1"}]}),
+    json.dumps({"series": [{"result": "1", "log_type": "bw",
+                            "max_points": "many"}]}),
+])
+def test_api_series_batch_invalid(app, client, temp_path_with_data,
+                                  database_with_results_only, data):
+    response = client.post('/api/series', content_type="application/json",
+                           data=data)
+    assert response.status_code == 400
+
+
+def test_api_csv_streamed(app, client, temp_path_with_data,
+                          database_with_results_only):
+    response = client.get('/api/2/1/bw.csv?io_type=read')
+    assert response.is_streamed
+    assert 'Content-Length' not in response.headers
+    with open(os.path.join(temp_path_with_data, '2',
+                           'fio-webviewer_bw.1.log.read')) as f:
+        expected = ['{}.0,{}.0'.format(*line.split(', ')[:2])
+                    for line in f.read().splitlines()]
+    assert response.data.decode().splitlines() == expected
+    compressed = client.get('/api/2/1/bw.csv?io_type=read',
+                            headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(compressed.data) == response.data
+
+
+@pytest.mark.parametrize("url", [
+    "/api/2/1/bw.csv?start_frame=0&end_frame=30234&granularity=5S"
+    "&envelope=1&io_type=read",
+    "/api/2/bw.csv?granularity=5S&envelope=1&io_type=read",
+])
+def test_api_csv_granularity(app, client, temp_path_with_data,
+                             database_with_results_only, url):
+    series = json.loads(client.get(url.replace('.csv', '.json')).data)
+    rows = [line.split(',') for line in
+            client.get(url).data.decode().splitlines()]
+    assert [int(row[0]) for row in rows] == [x * 1000 for x in series['x']]
+    # csv values are not scaled to MiB/s
+    assert [round(float(row[1]) / 1000, 2) for row in rows] == series['y']
+    assert all(len(row) == 4 for row in rows)
+
+
+def test_api_raw_log_range(app, client, temp_path_with_data,
+                           database_with_results_only):
+    with open(os.path.join(temp_path_with_data, '2',
+                           'fio-webviewer_bw.1.log'), 'rb') as f:
+        raw_log = f.read()
+    response = client.get('/api/2/1/bw.log')
+    assert response.status_code == 200
+    assert response.data == raw_log
+    response = client.get('/api/2/1/bw.log', headers={'Range': 'bytes=5-20'})
+    assert response.status_code == 206
+    assert response.data == raw_log[5:21]
+    assert client.get('/api/2/7/bw.log').status_code == 404
+    assert client.get('/api/2/1/nope.log').status_code == 404
+
+
+@pytest.mark.parametrize("outputs, expected", [
+    ("0", []),
+    ("1", ['fio-webviewer.input', 'fio-webviewer.input.json',
+           'fio-webviewer.userargs']),
+])
+def test_api_targz(app, client, temp_path_with_data, database_with_names,
+                   outputs, expected):
+    response = client.get('/api/2/targz?outputs={}'.format(outputs))
+    assert response.is_streamed
+    assert response.headers['Content-Disposition'] == \
+        'attachment; filename=Testname2.tar.gz'
+    with tarfile.open(fileobj=io.BytesIO(response.data), mode='r:gz') as tar:
+        names = tar.getnames()
+    logs = sorted(filename for filename in
+                  os.listdir(os.path.join(temp_path_with_data, '2'))
+                  if filename.endswith('.log'))
+    assert names == logs + expected
+
+
+def test_api_targz_cache(app, client, temp_path_with_data,
+                         database_with_names):
+    app.config['ARCHIVE_CACHE'] = True
+    try:
+        cold = client.get('/api/2/targz?codec=none')
+        cache_file = os.path.join(app.config['CACHE_PATH'], '2',
+                                  'archive.default.tar')
+        assert cold.is_streamed
+        assert cold.data
+        assert os.path.isfile(cache_file)
+        warm = client.get('/api/2/targz?codec=none')
+        assert warm.headers['ETag'] == cold.headers['ETag']
+        assert warm.data == cold.data
+        assert client.get('/api/2/targz?codec=none',
+                          headers={'Range': 'bytes=0-511'}).status_code == 206
+    finally:
+        del app.config['ARCHIVE_CACHE']
+
+
+@pytest.mark.parametrize("query", [
+    "codec=lzma",
+    "level=fast",
+    "level=10",
+])
+def test_api_targz_invalid(app, client, temp_path_with_data,
+                           database_with_names, query):
+    assert client.get('/api/2/targz?{}'.format(query)).status_code == 400
+
+
+@pytest.mark.parametrize("url", [
+    "/api/2/json",
+    "/api/2/1/bw.csv?io_type=read",
+    "/api/2/1/bw.json?io_type=read&start_frame=0&end_frame=30234",
+    "/api/2/clat.json?io_type=write",
+    "/api/2/targz",
+])
+def test_api_conditional(app, client, temp_path_with_data,
+                         database_with_names, url, monkeypatch):
+    response = client.get(url)
+    etag = response.headers['ETag']
+    assert response.headers['Cache-Control'] == 'public, max-age=3600'
+
+    # not modified responses never load the result
+    def new_from_database(base_dir, fio_result_id):
+        raise AssertionError('result loaded')
+    monkeypatch.setattr(models.FioResult, 'new_from_database',
+                        new_from_database)
+    cached = client.get(url, headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.data == b''
+    cached = client.get(url, headers={
+        'If-Modified-Since': response.headers['Last-Modified']})
+    assert cached.status_code == 304
+    monkeypatch.undo()
+    assert client.get(url, headers={'If-None-Match': '"other"'}).data == \
+        response.data
+
+
+def test_api_conditional_changes(app, client, temp_path_with_data,
+                                 database_with_names):
+    etag = client.get('/api/2/targz').headers['ETag']
+    client.put('/api/2', content_type="application/json",
+               data=json.dumps({"name": "Renamed"}))
+    response = client.get('/api/2/targz', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    gzip_etag = client.get('/api/2/1/bw.csv?io_type=read', headers={
+        'Accept-Encoding': 'gzip'}).headers['ETag']
+    assert gzip_etag != client.get(
+        '/api/2/1/bw.csv?io_type=read').headers['ETag']
+
+
+def test_api_conditional_processing(app, client, temp_path_with_data,
+                                    database_with_names, session):
+    session.query(Result).filter(Result.id == 2).update(
+        {Result.status: 'converting'})
+    session.commit()
+    response = client.get('/api/2/json')
+    assert 'ETag' not in response.headers
+
+
+@pytest.mark.parametrize("url", [
+    "/api/2/1/bw.json?io_type=read",
+    "/api/2/1/clat.json?io_type=write&start_frame=0&end_frame=30234"
+    "&granularity=2S&envelope=1",
+    "/api/2/bw.json?io_type=read&start_frame=7000&end_frame=30234",
+    "/api/2/1/iops.json?io_type=read&start_frame=0&end_frame=30234"
+    "&max_points=20&downsample=lttb",
+])
+def test_api_json_binary(app, client, temp_path_with_data,
+                         database_with_results_only, url):
+    expected = json.loads(client.get(url).data.decode())
+    response = client.get(url, headers={'Accept': wire.BINARY_MIMETYPE})
+    assert response.mimetype == wire.BINARY_MIMETYPE
+    assert client.get(url + '&format=binary').data == response.data
+    series, = wire.decode(response.data)
+    for name, values in expected.items():
+        if name in wire.ARRAYS:
+            values = [np.nan if value == 'None' else value
+                      for value in values]
+            assert np.allclose(series[name], values, equal_nan=True)
+        else:
+            assert series[name] == values
+
+
+def test_api_series_batch_binary(app, client, temp_path_with_data,
+                                 database_with_results_only):
+    requested = [dict(result="2", job=1, log_type="bw", io_type="read",
+                      start_frame=0, end_frame=30234),
+                 dict(result="42", log_type="bw", io_type="read")]
+    response = client.post('/api/series?format=binary',
+                           content_type="application/json",
+                           data=json.dumps({"series": requested}))
+    series = wire.decode(response.data)
+    assert len(series[0]['x']) == len(series[0]['y']) > 0
+    assert series[1] == {"error": "404"}
+    response = client.post('/api/series?format=xml',
+                           content_type="application/json",
+                           data=json.dumps({"series": requested}))
+    assert response.status_code == 400
@@ -0,0 +1,149 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import io
+import os
+import tarfile
+
+import pytest
+import requests
+
+from fiowebviewer.engine import (
+    archive,
+)
+from fiowebviewer.engine.database import (
+    Result,
+)
+from fiowebviewer.engine.exceptions import (
+    ArchiveError,
+)
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           'samples', '2')
+
+
+def make_archive(members):
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w:gz') as tar:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            if data is None:
+                info.type = tarfile.SYMTYPE
+                info.linkname = '/etc/passwd'
+                tar.addfile(info)
+            else:
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+    buf.seek(0)
+    return buf
+
+
+def sample_archive():
+    buf = io.BytesIO()
+    with tarfile.open(fileobj=buf, mode='w:gz', compresslevel=1) as tar:
+        for filename in sorted(os.listdir(SAMPLE_PATH)):
+            if filename.startswith('fio-webviewer'):
+                tar.add(os.path.join(SAMPLE_PATH, filename), filename)
+    buf.seek(0)
+    return buf
+
+
+def test_extract_archive(temp_path):
+    path = os.path.join(temp_path, 'extract')
+    os.mkdir(path)
+    stream = make_archive([('fio-webviewer.name', b'name\n'),
+                           ('./fio-webviewer_bw.1.log', b'1, 2, 0, 4\n')])
+    filenames = archive.extract_archive(stream, 'application/gzip', path)
+    assert filenames == ['fio-webviewer.name', 'fio-webviewer_bw.1.log']
+    with open(os.path.join(path, 'fio-webviewer_bw.1.log')) as f:
+        assert f.read() == '1, 2, 0, 4\n'
+
+
+@pytest.mark.parametrize("members", [
+    [('../fio-webviewer.name', b'x')],
+    [('passwd', b'x')],
+    [('fio-webviewer.name', None)],
+    [('fio-webviewer.name', b'x'), ('fio-webviewer.name', b'y')],
+    [('fio-webviewer.name', b'x' * 600)],
+])
+def test_extract_archive_rejected(temp_path, members):
+    path = os.path.join(temp_path, 'rejected')
+    os.mkdir(path)
+    try:
+        with pytest.raises(ArchiveError):
+            archive.extract_archive(make_archive(members), 'application/gzip',
+                                    path, max_size=500)
+        assert not os.path.exists(os.path.join(temp_path,
+                                               'fio-webviewer.name'))
+    finally:
+        for filename in os.listdir(path):
+            os.remove(os.path.join(path, filename))
+        os.rmdir(path)
+
+
+def test_extract_broken_archive(temp_path):
+    with pytest.raises(ArchiveError):
+        archive.extract_archive(io.BytesIO(b'not an archive'),
+                                'application/gzip', temp_path)
+
+
+@pytest.mark.parametrize("url", ["/", "/api/upload"])
+def test_upload_archive(app, client, session, clean_data_path, url):
+    response = client.post(url, data=sample_archive(),
+                           content_type='application/gzip')
+    assert response.status_code == requests.codes.ok
+    result = session.query(Result).one()
+    assert result.name == 'Testname2'
+    assert [tag.tag for tag in result.tags] == ['test2', 'test2 with space']
+    assert os.path.isfile(os.path.join(
+        clean_data_path, str(result.id),
+        'fio-webviewer_bw.1.log.read.time.npy'))
+
+
+def test_upload_archive_rejected(app, client, session, clean_data_path):
+    app.config['MAX_UPLOAD_SIZE'] = 1024
+    try:
+        response = client.post('/api/upload', data=sample_archive(),
+                               content_type='application/gzip')
+    finally:
+        del app.config['MAX_UPLOAD_SIZE']
+    assert response.status_code == 400
+    assert not session.query(Result).count()
+    assert not os.listdir(clean_data_path)
+
+
+@pytest.mark.parametrize("codec, mode", [
+    ("gzip", "r:gz"),
+    ("none", "r:"),
+])
+def test_iter_archive(codec, mode):
+    paths = [os.path.join(SAMPLE_PATH, filename)
+             for filename in sorted(os.listdir(SAMPLE_PATH))
+             if filename.startswith(archive.MEMBER_PREFIX)]
+    data = b''.join(archive.iter_archive(paths, codec, level=1))
+    with tarfile.open(fileobj=io.BytesIO(data), mode=mode) as tar:
+        members = tar.getmembers()
+        assert [member.name for member in members] == \
+            [os.path.basename(path) for path in paths]
+        for member, path in zip(members, paths):
+            with open(path, 'rb') as f:
+                assert tar.extractfile(member).read() == f.read()
+
+
+def test_iter_archive_unknown_codec():
+    with pytest.raises(ArchiveError):
+        list(archive.iter_archive([], 'lzma'))
+
+
+def test_cache_stream(temp_path):
+    path = os.path.join(temp_path, 'archive.tar')
+    chunks = archive.cache_stream(iter([b'a', b'b']), path)
+    next(chunks)
+    chunks.close()
+    # an interrupted download leaves nothing behind
+    assert not [filename for filename in os.listdir(temp_path)
+                if filename.startswith('archive.tar')]
+    assert b''.join(archive.cache_stream(iter([b'a', b'b']), path)) == b'ab'
+    with open(path, 'rb') as f:
+        assert f.read() == b'ab'
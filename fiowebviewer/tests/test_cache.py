@@ -0,0 +1,83 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import pytest
+from sqlalchemy.orm.exc import NoResultFound
+
+from fiowebviewer.engine import (
+    cache,
+    models,
+)
+from fiowebviewer.engine.database import (
+    Result,
+    Tag,
+)
+from fiowebviewer.engine.models import (
+    FioResult,
+)
+
+
+@pytest.fixture
+def lru():
+    return cache.LRUCache(max_entries=3, max_bytes=100)
+
+
+def test_lru_get_put(lru):
+    assert lru.get('a') is None
+    lru.put('a', 1, 10)
+    assert lru.get('a') == 1
+    assert lru.info()['hits'] == 1
+    assert lru.info()['misses'] == 1
+    assert lru.info()['size'] == 10
+
+
+def test_lru_evicts_least_recently_used(lru):
+    for key in 'abc':
+        lru.put(key, key, 10)
+    lru.get('a')
+    lru.put('d', 'd', 10)
+    assert 'b' not in lru
+    assert all(key in lru for key in 'acd')
+
+
+def test_lru_evicts_by_size(lru):
+    lru.put('a', 'a', 60)
+    lru.put('b', 'b', 60)
+    assert 'a' not in lru
+    assert lru.info()['size'] == 60
+    # larger than the whole cache, never stored
+    lru.put('c', 'c', 101)
+    assert 'c' not in lru
+    assert len(lru) == 1
+
+
+def test_lru_invalidate(lru):
+    lru.put('a', 1, 10)
+    lru.put('a', 2, 20)
+    assert lru.info()['size'] == 20
+    lru.invalidate('a')
+    lru.invalidate('b')
+    assert lru.get('a') is None
+    assert lru.info()['size'] == 0
+
+
+def test_cached_result_reads_database(temp_path_with_data, session,
+                                      database_with_names):
+    fio_result = FioResult.new_from_database(temp_path_with_data, '1')
+    # renamed, tagged and deleted by another process, which cannot
+    # invalidate the cache of this one
+    result = session.query(Result).filter(Result.id == 1).one()
+    result.name = 'renamed'
+    session.add(Tag(tag='new', result_id=1))
+    session.commit()
+    assert FioResult.new_from_database(temp_path_with_data, '1') is \
+        fio_result
+    assert fio_result.fio_name == 'renamed'
+    assert [tag.tag for tag in fio_result.tags_list] == ['new']
+    session.query(Tag).delete()
+    session.delete(result)
+    session.commit()
+    with pytest.raises(NoResultFound):
+        FioResult.new_from_database(temp_path_with_data, '1')
+    assert '1' not in models.fio_result_cache
@@ -0,0 +1,206 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from fiowebviewer.engine import (
+    chunked,
+    logparser,
+    models,
+    pyramid,
+    series,
+)
+from fiowebviewer.engine.models import (
+    FioResult,
+)
+from fiowebviewer.engine.run import fio_webviewer
+
+
+@pytest.fixture
+def chunks_everywhere(monkeypatch):
+    # every log is processed in chunks of 500 rows
+    monkeypatch.setitem(fio_webviewer.config, 'CHUNKED_THRESHOLD', 0)
+    monkeypatch.setitem(fio_webviewer.config, 'CHUNK_MEMORY',
+                        500 * chunked.ROW_BYTES)
+
+
+def test_iter_fio_log(temp_path):
+    log_path = os.path.join(temp_path, 'malformed.log')
+    with open(log_path, 'w') as f:
+        f.write("1, 10, 0, 4096\n2, x, 1, 4096\n3, 30, 0, 4096\n"
+                "4, 40, 1\n5, 50, 0, 4096\n")
+    expected = logparser.read_fio_log(log_path)
+    chunks = list(logparser.iter_fio_log(log_path, 2))
+    assert len(chunks) == 3
+    for column, values in expected.items():
+        assert np.concatenate([chunk[column] for chunk in chunks]).tolist() \
+            == values.tolist()
+    os.remove(log_path)
+
+
+def test_iter_log_ddir(temp_path):
+    log_path = os.path.join(temp_path, 'raw.log')
+    with open(log_path, 'w') as f:
+        f.write("1, 10, 0, 4096\n2, 20, 1, 4096\n3, 30, 0, 4096\n")
+    chunks = list(chunked.iter_log(log_path, ddir=0, rows=2))
+    assert [chunk['time'].tolist() for chunk in chunks] == [[1], [3]]
+    os.remove(log_path)
+
+
+@pytest.mark.parametrize("granularity_ms, start_ms, end_ms", [
+    (1000, None, None),
+    (500, None, None),
+    (2000, 900, 61000),
+])
+def test_aggregate(granularity_ms, start_ms, end_ms):
+    rng = np.random.RandomState(0)
+    time = np.sort(rng.randint(1, 100000, size=1000))
+    value = rng.randint(1, 1000, size=1000)
+    columns = dict(time=time, value=value)
+    data, bucket_ms = chunked.aggregate(chunked.iter_columns(columns, 64),
+                                        granularity_ms, start_ms, end_ms)
+    assert bucket_ms == granularity_ms
+    data_frame = logparser.columns_to_dataframe(columns)
+    if start_ms is not None:
+        data_frame = data_frame[
+            (data_frame.index > np.timedelta64(start_ms, 'ms')) &
+            (data_frame.index < np.timedelta64(end_ms, 'ms'))]
+    expected = pyramid.resample_frame(data_frame, '{}L'.format(
+        granularity_ms), envelope=True)
+    result = pyramid.to_dataframe((data, bucket_ms), envelope=True)
+    assert result.index.equals(expected.index)
+    np.testing.assert_allclose(result[1].values, expected[1].values)
+    np.testing.assert_array_equal(result['min'].values,
+                                  expected['min'].values)
+
+
+def test_buckets():
+    buckets = chunked.Buckets()
+    buckets.add(pyramid.aggregate_samples([1, 2, 1500], [1, 3, 5], 1000))
+    buckets.add(pyramid.aggregate_samples([1800, 3000], [7, 9], 1000))
+    assert buckets.data().tolist() == [[1, 2, 4, 1, 3], [2, 2, 12, 5, 7],
+                                       [3, 1, 9, 9, 9]]
+    # out of order samples are merged too
+    buckets.add(pyramid.aggregate_samples([900], [2], 1000))
+    assert buckets.data()[0].tolist() == [1, 3, 6, 1, 3]
+
+
+def test_column_writer(temp_path):
+    path = os.path.join(temp_path, 'columns')
+    os.mkdir(path)
+    paths = {name: os.path.join(path, '{}.npy'.format(name))
+             for name in ('time', 'value')}
+    writer = chunked.ColumnWriter(paths)
+    writer.append(dict(time=np.arange(3), value=np.arange(3) * 2))
+    writer.append(dict(time=np.arange(3, 5), value=np.arange(3, 5) * 2))
+    writer.close()
+    assert np.load(paths['time']).tolist() == [0, 1, 2, 3, 4]
+    assert np.load(paths['value'], mmap_mode='r').tolist() == \
+        [0, 2, 4, 6, 8]
+    assert sorted(os.listdir(path)) == ['time.npy', 'value.npy']
+    for column_path in paths.values():
+        os.remove(column_path)
+    os.rmdir(path)
+
+
+@pytest.mark.parametrize("log_name", [
+    "fio-webviewer_bw.1.log.read",
+    "fio-webviewer_clat.2.log.write",
+])
+def test_convert_log_in_chunks(temp_path_with_data, copy_sample_data,
+                               chunks_everywhere, log_name):
+    log_path = os.path.join(temp_path_with_data, '2', log_name)
+    assert series.convert_log(log_path)
+    columns = series.load_columns(log_path)
+    expected = logparser.read_fio_log(log_path)
+    for column, values in expected.items():
+        assert columns[column].tolist() == values.tolist()
+    levels = pyramid.build_pyramid(expected['time'], expected['value'])
+    for level_ms, data in levels.items():
+        assert (np.load(pyramid.level_path(log_path, level_ms)) ==
+                data).all()
+    assert not [filename for filename in
+                os.listdir(os.path.dirname(log_path))
+                if filename.endswith(('.spool', '.tmp'))]
+
+
+def test_split_log_in_chunks(temp_path_with_data, copy_sample_data,
+                             chunks_everywhere):
+    log_path = os.path.join(temp_path_with_data, '1',
+                            'fio-webviewer_clat.1.log')
+    columns = logparser.read_fio_log(log_path)
+    split = series.split_log(log_path)
+    assert split
+    for filename in split:
+        io_type = filename.rsplit('.', 1)[1]
+        expected = series.select_io_type(columns, io_type)
+        loaded = series.load_columns(series.split_path(log_path, io_type))
+        assert loaded['time'].tolist() == expected['time'].tolist()
+        assert loaded['value'].tolist() == expected['value'].tolist()
+
+
+@pytest.mark.parametrize("granularity, window", [
+    ("500L", (None, None)),
+    ("1S", (None, None)),
+    ("1500L", (1000, 20000)),
+])
+def test_resample_in_chunks(temp_path_with_data, database_with_results_only,
+                            monkeypatch, granularity, window):
+    fio_result = FioResult(temp_path_with_data, '2')
+    expected = fio_result.resample(1, 'clat', 'read', granularity, *window,
+                                   envelope=True)
+    monkeypatch.setitem(fio_webviewer.config, 'CHUNKED_THRESHOLD', 0)
+    monkeypatch.setitem(fio_webviewer.config, 'CHUNK_MEMORY',
+                        500 * chunked.ROW_BYTES)
+    result = fio_result.resample(1, 'clat', 'read', granularity, *window,
+                                 envelope=True)
+    assert result.index.equals(expected.index)
+    np.testing.assert_allclose(result[1].values, expected[1].values)
+    np.testing.assert_allclose(result['max'].values, expected['max'].values)
+
+
+def chunks_without_parsing(monkeypatch):
+    monkeypatch.setitem(fio_webviewer.config, 'CHUNKED_THRESHOLD', 0)
+    monkeypatch.setitem(fio_webviewer.config, 'CHUNK_MEMORY',
+                        500 * chunked.ROW_BYTES)
+
+    def parse(fio_log, iotype):
+        raise AssertionError('large logs are not parsed at once')
+    monkeypatch.setattr(models.FioLog, 'parse', parse)
+
+
+@pytest.mark.parametrize("result_id, window", [
+    ("1", (None, None)),  # raw logs
+    ("1", (1000, 20000)),
+    ("2", (1000, 20000)),  # logs split before the upload
+])
+def test_window_in_chunks(temp_path_with_data, database_with_results_only,
+                          monkeypatch, result_id, window):
+    fio_result = FioResult(temp_path_with_data, result_id)
+    expected = fio_result.window(1, 'clat', 'read', *window)
+    csv = ''.join(fio_result.iter_csv(1, 'clat', 'read'))
+    chunks_without_parsing(monkeypatch)
+    time, value = fio_result.window(1, 'clat', 'read', *window)
+    assert time.tolist() == expected[0].tolist()
+    assert value.tolist() == expected[1].tolist()
+    assert ''.join(fio_result.iter_csv(1, 'clat', 'read')) == csv
+
+
+def test_api_json_in_chunks(app, client, temp_path_with_data,
+                            database_with_results_only, monkeypatch):
+    url = '/api/1/1/clat.json?io_type=read'
+    expected = json.loads(client.get(url).data.decode())
+    chunks_without_parsing(monkeypatch)
+    response = client.get(url)
+    assert response.is_streamed
+    assert json.loads(response.data.decode()) == expected
+    assert len(expected['x']) > 500
+    # binary series are only served downsampled
+    assert client.get(url + '&format=binary').status_code == 400
+    assert client.get(url + '&format=binary&start_frame=0&end_frame=30000'
+                      '&max_points=100').status_code == 200
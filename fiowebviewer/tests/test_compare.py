@@ -0,0 +1,99 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import json
+
+import numpy as np
+import pytest
+import requests
+
+from fiowebviewer.engine import (
+    compare,
+    view,
+)
+
+
+@pytest.fixture
+def fio_results(database_with_results_only, temp_path_with_data):
+    return view.get_all_fio_results(temp_path_with_data)
+
+
+def test_comparison_matches_comparator(database_with_results_only,
+                                       fio_comparator, reports_to_compare):
+    expected = fio_comparator.compare(reports_to_compare.selected,
+                                      reports_to_compare.referenced)
+    comparison = compare.Comparison([reports_to_compare.referenced,
+                                     reports_to_compare.selected])
+    diff = comparison.diffs()[1]
+    for key, value in expected.__dict__.items():
+        compared = diff.__dict__[key]
+        if isinstance(value, dict):
+            pairs = [(value[inner_key], compared[inner_key])
+                     for inner_key in value]
+        else:
+            pairs = [(value, compared)]
+        for legacy, vectorized in pairs:
+            assert vectorized.subtraction == pytest.approx(
+                legacy.subtraction)
+            assert vectorized.percentage_difference == pytest.approx(
+                legacy.percentage_difference)
+            assert vectorized.state == legacy.state
+
+
+def test_comparison_pairwise(fio_results):
+    group_reports = [group_report for fio_result in fio_results
+                     for group_report in fio_result.group_reports]
+    comparison = compare.Comparison(group_reports)
+    subtraction, percentage_difference, state = comparison.pairwise()
+    assert subtraction.shape == (len(group_reports), len(group_reports),
+                                 len(comparison.keys))
+    for baseline in range(len(group_reports)):
+        against = comparison.against(baseline)
+        assert np.array_equal(subtraction[:, baseline], against[0])
+        assert np.array_equal(percentage_difference[:, baseline],
+                              against[1], equal_nan=True)
+        assert (state[:, baseline] == against[2]).all()
+    # every report is neutral against itself
+    diagonal = state[np.arange(len(group_reports)),
+                     np.arange(len(group_reports))]
+    assert set(diagonal.flat) <= {'neutral', None}
+
+
+def test_compare_results_baseline(fio_results):
+    reports, comparison = compare.compare_results(fio_results, '2')
+    assert reports[comparison.baseline][0].dir_name == '2'
+    with pytest.raises(ValueError):
+        compare.compare_results(fio_results, '42')
+    with pytest.raises(ValueError):
+        compare.compare_results([])
+
+
+def test_fio_compare_baseline(app, client, database_with_tags,
+                              temp_path_with_data):
+    base_url = "/compare?compare=Compare+selected&result=1&result=2"
+    response = client.get(base_url + "&baseline=2")
+    assert response.status_code == requests.codes.ok
+    assert b'Use as baseline' in response.data
+    assert client.get(base_url + "&baseline=42").status_code == 400
+
+
+@pytest.mark.parametrize("pairwise", [False, True])
+def test_api_compare(app, client, database_with_names, temp_path_with_data,
+                     pairwise):
+    url = '/api/compare?result=1&result=2&baseline=2'
+    if pairwise:
+        url += '&pairwise=1'
+    compared = json.loads(client.get(url).data.decode())
+    assert [report['result'] for report in compared['reports']] == \
+        ['1', '2']
+    assert len(compared['values']) == 2
+    assert 'read_iops' in compared['metrics']
+    if pairwise:
+        assert compared['baseline'] is None
+        assert np.array(compared['state'], dtype=object).shape == \
+            (2, 2, len(compared['metrics']))
+    else:
+        assert compared['baseline'] == 1
+        assert set(compared['state'][1]) <= {'neutral', None}
+    assert client.get('/api/compare?result=42').status_code == 400
@@ -0,0 +1,177 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import json
+import os
+from shutil import (
+    rmtree,
+)
+
+import pytest
+
+from fiowebviewer.engine import (
+    diskcache,
+)
+from fiowebviewer.engine.models import (
+    FioResult,
+)
+from fiowebviewer.engine.run import fio_webviewer
+
+
+@pytest.fixture
+def cache_dir(request, temp_path):
+    path = os.path.join(temp_path, 'diskcache')
+    os.mkdir(path)
+    yield path
+    rmtree(path)
+
+
+def write(cache_dir, name, size):
+    path = os.path.join(cache_dir, name)
+    if not os.path.isdir(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'wb') as f:
+        f.write(bytes(size))
+    return path
+
+
+def test_stats(cache_dir):
+    disk_cache = diskcache.DiskCache(cache_dir, max_bytes=1000)
+    disk_cache.record_write(write(cache_dir, '1/a.h5', 100))
+    disk_cache.record_write(write(cache_dir, '2/a.h5', 300))
+    disk_cache.record_write(write(cache_dir, '1/b.h5', 50))
+    disk_cache.record_hit(os.path.join(cache_dir, '1/a.h5'))
+    disk_cache.record_miss()
+    stats = disk_cache.stats(top=1)
+    assert stats['size'] == 450
+    assert stats['entries'] == 3
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+    assert stats['hit_ratio'] == 0.5
+    assert stats['top'] == [dict(result='2', size=300)]
+
+
+@pytest.mark.parametrize("policy, evicted", [
+    ("lru", ['1/old.h5', '1/popular.h5']),
+    ("lfu", ['1/old.h5', '1/new.h5']),
+])
+def test_prune(cache_dir, policy, evicted):
+    disk_cache = diskcache.DiskCache(cache_dir, max_bytes=150, policy=policy)
+    for name in ('1/old.h5', '1/popular.h5', '1/new.h5'):
+        disk_cache.record_write(write(cache_dir, name, 100))
+    for _ in range(3):
+        disk_cache.record_hit(os.path.join(cache_dir, '1/popular.h5'))
+    disk_cache.record_write(os.path.join(cache_dir, '1/new.h5'))
+    # nothing is removed on a dry run
+    assert disk_cache.prune(dry_run=True) == (evicted, 200)
+    assert disk_cache.size() == 300
+    assert disk_cache.prune() == (evicted, 200)
+    assert disk_cache.size() == 100
+    assert sorted(os.listdir(os.path.join(cache_dir, '1'))) == \
+        sorted({'old.h5', 'popular.h5', 'new.h5'} -
+               {os.path.basename(name) for name in evicted})
+    # under budget
+    assert disk_cache.prune() == ([], 0)
+
+
+def test_sync(cache_dir):
+    disk_cache = diskcache.DiskCache(cache_dir)
+    disk_cache.record_write(write(cache_dir, '1/removed.h5', 10))
+    os.remove(os.path.join(cache_dir, '1/removed.h5'))
+    write(cache_dir, '1/unrecorded.h5', 20)
+    write(cache_dir, '1/partial.h5.1.2.tmp', 40)
+    disk_cache.sync()
+    assert disk_cache.stats()['entries'] == 1
+    assert disk_cache.size() == 20
+
+
+def test_forget(cache_dir):
+    disk_cache = diskcache.DiskCache(cache_dir)
+    disk_cache.record_write(write(cache_dir, '1/a.h5', 10))
+    disk_cache.record_write(write(cache_dir, '11/a.h5', 20))
+    disk_cache.forget(os.path.join(cache_dir, '1'))
+    assert disk_cache.stats()['top'] == [dict(result='11', size=20)]
+
+
+def test_buffered_accesses(cache_dir, monkeypatch):
+    disk_cache = diskcache.DiskCache(cache_dir)
+    assert disk_cache._connect() is disk_cache._connect()
+    path = write(cache_dir, '1/a.h5', 10)
+    disk_cache.record_write(path)
+    disk_cache.record_hit(path)
+    disk_cache.record_hit(path)
+    disk_cache.record_miss()
+    # another process only sees them once they are flushed
+    other = diskcache.DiskCache(cache_dir)
+    monkeypatch.setattr(other, 'flush', lambda: None)
+    assert other.stats()['hits'] == 0
+    disk_cache.flush()
+    stats = other.stats()
+    assert (stats['hits'], stats['misses']) == (2, 1)
+    # flushed by the first access after FLUSH_INTERVAL
+    monkeypatch.setattr(diskcache, 'FLUSH_INTERVAL', 0)
+    disk_cache.record_hit(write(cache_dir, '2/b.h5', 20))
+    stats = other.stats()
+    assert (stats['hits'], stats['entries']) == (3, 2)
+
+
+def test_unknown_policy(cache_dir):
+    with pytest.raises(ValueError):
+        diskcache.DiskCache(cache_dir, policy='fifo')
+
+
+def test_dataframe_cache_tracking(temp_path_with_data,
+                                  database_with_results_only):
+    fio_result = FioResult(temp_path_with_data, '2')
+    fio_result.to_dataframe(1, 'bw', 'read')
+    fio_result.to_dataframe(1, 'bw', 'read')
+    fio_result.to_dataframe(1, 'clat', 'read')
+    stats = diskcache.get_cache().stats()
+    # every frame of a result is appended to the same file
+    assert stats['entries'] == 1
+    assert stats['top'][0]['result'] == '2'
+    assert stats['top'][0]['size'] == fio_result.cache_store().size()
+    assert stats['hits'] >= 1
+
+
+def test_evicted_while_read(temp_path_with_data, database_with_results_only):
+    fio_result = FioResult(temp_path_with_data, '2')
+    expected = fio_result.to_dataframe(1, 'bw', 'read')
+    os.remove(fio_result.cache_store().path)
+    # recomputed instead of failing
+    assert fio_result.to_dataframe(1, 'bw', 'read').equals(expected)
+    assert FioResult.dataframe_cache_key(1, 'bw', 'read') in \
+        fio_result.cache_store()
+
+
+@pytest.mark.skipif(not os.path.exists('/proc/self/maps'),
+                    reason='needs the memory maps of the process')
+def test_pruned_store_is_released(temp_path_with_data,
+                                  database_with_results_only):
+    fio_result = FioResult.new_from_database(temp_path_with_data, '2')
+    fio_result.to_dataframe(1, 'bw', 'read')
+    path = fio_result.cache_store().path
+    data_frame = fio_result.to_dataframe(1, 'bw', 'read')
+    assert FioResult.dataframe_cache_key(1, 'bw', 'read') in \
+        fio_result.cache_store()
+    evicted, _ = diskcache.get_cache().prune(max_bytes=1)
+    assert os.path.relpath(path, diskcache.get_cache().path) in evicted
+    del data_frame
+    # the result stays cached, its store does not keep the file mapped
+    assert FioResult.new_from_database(temp_path_with_data, '2') is \
+        fio_result
+    with open('/proc/self/maps') as f:
+        assert path not in f.read()
+
+
+def test_api_disk_cache(app, client, temp_path_with_data,
+                        database_with_results_only, monkeypatch):
+    monkeypatch.setitem(fio_webviewer.config, 'CACHE_MAX_BYTES', 10 ** 9)
+    FioResult(temp_path_with_data, '1').to_dataframe(1, 'clat', 'read')
+    response = client.get('/api/cache/disk?top=5')
+    stats = json.loads(response.data.decode())
+    assert stats['max_bytes'] == 10 ** 9
+    assert stats['policy'] == 'lru'
+    assert stats['top'][0]['result'] == '1'
+    assert client.get('/api/cache/disk?top=x').status_code == 400
@@ -0,0 +1,46 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import numpy as np
+import pytest
+
+from fiowebviewer.engine import (
+    downsample,
+)
+
+
+@pytest.fixture
+def spiky_series():
+    x = np.arange(10000)
+    y = np.ones(10000)
+    y[1234] = 500
+    y[8765] = -300
+    return x, y
+
+
+@pytest.mark.parametrize("threshold", [3, 100, 1000])
+def test_lttb(spiky_series, threshold):
+    x, y = spiky_series
+    indices = downsample.lttb(x, y, threshold)
+    assert len(indices) == threshold
+    assert indices[0] == 0
+    assert indices[-1] == len(x) - 1
+    assert (np.diff(indices) > 0).all()
+    if threshold > 3:
+        assert 1234 in indices
+        assert 8765 in indices
+
+
+def test_lttb_small_input(spiky_series):
+    x, y = spiky_series
+    assert (downsample.lttb(x[:10], y[:10], 100) == np.arange(10)).all()
+
+
+@pytest.mark.parametrize("buckets", [1, 10, 250])
+def test_m4(spiky_series, buckets):
+    x, y = spiky_series
+    indices = downsample.m4(x, y, buckets)
+    assert len(indices) <= 4 * buckets
+    assert (np.diff(indices) > 0).all()
+    assert {0, len(x) - 1, 1234, 8765} <= set(indices.tolist())
@@ -3,11 +3,14 @@
 # Copyright 2019 The fiowebviewer Authors. All rights reserved.
 
 import os
+import subprocess
+import sys
 
 import pytest
 import requests
 
 from fiowebviewer.engine import (
+    models,
     view,
 )
 from fiowebviewer.engine.database import (
@@ -16,6 +19,10 @@ from fiowebviewer.engine.database import (
 from fiowebviewer.engine.models import (
     FioResult,
 )
+from fiowebviewer.engine.run import (
+    create_app,
+    fio_webviewer,
+)
 
 
 def test_fio_result_command_input_output(app, client,
@@ -80,6 +87,17 @@ def test_tags(app, client, fio_tag, database_with_tags):
     assert fio_tag in str(response.data)
 
 
+@pytest.mark.parametrize("fio_tag, shown, hidden", [
+    ("test1", "summary/1", "summary/2"),
+    ("test2", "summary/2", "summary/1"),
+])
+def test_index_tag_filter(app, client, fio_tag, shown, hidden,
+                          database_with_tags):
+    response = client.get('/?tag={}'.format(fio_tag))
+    assert shown in str(response.data)
+    assert hidden not in str(response.data)
+
+
 @pytest.mark.parametrize("fio_name", [
     ("Testname1"),
     ("Testname2"),
@@ -184,3 +202,84 @@ def test_fio_compare_table(app, client, database_with_tags, fio_result_ids,
     # -1 because entry in css
     results_generated = str(response.data).count("table-head") - 1
     assert results_generated == results_local
+
+
+def test_upload_converts_logs(app, client, session, clean_data_path):
+    sample_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              'samples', '2')
+    data = {}
+    for filename in sorted(os.listdir(sample_dir)):
+        if filename.startswith('fio-webviewer'):
+            data[filename] = (open(os.path.join(sample_dir, filename), 'rb'),
+                              filename)
+    response = client.post('/', data=data)
+    assert response.status_code == requests.codes.ok
+    result = session.query(Result).one()
+    result_path = os.path.join(clean_data_path, str(result.id))
+    assert os.path.isfile(os.path.join(
+        result_path, 'fio-webviewer_bw.1.log.read.time.npy'))
+    assert os.path.isfile(os.path.join(
+        result_path, 'fio-webviewer_bw.1.log.read.value.npy'))
+    response = client.get('/api/{}/1/bw.csv?io_type=read'.format(result.id))
+    assert response.data.decode().startswith('501.0,5320.0')
+    assert [metrics.rw for metrics in result.metrics] == ['randrw']
+
+
+def test_upload_raw_logs(app, client, session, clean_data_path):
+    sample_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              'samples', '2')
+    data = {}
+    for filename in sorted(os.listdir(sample_dir)):
+        # logs are not split by data direction before the upload
+        if filename.startswith('fio-webviewer') and \
+                not filename.endswith(('.read', '.write')):
+            data[filename] = (open(os.path.join(sample_dir, filename), 'rb'),
+                              filename)
+    response = client.post('/', data=data)
+    assert response.status_code == requests.codes.ok
+    result = session.query(Result).one()
+    result_path = os.path.join(clean_data_path, str(result.id))
+    assert not os.path.exists(os.path.join(
+        result_path, 'fio-webviewer_bw.1.log.read'))
+    response = client.get('/api/{}/1/bw.csv?io_type=read'.format(result.id))
+    assert response.data.decode().startswith('501.0,5320.0')
+    with open(os.path.join(sample_dir, 'fio-webviewer_clat.2.log.write')) as f:
+        expected = len(f.readlines())
+    response = client.get('/api/{}/2/clat.csv?io_type=write'.format(
+        result.id))
+    assert len(response.data.decode().splitlines()) == expected
+
+
+def test_startup_defers_heavy_modules():
+    # a new process, the test session imported them already
+    output = subprocess.check_output([
+        sys.executable, '-c',
+        'import sys; from fiowebviewer import application; '
+        'print(len(list(application.url_map.iter_rules())) > 1, '
+        '[name for name in ("pandas", "pint", "tables") '
+        'if name in sys.modules])'],
+        cwd=os.path.dirname(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__)))))
+    assert output.decode().split() == ['True', '[]']
+
+
+def test_create_app(app, temp_path, monkeypatch):
+    monkeypatch.setitem(fio_webviewer.config, 'DATA_PATH',
+                        fio_webviewer.config['DATA_PATH'])
+    moved = os.path.join(temp_path, 'moved')
+    # settings are read when used
+    assert create_app(dict(DATA_PATH=moved)) is app
+    assert models.data_path() == moved
+
+
+def test_create_app_logging(app, temp_path):
+    error_log = fio_webviewer.config['ERROR_LOG']
+    moved = os.path.join(temp_path, 'moved_error.log')
+    try:
+        create_app(dict(ERROR_LOG=moved))
+        fio_webviewer.logger.error('logged after the move')
+    finally:
+        create_app(dict(ERROR_LOG=error_log))
+    with open(moved) as f:
+        assert 'logged after the move' in f.read()
+    os.remove(moved)
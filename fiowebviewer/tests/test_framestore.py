@@ -0,0 +1,112 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import os
+from shutil import (
+    rmtree,
+)
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fiowebviewer.engine import (
+    framestore,
+    logparser,
+)
+from fiowebviewer.engine.models import (
+    FioResult,
+)
+
+
+@pytest.fixture
+def store_dir(request, temp_path):
+    path = os.path.join(temp_path, 'framestore')
+    os.mkdir(path)
+    yield path
+    rmtree(path)
+
+
+def frame(rows):
+    return logparser.columns_to_dataframe(dict(
+        time=np.arange(rows) * 1000, value=np.arange(rows) * 3))
+
+
+def combined_frame(rows):
+    index = pd.timedelta_range(0, periods=rows, freq='1S')
+    return pd.DataFrame({1: np.linspace(0, 1, rows),
+                         'min': np.zeros(rows), 'max': np.ones(rows)},
+                        index=index)
+
+
+def test_read_write(store_dir):
+    path = os.path.join(store_dir, framestore.FILENAME)
+    store = framestore.FrameStore(path)
+    assert store.read('bw.1.read') is None
+    assert store.write('bw.1.read', frame(10))
+    assert store.write('clat.combined.read', combined_frame(5))
+    assert not store.write('bw.1.read', frame(3))
+    # a second reader of the same file, e.g. another process
+    other = framestore.FrameStore(path)
+    assert sorted(other.keys()) == ['bw.1.read', 'clat.combined.read']
+    assert other.read('bw.1.read').equals(frame(10))
+    assert other.read('clat.combined.read').equals(combined_frame(5))
+    # writes of the other reader are seen
+    store.write('iops.1.write', frame(0))
+    assert other.read('iops.1.write').equals(frame(0))
+    assert sorted(os.listdir(store_dir)) == [framestore.FILENAME]
+
+
+def test_partial_read(store_dir):
+    store = framestore.FrameStore(os.path.join(store_dir,
+                                               framestore.FILENAME))
+    store.write('clat.combined.read', combined_frame(10))
+    data_frame = store.read('clat.combined.read', columns=['max', 1],
+                            start=2, stop=5)
+    assert data_frame.equals(combined_frame(10)[['max', 1]].iloc[2:5])
+    with pytest.raises(KeyError):
+        store.read('clat.combined.read', columns=['median'])
+
+
+def test_incomplete_write(store_dir):
+    path = os.path.join(store_dir, framestore.FILENAME)
+    store = framestore.FrameStore(path)
+    store.write('bw.1.read', frame(10))
+    with open(path, 'ab') as f:
+        f.write(framestore._record(os.path.getsize(path), 'bw.2.read',
+                                   frame(10))[:100])
+    other = framestore.FrameStore(path)
+    assert other.read('bw.1.read') is None
+    # replaced by the next writer
+    assert other.write('bw.2.read', frame(4))
+    assert store.keys() == ['bw.2.read']
+    assert sorted(os.listdir(store_dir)) == [framestore.FILENAME]
+
+
+def test_evicted(store_dir):
+    path = os.path.join(store_dir, framestore.FILENAME)
+    store = framestore.FrameStore(path)
+    store.write('bw.1.read', frame(10))
+    data_frame = store.read('bw.1.read')
+    os.remove(path)
+    assert store.read('bw.1.read') is None
+    assert data_frame.equals(frame(10))
+    store.write('bw.1.read', frame(2))
+    assert store.read('bw.1.read').equals(frame(2))
+
+
+def test_migrate(temp_path_with_data, database_with_results_only):
+    fio_result = FioResult(temp_path_with_data, '2')
+    cache_dir = fio_result.get_cache_dir()
+    os.makedirs(cache_dir)
+    expected = fio_result.combined_dataframe('clat', 'read')
+    os.remove(fio_result.cache_store().path)
+    # as written by earlier versions
+    expected.rename(columns={1: 'mean'}).to_hdf(
+        os.path.join(cache_dir, 'clat.combined.read.h5'), 'df', mode='w')
+    frame(10).to_hdf(os.path.join(cache_dir, 'bw.1.read.h5'), 'df', mode='w')
+    assert framestore.migrate(cache_dir) == 2
+    assert os.listdir(cache_dir) == [framestore.FILENAME]
+    assert fio_result.combined_dataframe('clat', 'read').equals(expected)
+    assert fio_result.cache_store().read('bw.1.read').equals(frame(10))
@@ -0,0 +1,131 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import json
+import os
+
+import pytest
+import requests
+
+from fiowebviewer.engine import (
+    ingest,
+    run,
+)
+from fiowebviewer.engine.database import (
+    Metrics,
+    Result,
+)
+
+SAMPLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           'samples', '2')
+
+
+@pytest.fixture
+def queued_upload(app, client, session, clean_data_path):
+    app.config['INGEST_MODE'] = 'external'
+    data = {}
+    for filename in sorted(os.listdir(SAMPLE_PATH)):
+        if filename.startswith('fio-webviewer'):
+            data[filename] = (open(os.path.join(SAMPLE_PATH, filename), 'rb'),
+                              filename)
+    response = client.post('/', data=data)
+    assert response.status_code == requests.codes.ok
+    result = session.query(Result).one()
+    assert 'id: {}'.format(result.id) in response.data.decode()
+    return result.id
+
+
+def get_status(client, result_id):
+    response = client.get('/api/{}/status'.format(result_id))
+    return json.loads(response.data.decode())
+
+
+def test_upload_is_queued(client, session, clean_data_path, queued_upload):
+    status = get_status(client, queued_upload)
+    assert status['status'] == ingest.STATUS_QUEUED
+    assert status['progress'] == 0
+    assert not os.path.exists(os.path.join(
+        clean_data_path, str(queued_upload),
+        'fio-webviewer_bw.1.log.read.time.npy'))
+    assert 'processing' in client.get('/').data.decode()
+    response = client.get('/summary/{}'.format(queued_upload))
+    assert 'id="fio-processing"' in response.data.decode()
+
+    assert ingest.process_pending(clean_data_path) == 1
+    assert ingest.process_pending(clean_data_path) == 0
+    status = get_status(client, queued_upload)
+    assert status['status'] == ingest.STATUS_READY
+    assert status['progress'] == 1
+    assert os.path.exists(os.path.join(
+        clean_data_path, str(queued_upload),
+        'fio-webviewer_bw.1.log.read.time.npy'))
+    assert session.query(Metrics).count() == 1
+    response = client.get('/summary/{}'.format(queued_upload))
+    assert 'id="fio-processing"' not in response.data.decode()
+
+
+def test_process_failed(client, clean_data_path, queued_upload):
+    os.remove(os.path.join(clean_data_path, str(queued_upload),
+                           'fio-webviewer.input.json'))
+    assert ingest.process_result(clean_data_path, queued_upload) == \
+        ingest.STATUS_FAILED
+    status = get_status(client, queued_upload)
+    assert status['status'] == ingest.STATUS_FAILED
+    assert status['progress'] is None
+    # only queued results are processed
+    assert ingest.process_result(clean_data_path, queued_upload) is None
+
+
+@pytest.mark.parametrize("status", [
+    ingest.STATUS_CONVERTING,
+    ingest.STATUS_SUMMARIZING,
+])
+def test_process_stale(client, clean_data_path, queued_upload, status):
+    # left by a worker which died
+    ingest.set_status(queued_upload, status)
+    # not while another worker holds the result
+    lock = ingest._try_lock(clean_data_path, queued_upload)
+    assert ingest.process_pending(clean_data_path) == 0
+    assert get_status(client, queued_upload)['status'] == status
+    lock.close()
+    assert ingest.process_pending(clean_data_path) == 1
+    assert get_status(client, queued_upload)['status'] == \
+        ingest.STATUS_READY
+
+
+class SerialExecutor(object):
+    def __init__(self, max_workers, initializer):
+        self.submitted = []
+
+    def submit(self, fn, *args):
+        self.submitted.append(args)
+        return fn(*args)
+
+
+def test_pool_resumes(app, client, clean_data_path, queued_upload,
+                      monkeypatch):
+    monkeypatch.setattr(ingest, 'ProcessPoolExecutor', SerialExecutor)
+    monkeypatch.setattr(ingest, '_executor', None)
+    # not in the other modes
+    run.create_app()
+    assert ingest._executor is None
+    # the results queued before a restart, without waiting for an upload
+    app.config['INGEST_MODE'] = 'pool'
+    run.create_app()
+    assert ingest._executor.submitted == [(clean_data_path, queued_upload)]
+    assert get_status(client, queued_upload)['status'] == \
+        ingest.STATUS_READY
+    assert ingest.resume(clean_data_path) == 0
+    # the lock files are kept out of the result
+    assert sorted(os.listdir(clean_data_path)) == [str(queued_upload)]
+    assert not [filename for filename in
+                os.listdir(os.path.join(clean_data_path, str(queued_upload)))
+                if filename.startswith('.')]
+
+
+def test_status_not_found(client, database_with_results_only):
+    assert client.get('/api/42/status').status_code == 404
+    # results uploaded before the status column existed
+    status = get_status(client, 1)
+    assert status['status'] == ingest.STATUS_READY
@@ -0,0 +1,121 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import json
+import logging
+
+import pytest
+
+from fiowebviewer.engine import (
+    instrumentation,
+)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super(ListHandler, self).__init__()
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+@pytest.fixture
+def instrumented(request, app, monkeypatch):
+    monkeypatch.setitem(app.config, 'INSTRUMENTATION', True)
+    instrumentation.registry.clear()
+    yield app
+    instrumentation.registry.clear()
+
+
+def test_histogram():
+    histogram = instrumentation.Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.7, 5.0):
+        histogram.observe(value)
+    assert list(histogram.cumulative()) == [(0.1, 1), (1.0, 3)]
+    assert histogram.count == 4
+    assert histogram.sum == pytest.approx(6.25)
+
+
+def test_registry_render():
+    registry = instrumentation.Registry()
+    registry.observe('fiowebviewer_request_seconds', 0.02, route='/a"b')
+    registry.inc('fiowebviewer_cache_requests_total', cache='hdf5',
+                 outcome='hit')
+    text = registry.render({('fiowebviewer_cache_requests_total',
+                             (('cache', 'hdf5'), ('outcome', 'miss'))): 3})
+    lines = text.splitlines()
+    assert '# TYPE fiowebviewer_request_seconds histogram' in lines
+    assert 'fiowebviewer_request_seconds_bucket{route="/a\\"b",le="0.01"} 0' \
+        in lines
+    assert 'fiowebviewer_request_seconds_bucket{route="/a\\"b",le="0.025"} 1' \
+        in lines
+    assert 'fiowebviewer_request_seconds_count{route="/a\\"b"} 1' in lines
+    assert 'fiowebviewer_cache_hit_ratio{cache="hdf5"} 0.25' in lines
+
+
+def test_server_timing():
+    assert instrumentation.server_timing(
+        {'encode': 0.002, 'db': 0.0015}, 0.01) == \
+        'db;dur=1.50, encode;dur=2.00, total;dur=10.00'
+
+
+def test_disabled(app, client, temp_path_with_data, database_with_names):
+    response = client.get('/api/1/1/bw.json?io_type=read')
+    assert 'Server-Timing' not in response.headers
+    assert client.get('/metrics').status_code == 404
+
+
+def test_server_timing_header(instrumented, client, temp_path_with_data,
+                              database_with_names):
+    response = client.get('/api/1/1/bw.json?io_type=read')
+    assert response.status_code == 200
+    stages = [metric.split(';')[0]
+              for metric in response.headers['Server-Timing'].split(', ')]
+    assert stages[0] == 'db'
+    assert 'encode' in stages
+    assert stages[-1] == 'total'
+
+
+def test_metrics(instrumented, client, temp_path_with_data,
+                 database_with_names):
+    client.get('/api/1/1/clat.json?io_type=read&granularity=1S'
+               '&start_frame=0&end_frame=100000')
+    client.get('/api/1/1/clat.json?io_type=read&granularity=1S'
+               '&start_frame=0&end_frame=100000')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    lines = response.data.decode().splitlines()
+    assert 'fiowebviewer_request_seconds_count{method="GET",' \
+        'route="/api/<fio_result_id>/<job_id>/<log_type>.json",' \
+        'status="200"} 2' in lines
+    assert any(line.startswith(
+        'fiowebviewer_stage_seconds_count{stage="resample"}')
+        for line in lines)
+    assert any(line.startswith('fiowebviewer_bytes_read_total')
+               for line in lines)
+    # the second request is answered from the cached result
+    assert 'fiowebviewer_cache_hit_ratio{cache="result"} 0.5' in lines
+
+
+def test_slow_request_log(instrumented, client, temp_path_with_data,
+                          database_with_names, monkeypatch):
+    handler = ListHandler()
+    instrumentation.slow_logger.addHandler(handler)
+    try:
+        monkeypatch.setitem(instrumented.config, 'SLOW_REQUEST_MS', 0)
+        client.get('/api/1/1/bw.json?io_type=read')
+    finally:
+        instrumentation.slow_logger.removeHandler(handler)
+    assert len(handler.messages) == 1
+    message = handler.messages[0]
+    assert message.startswith('slow request ')
+    logged = json.loads(message[len('slow request '):])
+    assert logged['args'] == {'io_type': ['read']}
+    assert logged['view_args'] == {'fio_result_id': '1', 'job_id': '1',
+                                   'log_type': 'bw'}
+    assert logged['queries'] >= 1
+    assert any(key.startswith('fiowebviewer_rows_read_total')
+               for key in logged['counts'])
@@ -0,0 +1,56 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import os
+
+import numpy as np
+import pytest
+
+from fiowebviewer.engine import (
+    logparser,
+)
+
+
+@pytest.fixture
+def log_file(request, temp_path):
+    log_path = os.path.join(temp_path, 'fio-webviewer_test.1.log')
+    with open(log_path, 'w') as f:
+        f.write(request.param)
+
+    def cleanup():
+        os.remove(log_path)
+    request.addfinalizer(cleanup)
+    return log_path
+
+
+@pytest.mark.parametrize("log_file, time, value", [
+    ("501, 5320, 0, 4096\n1011, 3666, 0, 16384\n",
+     [501, 1011], [5320, 3666]),
+    # offset column is not read
+    ("501, 5320, 1, 4096, 8192\n1011, 3666, 1, 4096, 0\n",
+     [501, 1011], [5320, 3666]),
+    # truncated trailing line
+    ("501, 5320, 0, 4096\n1011, 3666, 0, 16384\n1513, 26",
+     [501, 1011], [5320, 3666]),
+    ("501, 5320, 0, 4096\n1011, 3666, 0, 16384\n1513",
+     [501, 1011], [5320, 3666]),
+    # malformed lines in the middle
+    ("501, 5320, 0, 4096\nfoo, bar, 0, 4096\n1513, 2671, 0, 16384\n",
+     [501, 1513], [5320, 2671]),
+    ("", [], []),
+], indirect=["log_file"])
+def test_read_fio_log(log_file, time, value):
+    columns = logparser.read_fio_log(log_file)
+    assert columns['time'].dtype == np.int64
+    assert columns['time'].tolist() == time
+    assert columns['value'].tolist() == value
+
+
+@pytest.mark.parametrize("log_file", [
+    "501, 5320, 0, 4096\n1011, 3666, 0, 16384\n",
+], indirect=["log_file"])
+def test_read_fio_log_dataframe(log_file):
+    data_frame = logparser.read_fio_log_dataframe(log_file)
+    assert data_frame.index.astype('timedelta64[ms]').tolist() == [501, 1011]
+    assert data_frame[1].tolist() == [5320, 3666]
@@ -170,3 +170,20 @@ def test_fio_result_comparator_compare(database_with_results_only,
                         assert "positive" == inner_value.state
                     else:
                         assert "negative" == inner_value.state
+
+
+@pytest.mark.parametrize("result_id", ["1", "2"])
+def test_save_metrics(temp_path_with_data, database_with_tags, session,
+                      result_id):
+    models.save_metrics(temp_path_with_data, result_id)
+    # saving twice replaces the rows
+    models.save_metrics(temp_path_with_data, result_id)
+    rows = session.query(models.Metrics). \
+        filter(models.Metrics.result_id == result_id).all()
+    fio_result = models.FioResult(temp_path_with_data, result_id)
+    group_report = fio_result.group_reports[0]
+    assert len(rows) == 1
+    assert rows[0].rw == 'randrw'
+    assert rows[0].read_iops == group_report.read_iops
+    assert rows[0].write_clat_p99_usec == \
+        group_report.write_completion_lat_percentiles_usec[99.0]
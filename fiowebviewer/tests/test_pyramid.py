@@ -0,0 +1,105 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import os
+
+import numpy as np
+import pytest
+
+from fiowebviewer.engine import (
+    pyramid,
+    series,
+)
+from fiowebviewer.engine.models import (
+    FioResult,
+)
+
+
+@pytest.fixture
+def samples():
+    time = np.array([501, 1000, 1011, 2999, 9500, 10001, 61000, 700000])
+    value = np.array([5, 7, 3, 10, 1, 4, 6, 2])
+    return time, value
+
+
+@pytest.mark.parametrize("granularity, result", [
+    ("1S", 1000),
+    ("2S", 2000),
+    ("1min", 60000),
+    ("1500L", 1500),
+    ("100U", None),
+    ("M", None),
+])
+def test_granularity_to_ms(granularity, result):
+    assert pyramid.granularity_to_ms(granularity) == result
+
+
+@pytest.mark.parametrize("granularity_ms, level_ms", [
+    (1000, 1000),
+    (5000, 1000),
+    (20000, 10000),
+    (120000, 60000),
+    (7200000, 3600000),
+    (500, None),
+])
+def test_choose_level(granularity_ms, level_ms):
+    assert pyramid.choose_level(granularity_ms) == level_ms
+
+
+def test_build_pyramid(samples):
+    time, value = samples
+    levels = pyramid.build_pyramid(time, value)
+    assert sorted(levels) == list(pyramid.LEVELS_MS)
+    for level_ms, data in levels.items():
+        bucket = -(-time // level_ms)
+        assert data[:, pyramid.BUCKET].tolist() == sorted(set(bucket))
+        for row in data:
+            selected = value[bucket == row[pyramid.BUCKET]]
+            assert row[pyramid.COUNT] == len(selected)
+            assert row[pyramid.SUM] == selected.sum()
+            assert row[pyramid.MIN] == selected.min()
+            assert row[pyramid.MAX] == selected.max()
+
+
+def test_query(temp_path, samples):
+    log_path = os.path.join(temp_path, 'fio-webviewer_bw.1.log.read')
+    pyramid.write_pyramid(log_path, *samples)
+    data, granularity_ms = pyramid.query(log_path, '20S')
+    assert granularity_ms == 20000
+    assert data[:, pyramid.BUCKET].tolist() == [1, 4, 35]
+    assert data[:, pyramid.COUNT].tolist() == [6, 1, 1]
+    data, _ = pyramid.query(log_path, '1S', 1000, 9000)
+    assert data[:, pyramid.BUCKET].tolist() == [2, 3]
+    assert pyramid.query(log_path, '500L') is None
+    frame = pyramid.to_dataframe(pyramid.query(log_path, '1S', 0, 4000))
+    assert frame.index.astype('timedelta64[s]').tolist() == [1, 2, 3]
+    assert frame[1].tolist() == [6, 3, 10]
+
+
+@pytest.mark.parametrize("log_type, iotype, granularity", [
+    ("bw", "read", "1S"),
+    ("clat", "write", "5S"),
+])
+def test_resample_from_pyramid(temp_path_with_data, database_with_results_only,
+                               log_type, iotype, granularity):
+    fio_result = FioResult(temp_path_with_data, '2')
+    series.convert_result(fio_result.path)
+    expected = fio_result.to_dataframe(1, log_type, iotype)
+    expected.index = expected.index.ceil(granularity)
+    expected = expected.groupby(level=0).mean()
+    data_frame = fio_result.resample(1, log_type, iotype, granularity)
+    data_frame = data_frame.dropna()
+    assert data_frame.index.equals(expected.index)
+    assert np.allclose(data_frame[1].values, expected[1].values)
+
+
+@pytest.mark.parametrize("span_ms, max_points, granularity_ms", [
+    (30000, 1000, 1000),
+    (30000, 3, 10000),
+    (86400000, 800, 120000),
+    (86400000, 10, 10800000),
+])
+def test_fit_granularity(span_ms, max_points, granularity_ms):
+    assert pyramid.fit_granularity(span_ms, max_points) == granularity_ms
+    assert span_ms / granularity_ms <= max_points
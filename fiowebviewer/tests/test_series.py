@@ -0,0 +1,135 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import os
+
+import numpy as np
+import pytest
+
+from fiowebviewer.engine import (
+    logparser,
+    models,
+    series,
+)
+from fiowebviewer.engine.models import (
+    FioResult,
+)
+
+
+@pytest.mark.parametrize("log_name", [
+    "fio-webviewer_bw.1.log.read",
+    "fio-webviewer_clat.2.log.write",
+])
+def test_convert_log(temp_path_with_data, copy_sample_data, log_name):
+    log_path = os.path.join(temp_path_with_data, '2', log_name)
+    assert not series.is_converted(log_path)
+    assert series.convert_log(log_path)
+    assert series.is_converted(log_path)
+    columns = series.load_columns(log_path)
+    expected = np.loadtxt(log_path, delimiter=',', dtype=np.int64)
+    for index, column in enumerate(series.COLUMNS):
+        assert isinstance(columns[column], np.memmap)
+        assert columns[column].dtype == np.int64
+        assert (columns[column] == expected[:, index]).all()
+
+
+def test_convert_result(temp_path_with_data, copy_sample_data):
+    result_path = os.path.join(temp_path_with_data, '2')
+    converted = series.convert_result(result_path)
+    assert "fio-webviewer_iops.2.log.write" in converted
+    assert all(name.endswith(series.LOG_SUFFIXES) for name in converted)
+    # raw logs are not split by data direction, so they are left alone
+    assert not series.is_converted(
+        os.path.join(result_path, "fio-webviewer_iops.2.log"))
+
+
+def test_convert_empty_log(temp_path):
+    log_path = os.path.join(temp_path, "fio-webviewer_bw.1.log.read")
+    open(log_path, 'w').close()
+    assert not series.convert_log(log_path)
+    assert series.load_columns(log_path) is None
+
+
+@pytest.mark.parametrize("log_type, iotype", [
+    ("bw", "read"),
+    ("lat", "write"),
+])
+def test_converted_dataframe_matches_text(temp_path_with_data,
+                                          database_with_results_only,
+                                          log_type, iotype):
+    fio_result = FioResult(temp_path_with_data, '2')
+    from_text = logparser.columns_to_dataframe(
+        fio_result._get_columns(1, log_type, iotype))
+    series.convert_result(fio_result.path)
+    from_binary = fio_result.to_dataframe(1, log_type, iotype)
+    assert from_binary.index.equals(from_text.index)
+    assert (from_binary[1].values == from_text[1].values).all()
+    assert fio_result.to_csv(1, log_type, iotype).getvalue().startswith(
+        "{}.0,{}.0".format(from_text.index[0].value // 10 ** 6,
+                           from_text[1].values[0]))
+
+
+@pytest.fixture
+def raw_result(temp_path):
+    result_path = os.path.join(temp_path, 'raw')
+    os.mkdir(result_path)
+    with open(os.path.join(result_path, 'fio-webviewer_bw.1.log'), 'w') as f:
+        f.write("501, 10, 0, 4096\n502, 20, 1, 4096\n"
+                "1011, 30, 2, 4096\n1012, 40, 0, 4096\n")
+    yield result_path
+    for filename in os.listdir(result_path):
+        os.remove(os.path.join(result_path, filename))
+    os.rmdir(result_path)
+
+
+@pytest.mark.parametrize("iotype, time, value", [
+    ("read", [501, 1012], [10, 40]),
+    ("write", [502], [20]),
+    ("trim", [1011], [30]),
+])
+def test_split_raw_log(raw_result, iotype, time, value):
+    fio_log = models.FioBwLog(raw_result, 1)
+    # readable before the conversion too
+    assert fio_log.parse(iotype)['time'].tolist() == time
+    assert not getattr(fio_log.exists, iotype)
+    converted = series.convert_result(raw_result)
+    assert converted == ['fio-webviewer_bw.1.log.read',
+                         'fio-webviewer_bw.1.log.write',
+                         'fio-webviewer_bw.1.log.trim']
+    assert getattr(fio_log.exists, iotype)
+    columns = fio_log.columns(iotype)
+    assert columns['time'].tolist() == time
+    assert columns['value'].tolist() == value
+    # text files are never written
+    assert not os.path.exists(getattr(fio_log.path, iotype))
+
+
+def test_split_raw_log_without_ddir(temp_path):
+    log_path = os.path.join(temp_path, 'fio-webviewer_bw.2.log')
+    with open(log_path, 'w') as f:
+        f.write("501, 10\n")
+    assert series.split_log(log_path) == []
+    assert series.is_split(log_path)
+    os.remove(log_path)
+    os.remove(series.split_marker_path(log_path))
+
+
+def test_split_raw_log_empty_io_type(raw_result, monkeypatch):
+    log_path = os.path.join(raw_result, 'fio-webviewer_iops.1.log')
+    with open(log_path, 'w') as f:
+        f.write("501, 10, 0, 4096\n1012, 40, 0, 4096\n")
+    assert series.convert_result(raw_result) == [
+        'fio-webviewer_bw.1.log.read', 'fio-webviewer_bw.1.log.write',
+        'fio-webviewer_bw.1.log.trim', 'fio-webviewer_iops.1.log.read']
+    assert series.is_split(log_path)
+
+    def parse_raw_log(log_path, io_type):
+        raise AssertionError('converted raw logs are not parsed again')
+    monkeypatch.setattr(series, 'parse_raw_log', parse_raw_log)
+    fio_log = models.FioIopsLog(raw_result, 1)
+    assert fio_log.parse('write') is None
+    assert not fio_log.exists.write
+    assert fio_log.columns('read')['time'].tolist() == [501, 1012]
+    # converted once
+    assert series.convert_result(raw_result) == []
@@ -0,0 +1,44 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import pytest
+
+from fiowebviewer.engine import (
+    units,
+)
+from fiowebviewer.engine.models import (
+    ROUNDING_RANGE,
+)
+
+
+@pytest.mark.parametrize("key, value, result", [
+    ("read_completion_lat_mean_usec", 1500, "1.5 ms"),
+    ("read_bw_kbps", 12345.6, "12.346 MB / s"),
+    ("write_total_io_kb", 100000, "100.0 MB"),
+    ("read_submission_lat_min_usec", 0.01, "0.0 ms"),
+    ("cpu_usr", 12.34567, "12.346"),
+])
+def test_convert(key, value, result):
+    assert str(units.convert(key, value, ROUNDING_RANGE)) == result
+
+
+@pytest.mark.parametrize("milliseconds, result", [
+    (0, "0h:00m:00s"),
+    (59999, "0h:00m:59s"),
+    (3723000, "1h:02m:03s"),
+    (90000000, "25h:00m:00s"),
+])
+def test_format_duration(milliseconds, result):
+    assert units.format_duration(milliseconds) == result
+
+
+@pytest.mark.parametrize("key, value", [
+    ("read_completion_lat_mean_usec", 1234.5678),
+    ("read_bw_kbps", 98765),
+    ("write_total_io_kb", 4096),
+])
+def test_same_as_pint(key, value):
+    pytest.importorskip('pint')
+    quantity = units.convert(key, value, ROUNDING_RANGE)
+    assert str(quantity.to_pint()) == str(quantity)
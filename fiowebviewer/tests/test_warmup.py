@@ -0,0 +1,72 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import datetime
+
+import pytest
+
+from fiowebviewer.engine import (
+    ingest,
+    series,
+    warmup,
+)
+from fiowebviewer.engine.database import (
+    Result,
+)
+from fiowebviewer.engine.models import (
+    FioResult,
+)
+
+
+@pytest.mark.parametrize("filters, ids", [
+    ({}, [2, 1]),
+    (dict(tag='test1'), [1]),
+    (dict(first_id=2), [2]),
+    (dict(last_id=1), [1]),
+    (dict(limit=1), [2]),
+    (dict(since=datetime.datetime(2100, 1, 1)), []),
+    (dict(until=datetime.datetime(2100, 1, 1)), [2, 1]),
+])
+def test_select_results(temp_path_with_data, database_with_tags, filters,
+                        ids):
+    assert warmup.select_results(**filters) == ids
+
+
+def test_select_processed_results(temp_path_with_data, database_with_tags,
+                                  session):
+    session.query(Result).filter(Result.id == 2).update(
+        {Result.status: ingest.STATUS_CONVERTING})
+    session.commit()
+    assert warmup.select_results() == [1]
+
+
+def test_warm_result(temp_path_with_data, database_with_results_only):
+    fio_result = FioResult(temp_path_with_data, '2')
+    artifacts = list(warmup.artifacts(fio_result))
+    assert any(artifact.job_id is None for artifact in artifacts)
+    assert any(artifact.job_id == 1 for artifact in artifacts)
+    warmed = warmup.warm_result(temp_path_with_data, '2')
+    assert warmed.error is None
+    assert warmed.written == len(artifacts)
+    assert warmed.skipped == 0
+    assert warmed.size == fio_result.cache_store().size()
+    assert all(artifact.key in fio_result.cache_store()
+               for artifact in artifacts)
+    # resumed, nothing left to do
+    warmed = warmup.warm_result(temp_path_with_data, '2')
+    assert (warmed.written, warmed.skipped) == (0, len(artifacts))
+
+
+def test_warm_converted_result(temp_path_with_data,
+                               database_with_results_only):
+    fio_result = FioResult(temp_path_with_data, '2')
+    series.convert_result(fio_result.path)
+    # only the combined series are cached
+    assert all(artifact.job_id is None
+               for artifact in warmup.artifacts(fio_result))
+
+
+def test_warm_missing_result(temp_path_with_data):
+    warmed = warmup.warm_result(temp_path_with_data, '404')
+    assert warmed.error is not None
@@ -0,0 +1,64 @@
+# Use of this source code is governed by a BSD-style
+# license that can be found in the LICENSE file.
+# Copyright 2019 The fiowebviewer Authors. All rights reserved.
+
+import numpy as np
+import pytest
+
+from fiowebviewer.engine import (
+    wire,
+)
+
+
+@pytest.mark.parametrize("values, dtype", [
+    (np.array([1, 2, 3]), '<i4'),
+    (np.array([1, 2 ** 40]), '<f8'),
+    (np.array([0.5, np.nan]), '<f4'),
+    (np.array([], dtype=np.int64), '<i4'),
+    (np.array([0, 86400], dtype='timedelta64[s]'), '<i4'),
+])
+def test_compact(values, dtype):
+    assert wire.compact(values).dtype.str == dtype
+
+
+def test_encode_exact_x():
+    # msec of a downsampled series 10 hours into a run
+    x = [36000.001, 36000.002]
+    assert wire.compact(x, exact=True).tolist() == x
+    assert wire.compact(x).tolist() != x
+    decoded = wire.decode(wire.encode([dict(x=x, y=[1, 2])]))[0]
+    assert decoded['x'].tolist() == x
+
+
+def test_encode_decode():
+    series_list = [
+        dict(x=np.arange(3), y=np.array([1.5, np.nan, 3.0]),
+             y_min=np.array([1.0, np.nan, 2.0]),
+             y_max=np.array([2.0, np.nan, 4.0]), granularity='1S'),
+        dict(error='404'),
+        dict(x=np.array([0.5, 1.25]), y=np.array([7, 8])),
+    ]
+    data = wire.encode(series_list)
+    assert data[:4] == wire.MAGIC
+    decoded = wire.decode(data)
+    assert decoded[0]['granularity'] == '1S'
+    assert decoded[0]['x'].dtype.str == '<i4'
+    assert np.array_equal(decoded[0]['y'], series_list[0]['y'],
+                          equal_nan=True)
+    assert np.array_equal(decoded[0]['y_max'], series_list[0]['y_max'],
+                          equal_nan=True)
+    assert decoded[1] == dict(error='404')
+    assert decoded[2]['x'].tolist() == [0.5, 1.25]
+    assert decoded[2]['y'].tolist() == [7, 8]
+
+
+def test_encode_alignment():
+    data = wire.encode([dict(x=np.arange(3), y=np.arange(3.0))])
+    size = int.from_bytes(data[4:8], 'little')
+    start = 8 + size
+    assert start % wire.ALIGNMENT == 0
+    decoded = wire.decode(data)
+    for values in (decoded[0]['x'], decoded[0]['y']):
+        offset = values.__array_interface__['data'][0] - \
+            np.frombuffer(data, dtype=np.uint8).__array_interface__['data'][0]
+        assert offset % wire.ALIGNMENT == 0
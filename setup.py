@@ -58,8 +58,13 @@ setup(name='fiowebviewer',
               'data/versions/*.py',
           ],
           'fiowebviewer.examples': [
+              'backfill_metrics.py',
               'config.cfg',
               'create_tables.py',
+              'ingest_worker.py',
+              'migrate_cache.py',
+              'prune_cache.py',
+              'warm_cache.py',
               'fiowebviewer.wsgi',
           ],
       },